@@ -25,6 +25,7 @@ const LoginPage = ({ onLoginSuccess }) => {
       if (response.ok) {
         localStorage.setItem('user', JSON.stringify(data.user));
         localStorage.setItem('user_id', data.user_id);
+        localStorage.setItem('auth_token', data.token);
         onLoginSuccess();
       } else {
         setError(data.error || 'Login failed');
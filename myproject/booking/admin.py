@@ -1,8 +1,17 @@
+from django import forms
 from django.contrib import admin
-from django.utils.html import format_html
+from django.utils import timezone
+from django.utils.html import format_html, format_html_join
 from django.urls import reverse
-from django.db.models import Count, Q
-from .models import Venue, Court, Booking, Review, Advertisement, Sponsor, Tournament, Team, TournamentRegistration, TournamentSponsor
+from django.db import transaction
+from django.db.models import Count, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce
+from .models import Venue, Court, PricingRule, Booking, RecurringBooking, SlotHold, Notification, VenueViewStat, DashboardStats, Review, Advertisement, Sponsor, Tournament, Team, TournamentRegistration, TournamentSponsor, Payment, Match, Player, TeamMembership, AdStat
+from . import availability
+from . import stats
+from . import exports
+from . import players
+from . import ads
 
 
 # Custom Admin Site Configuration
@@ -18,6 +27,12 @@ class CourtInline(admin.TabularInline):
     fields = ('name', 'capacity', 'price_per_hour', 'is_active')
 
 
+class PricingRuleInline(admin.TabularInline):
+    model = PricingRule
+    extra = 0
+    fields = ('name', 'weekdays', 'start_time', 'end_time', 'price_per_hour', 'priority', 'is_active')
+
+
 class BookingInline(admin.TabularInline):
     model = Booking
     extra = 0
@@ -28,11 +43,11 @@ class BookingInline(admin.TabularInline):
 
 @admin.register(Venue)
 class VenueAdmin(admin.ModelAdmin):
-    list_display = ('name', 'city', 'rating', 'court_count', 'phone', 'created_at')
+    list_display = ('name', 'city', 'rating', 'review_count', 'court_count', 'phone', 'created_at')
     list_filter = ('city', 'created_at', 'rating')
     search_fields = ('name', 'city', 'address', 'email')
     inlines = [CourtInline]
-    readonly_fields = ('created_at',)
+    readonly_fields = ('created_at', 'review_count', 'rating_sum')
     fieldsets = (
         ('Basic Information', {
             'fields': ('name', 'address', 'city')
@@ -41,7 +56,7 @@ class VenueAdmin(admin.ModelAdmin):
             'fields': ('phone', 'email')
         }),
         ('Description & Rating', {
-            'fields': ('description', 'rating')
+            'fields': ('description', 'rating', 'review_count', 'rating_sum')
         }),
         ('Metadata', {
             'fields': ('created_at',),
@@ -49,10 +64,14 @@ class VenueAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        # one aggregate join instead of a COUNT per listed venue
+        return super().get_queryset(request).annotate(_court_count=Count('courts'))
+
     def court_count(self, obj):
-        count = obj.courts.count()
-        return format_html('<span style="background-color: #4CAF50; color: white; padding: 3px 8px; border-radius: 3px;">{} Courts</span>', count)
+        return format_html('<span style="background-color: #4CAF50; color: white; padding: 3px 8px; border-radius: 3px;">{} Courts</span>', obj._court_count)
     court_count.short_description = 'Courts'
+    court_count.admin_order_field = '_court_count'
 
 
 @admin.register(Court)
@@ -60,7 +79,9 @@ class CourtAdmin(admin.ModelAdmin):
     list_display = ('name', 'venue', 'capacity', 'price_per_hour', 'status_badge', 'booking_count')
     list_filter = ('venue', 'is_active', 'capacity')
     search_fields = ('name', 'venue__name')
+    list_select_related = ('venue',)
     readonly_fields = ('booking_count_display',)
+    inlines = [PricingRuleInline]
     fieldsets = (
         ('Basic Information', {
             'fields': ('venue', 'name', 'capacity')
@@ -89,23 +110,58 @@ class CourtAdmin(admin.ModelAdmin):
         )
     status_badge.short_description = 'Status'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_booking_count=Count('bookings'))
+
     def booking_count_display(self, obj):
-        return obj.bookings.count()
+        # the add form renders this for an unsaved court, which has no annotation
+        return getattr(obj, '_booking_count', 0)
     booking_count_display.short_description = 'Total Bookings'
     
     def booking_count(self, obj):
-        return obj.bookings.count()
+        return obj._booking_count
     booking_count.short_description = 'Bookings'
+    booking_count.admin_order_field = '_booking_count'
+
+
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+
+    SLOT_FIELDS = ('court', 'date', 'start_time', 'end_time')
+
+    def clean(self):
+        cleaned_data = super().clean()
+        court, day = cleaned_data.get('court'), cleaned_data.get('date')
+        start_time, end_time = cleaned_data.get('start_time'), cleaned_data.get('end_time')
+        if None in (court, day, start_time, end_time):
+            return cleaned_data
+        if start_time >= end_time:
+            self.add_error('end_time', 'End time must be after start time.')
+            return cleaned_data
+        # the court cells are only claimed on save; check here so a clash is a form error
+        holds_cells = self.instance.original('status') in availability.CELL_STATUSES
+        moved = any(name in self.changed_data for name in self.SLOT_FIELDS)
+        if cleaned_data.get('status') in availability.CELL_STATUSES and (moved or not holds_cells):
+            conflicts = availability.find_conflicts(court, day, start_time, end_time, exclude_pk=self.instance.pk)
+            if conflicts:
+                raise forms.ValidationError(
+                    f'The court is already booked at {availability.format_ranges(conflicts)}.'
+                )
+        return cleaned_data
 
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = ('user_email', 'court_name', 'booking_date', 'time_slot', 'players', 'status_badge', 'total_price')
     list_filter = ('status', 'date', 'court__venue', 'created_at')
     search_fields = ('user__email', 'court__name', 'court__venue__name')
     date_hierarchy = 'date'
+    list_select_related = ('user', 'court__venue')
     readonly_fields = ('created_at', 'updated_at', 'user', 'total_price_display', 'duration_display')
-    actions = ['confirm_booking', 'cancel_booking', 'mark_completed']
+    actions = ['confirm_booking', 'cancel_booking', 'mark_completed', 'export_csv', 'export_jsonl_gz']
     
     fieldsets = (
         ('User Information', {
@@ -133,14 +189,17 @@ class BookingAdmin(admin.ModelAdmin):
             obj.user.email
         )
     user_email.short_description = 'User Email'
+    user_email.admin_order_field = 'user__email'
     
     def court_name(self, obj):
         return f"{obj.court.venue.name} - {obj.court.name}"
     court_name.short_description = 'Court'
+    court_name.admin_order_field = 'court__venue__name'
     
     def booking_date(self, obj):
         return obj.date.strftime('%d %b %Y')
     booking_date.short_description = 'Date'
+    booking_date.admin_order_field = 'date'
     
     def time_slot(self, obj):
         return f"{obj.start_time.strftime('%H:%M')} - {obj.end_time.strftime('%H:%M')}"
@@ -183,28 +242,197 @@ class BookingAdmin(admin.ModelAdmin):
     duration_display.short_description = 'Duration'
     
     def confirm_booking(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='confirmed')
+        with transaction.atomic():
+            queryset = queryset.filter(status='pending')
+            rows = stats.booking_rows(queryset)
+            updated = queryset.update(status='confirmed', updated_at=timezone.now())
+            stats.bookings_changed(rows, 'confirmed')
         self.message_user(request, f'{updated} booking(s) confirmed successfully!')
     confirm_booking.short_description = '✅ Confirm selected bookings'
     
     def cancel_booking(self, request, queryset):
-        updated = queryset.exclude(status='completed').update(status='cancelled')
+        with transaction.atomic():
+            queryset = queryset.exclude(status='completed')
+            rows = stats.booking_rows(queryset)
+            availability.release_cells(queryset)
+            updated = queryset.update(status='cancelled', updated_at=timezone.now())
+            stats.bookings_changed(rows, 'cancelled')
         self.message_user(request, f'{updated} booking(s) cancelled successfully!')
     cancel_booking.short_description = '❌ Cancel selected bookings'
     
     def mark_completed(self, request, queryset):
-        updated = queryset.filter(status='confirmed').update(status='completed')
+        with transaction.atomic():
+            queryset = queryset.filter(status='confirmed')
+            rows = stats.booking_rows(queryset)
+            updated = queryset.update(status='completed', updated_at=timezone.now())
+            stats.bookings_changed(rows, 'completed')
         self.message_user(request, f'{updated} booking(s) marked as completed!')
     mark_completed.short_description = '✔️ Mark as completed'
 
+    def export_csv(self, request, queryset):
+        return exports.streaming_response('bookings', queryset, 'csv')
+    export_csv.short_description = '⬇️ Export selected bookings (CSV)'
+
+    def export_jsonl_gz(self, request, queryset):
+        return exports.streaming_response('bookings', queryset, 'jsonl', compress=True)
+    export_jsonl_gz.short_description = '⬇️ Export selected bookings (JSON Lines, gzip)'
+
+    def save_model(self, request, obj, form, change):
+        # keep the BookingSlot cells and the occupancy bitmap in step with the edit
+        previous_status = obj.original('status')
+        moved = change and any(
+            obj.original(name) != getattr(obj, name) for name in ('court_id', 'date', 'start_time', 'end_time')
+        )
+        with transaction.atomic():
+            # the stored row leaves the rollup and the edited one enters it, whatever changed
+            rows = stats.booking_rows(Booking.objects.filter(pk=obj.pk)) if change else []
+            if moved and previous_status in availability.CELL_STATUSES:
+                availability.release_cells(obj)
+            super().save_model(request, obj, form, change)
+            # a moved booking claims its new cells as if it were new
+            availability.sync_cells(obj, None if moved else previous_status)
+            stats.bookings_removed(rows)
+            stats.booking_changed(obj)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            rows = stats.booking_rows(Booking.objects.filter(pk=obj.pk))
+            availability.release_cells(obj)
+            super().delete_model(request, obj)
+            stats.bookings_removed(rows)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = stats.booking_rows(queryset)
+            availability.release_cells(queryset)
+            super().delete_queryset(request, queryset)
+            stats.bookings_removed(rows)
+
+
+class ReusedProofFilter(admin.SimpleListFilter):
+    title = 'payment proof'
+    parameter_name = 'proof'
+
+    def lookups(self, request, model_admin):
+        return (('reused', 'Used by several payments'), ('missing', 'No proof'))
+
+    def queryset(self, request, queryset):
+        if self.value() == 'reused':
+            return queryset.filter(_proof_uses__gt=1)
+        if self.value() == 'missing':
+            return queryset.filter(proof_digest='')
+        return queryset
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ('transaction_id', 'user', 'transaction_type', 'amount', 'payment_method', 'status', 'proof_reuse', 'admin_approved', 'created_at')
+    list_filter = ('status', 'transaction_type', 'payment_method', ReusedProofFilter, 'created_at')
+    search_fields = ('transaction_id', 'user__email', '=proof_digest')
+    list_select_related = ('user',)
+    date_hierarchy = 'created_at'
+    raw_id_fields = ('user', 'booking', 'advertisement', 'tournament', 'registration', 'admin_approved_by')
+    readonly_fields = ('proof_digest', 'reused_by')
+    actions = ['export_csv', 'export_jsonl_gz']
+
+    def get_queryset(self, request):
+        # payments sharing the proof digest, this one included; 0 when there is no proof
+        uses = (
+            Payment.objects.filter(proof_digest=OuterRef('proof_digest')).exclude(proof_digest='')
+            .order_by().values('proof_digest').annotate(n=Count('pk')).values('n')
+        )
+        return super().get_queryset(request).annotate(_proof_uses=Coalesce(Subquery(uses), 0))
+
+    def proof_reuse(self, obj):
+        if obj._proof_uses > 1:
+            url = reverse('admin:booking_payment_changelist') + f'?q={obj.proof_digest}'
+            return format_html('<a href="{}" style="color:#f44336; font-weight:bold;">⚠️ {} payments</a>', url, obj._proof_uses)
+        return '-'
+    proof_reuse.short_description = 'Proof reused'
+    proof_reuse.admin_order_field = '_proof_uses'
+
+    def reused_by(self, obj):
+        others = list(obj.reused_proof_payments().select_related('user')[:20])
+        if not others:
+            return '-'
+        return format_html_join(', ', '<a href="{}">{}</a> ({})', (
+            (reverse('admin:booking_payment_change', args=[p.pk]), p.transaction_id, p.user.email) for p in others
+        ))
+    reused_by.short_description = 'Same proof as'
+
+    def export_csv(self, request, queryset):
+        return exports.streaming_response('payments', queryset, 'csv')
+    export_csv.short_description = '⬇️ Export selected payments (CSV)'
+
+    def export_jsonl_gz(self, request, queryset):
+        return exports.streaming_response('payments', queryset, 'jsonl', compress=True)
+    export_jsonl_gz.short_description = '⬇️ Export selected payments (JSON Lines, gzip)'
+
+
+@admin.register(RecurringBooking)
+class RecurringBookingAdmin(admin.ModelAdmin):
+    list_display = ('user', 'court', 'start_date', 'end_date', 'interval_weeks', 'start_time', 'end_time', 'created_at')
+    list_filter = ('interval_weeks', 'court__venue')
+    search_fields = ('user__email', 'court__name')
+    list_select_related = ('user', 'court__venue')
+
+
+@admin.register(SlotHold)
+class SlotHoldAdmin(admin.ModelAdmin):
+    list_display = ('user', 'court', 'date', 'start_time', 'end_time', 'expires_at')
+    list_filter = ('date', 'court__venue')
+    search_fields = ('user__email', 'court__name')
+    list_select_related = ('user', 'court__venue')
+
+
+@admin.register(Notification)
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = ('channel', 'recipient', 'subject', 'status', 'attempts', 'next_attempt_at', 'sent_at')
+    list_filter = ('status', 'channel')
+    search_fields = ('recipient', 'subject')
+    readonly_fields = ('created_at', 'sent_at', 'last_error')
+    actions = ['retry_now']
+
+    def retry_now(self, request, queryset):
+        """Put failed notifications back in the queue for immediate delivery."""
+        updated = queryset.exclude(status='sent').update(status='pending', next_attempt_at=timezone.now())
+        self.message_user(request, f'{updated} notification(s) queued for retry.')
+    retry_now.short_description = 'Retry selected notifications now'
+
+
+@admin.register(VenueViewStat)
+class VenueViewStatAdmin(admin.ModelAdmin):
+    list_display = ('date', 'venue', 'user', 'views')
+    list_filter = ('date',)
+    search_fields = ('venue__name', 'user__email')
+    list_select_related = ('venue', 'user')
+    date_hierarchy = 'date'
+
+
+@admin.register(DashboardStats)
+class DashboardStatsAdmin(admin.ModelAdmin):
+    list_display = ('date', 'venue', 'pending_bookings', 'confirmed_bookings', 'cancelled_bookings',
+                    'completed_bookings', 'revenue', 'pending_registrations')
+    list_filter = ('venue',)
+    list_select_related = ('venue',)
+    date_hierarchy = 'date'
+
+    # maintained by booking.stats; rebuild with `manage.py rebuild_dashboard_stats`
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
 
 @admin.register(Review)
 class ReviewAdmin(admin.ModelAdmin):
     list_display = ('user_email', 'venue_name', 'rating_badge', 'created_at')
     list_filter = ('rating', 'created_at', 'venue')
     search_fields = ('user__email', 'venue__name', 'comment')
+    list_select_related = ('user', 'venue')
     readonly_fields = ('created_at', 'user', 'venue')
-    
+
     def user_email(self, obj):
         return obj.user.email
     user_email.short_description = 'User'
@@ -212,6 +440,7 @@ class ReviewAdmin(admin.ModelAdmin):
     def venue_name(self, obj):
         return obj.venue.name
     venue_name.short_description = 'Venue'
+    venue_name.admin_order_field = 'venue__name'
     
     def rating_badge(self, obj):
         colors = {
@@ -230,9 +459,25 @@ class ReviewAdmin(admin.ModelAdmin):
     rating_badge.short_description = 'Rating'
 
 
+class AdStatInline(admin.TabularInline):
+    model = AdStat
+    extra = 0
+    fields = ('date', 'impressions', 'clicks', 'click_rate')
+    readonly_fields = fields
+    can_delete = False
+    verbose_name_plural = 'Daily impressions and clicks'
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def click_rate(self, obj):
+        return f"{obj.clicks / obj.impressions:.1%}" if obj.impressions else '-'
+    click_rate.short_description = 'CTR'
+
+
 @admin.register(Advertisement)
 class AdvertisementAdmin(admin.ModelAdmin):
-    list_display = ('title', 'position', 'start_date', 'end_date', 'is_active', 'created_at')
+    list_display = ('title', 'position', 'start_date', 'end_date', 'is_active', 'impressions', 'clicks', 'click_rate', 'created_at')
     list_filter = ('position', 'is_active', 'start_date', 'end_date')
     search_fields = ('title', 'link')
     readonly_fields = ('created_at',)
@@ -250,6 +495,31 @@ class AdvertisementAdmin(admin.ModelAdmin):
         }),
     )
 
+    inlines = [AdStatInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            _impressions=Sum('daily_stats__impressions'),
+            _clicks=Sum('daily_stats__clicks'),
+        )
+
+    def impressions(self, obj):
+        return obj._impressions or 0
+    impressions.admin_order_field = '_impressions'
+
+    def clicks(self, obj):
+        return obj._clicks or 0
+    clicks.admin_order_field = '_clicks'
+
+    def click_rate(self, obj):
+        return f"{obj._clicks / obj._impressions:.1%}" if obj._impressions else '-'
+    click_rate.short_description = 'CTR'
+
+    def delete_queryset(self, request, queryset):
+        # bulk delete skips Advertisement.delete()
+        super().delete_queryset(request, queryset)
+        ads.invalidate()
+
 
 @admin.register(Sponsor)
 class SponsorAdmin(admin.ModelAdmin):
@@ -270,6 +540,7 @@ class SponsorAdmin(admin.ModelAdmin):
 @admin.register(TournamentSponsor)
 class TournamentSponsorAdmin(admin.ModelAdmin):
     list_display = ('tournament', 'sponsor', 'sponsor_type', 'is_active', 'created_at')
+    list_select_related = ('tournament', 'sponsor')
     list_filter = ('sponsor_type', 'is_active', 'tournament')
     search_fields = ('sponsor__name', 'tournament__name')
     readonly_fields = ('created_at',)
@@ -297,15 +568,28 @@ class TournamentRegistrationInline(admin.TabularInline):
     can_delete = False
 
 
+class MatchInline(admin.TabularInline):
+    model = Match
+    extra = 0
+    fields = ('number', 'stage', 'round', 'group', 'home_label', 'away_label', 'court', 'date', 'start_time', 'end_time')
+    readonly_fields = fields
+    can_delete = False
+    show_change_link = True
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Tournament)
 class TournamentAdmin(admin.ModelAdmin):
-    list_display = ('name', 'venue_name', 'start_date', 'end_date', 'max_teams', 'status_badge', 'entry_fee')
+    list_display = ('name', 'venue_name', 'start_date', 'end_date', 'approved_count', 'max_teams', 'status_badge', 'entry_fee')
     list_filter = ('status', 'start_date', 'venue')
     search_fields = ('name', 'venue__name', 'description')
+    list_select_related = ('venue',)
     readonly_fields = ('created_at', 'updated_at', 'tournament_summary')
     actions = ['mark_ongoing', 'mark_completed', 'mark_cancelled']
     date_hierarchy = 'start_date'
-    inlines = [TournamentRegistrationInline, TournamentSponsorInline]
+    inlines = [TournamentRegistrationInline, TournamentSponsorInline, MatchInline]
     
     fieldsets = (
         ('Tournament Information', {
@@ -377,44 +661,174 @@ class TournamentAdmin(admin.ModelAdmin):
     tournament_summary.short_description = 'Tournament Summary'
     
     def mark_ongoing(self, request, queryset):
-        updated = queryset.filter(status='upcoming').update(status='ongoing')
+        updated = queryset.filter(status='upcoming').update(status='ongoing', updated_at=timezone.now())
         self.message_user(request, f'{updated} tournament(s) marked as ongoing! 🔴')
     mark_ongoing.short_description = '🔴 Mark as ongoing'
     
     def mark_completed(self, request, queryset):
-        updated = queryset.filter(status='ongoing').update(status='completed')
+        updated = queryset.filter(status='ongoing').update(status='completed', updated_at=timezone.now())
         self.message_user(request, f'{updated} tournament(s) marked as completed! ✅')
     mark_completed.short_description = '✅ Mark as completed'
     
     def mark_cancelled(self, request, queryset):
-        updated = queryset.update(status='cancelled')
+        updated = queryset.update(status='cancelled', updated_at=timezone.now())
         self.message_user(request, f'{updated} tournament(s) cancelled! ❌')
     mark_cancelled.short_description = '❌ Cancel tournaments'
 
 
+@admin.register(Match)
+class MatchAdmin(admin.ModelAdmin):
+    list_display = ('tournament', 'number', 'stage', 'group', 'home_label', 'away_label', 'court', 'date', 'start_time')
+    list_filter = ('stage', 'tournament', 'date')
+    search_fields = ('tournament__name', 'home_label', 'away_label')
+    list_select_related = ('tournament', 'court__venue')
+    raw_id_fields = ('booking',)
+    date_hierarchy = 'date'
+
+
+class TeamMembershipInline(admin.TabularInline):
+    model = TeamMembership
+    extra = 0
+    fields = ('position', 'player')
+    raw_id_fields = ('player',)
+
+
+class PlayerMembershipInline(admin.TabularInline):
+    model = TeamMembership
+    extra = 0
+    fields = ('team', 'position')
+    raw_id_fields = ('team',)
+
+
 @admin.register(Team)
 class TeamAdmin(admin.ModelAdmin):
     list_display = ('name', 'captain_name', 'contact_number', 'created_by', 'created_at')
     list_filter = ('created_at',)
-    search_fields = ('name', 'captain_name', 'created_by__email')
+    search_fields = ('name', 'captain_name', 'created_by__email', 'memberships__player__name', 'memberships__player__phone')
+    list_select_related = ('created_by',)
     readonly_fields = ('created_at',)
+    inlines = [TeamMembershipInline]
+
+
+class PlayerAdminForm(forms.ModelForm):
+    class Meta:
+        model = Player
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        name, phone = cleaned_data.get('name'), cleaned_data.get('phone', '')
+        # normalized_name is read-only and filled in by save_model, so the model's
+        # unique_together check never sees the clash
+        if name and Player.objects.filter(
+            normalized_name=players.normalize_name(name), phone=players.normalize_phone(phone),
+        ).exclude(pk=self.instance.pk).exists():
+            self.add_error('name', 'Another player already has this name and phone number.')
+        return cleaned_data
+
+
+@admin.register(Player)
+class PlayerAdmin(admin.ModelAdmin):
+    form = PlayerAdminForm
+    list_display = ('name', 'phone', 'team_count', 'created_at')
+    search_fields = ('normalized_name', 'phone')
+    readonly_fields = ('normalized_name', 'created_at')
+    inlines = [PlayerMembershipInline]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(_team_count=Count('memberships'))
+
+    def team_count(self, obj):
+        return obj._team_count
+    team_count.short_description = 'Teams'
+    team_count.admin_order_field = '_team_count'
+
+    def save_model(self, request, obj, form, change):
+        obj.normalized_name = players.normalize_name(obj.name)
+        obj.phone = players.normalize_phone(obj.phone)
+        super().save_model(request, obj, form, change)
+
+
+class TournamentRegistrationAdminForm(forms.ModelForm):
+    class Meta:
+        model = TournamentRegistration
+        fields = '__all__'
+
+    def clean(self):
+        cleaned_data = super().clean()
+        tournament = cleaned_data.get('tournament')
+        if tournament is None and self.instance.tournament_id:
+            # read-only when editing
+            tournament = self.instance.tournament
+        # TournamentRegistration.save() would raise TournamentFull; report it on the form instead
+        if (cleaned_data.get('status') == 'approved' and tournament is not None
+                and self.instance.original('status') != 'approved'
+                and tournament.approved_count >= tournament.max_teams):
+            self.add_error('status', f'{tournament.name} already has {tournament.max_teams} approved teams.')
+        return cleaned_data
 
 
 @admin.register(TournamentRegistration)
 class TournamentRegistrationAdmin(admin.ModelAdmin):
+    form = TournamentRegistrationAdminForm
     list_display = ('team', 'tournament', 'user', 'status', 'created_at')
     list_filter = ('status', 'tournament')
     search_fields = ('team__name', 'user__email', 'tournament__name')
+    list_select_related = ('team', 'tournament', 'user')
     actions = ['approve_registrations', 'reject_registrations']
 
+    def get_readonly_fields(self, request, obj=None):
+        # the approved counter follows status changes, not moves between tournaments
+        if obj is not None:
+            return ('tournament',)
+        return ()
+
     def approve_registrations(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='approved')
+        with transaction.atomic():
+            queryset = queryset.filter(status='pending')
+            # update() skips TournamentRegistration.save(), so reserve the places per tournament here
+            wanted = dict(queryset.order_by().values_list('tournament').annotate(n=Count('pk')))
+            full = [t for t in Tournament.objects.filter(pk__in=wanted) if not t.reserve_places(wanted[t.pk])]
+            queryset = queryset.exclude(tournament__in=full)
+            rows = stats.registration_rows(queryset)
+            updated = queryset.update(status='approved', updated_at=timezone.now())
+            stats.registrations_changed(rows, 'approved')
         self.message_user(request, f'{updated} registration(s) approved.')
+        if full:
+            names = ', '.join(t.name for t in full)
+            self.message_user(request, f'Not enough places left in {names}; those registrations were not approved.',
+                              level='warning')
     approve_registrations.short_description = '✅ Approve selected registrations'
 
     def reject_registrations(self, request, queryset):
-        updated = queryset.filter(status='pending').update(status='rejected')
+        with transaction.atomic():
+            queryset = queryset.filter(status='pending')
+            rows = stats.registration_rows(queryset)
+            updated = queryset.update(status='rejected', updated_at=timezone.now())
+            stats.registrations_changed(rows, 'rejected')
         self.message_user(request, f'{updated} registration(s) rejected.')
     reject_registrations.short_description = '❌ Reject selected registrations'
 
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            # the stored row leaves the rollup and the edited one enters it
+            rows = stats.registration_rows(TournamentRegistration.objects.filter(pk=obj.pk)) if change else []
+            super().save_model(request, obj, form, change)
+            stats.registrations_removed(rows)
+            stats.registration_changed(obj)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            rows = stats.registration_rows(TournamentRegistration.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+            stats.registrations_removed(rows)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            rows = stats.registration_rows(queryset)
+            tournaments = list(queryset.filter(status='approved').values_list('tournament_id', flat=True).distinct())
+            super().delete_queryset(request, queryset)
+            Tournament.refresh_approved_counts(tournaments)
+            stats.registrations_removed(rows)
+
 
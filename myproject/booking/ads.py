@@ -0,0 +1,162 @@
+"""Process-local snapshot of the advertisements that are live today.
+
+The snapshot is keyed by date and by a version number kept in the cache.
+Saving or deleting an Advertisement bumps the version. Every process notices the
+new version on its next read and rebuilds, so a page render costs one cache
+lookup and no query. With the default per-process cache, other processes only
+pick up a change when `ACTIVE_ADS_SNAPSHOT_SECONDS` runs out; use a shared
+cache to invalidate everywhere at once.
+
+Impressions and clicks are counted in a per-process buffer, the same way
+`booking.analytics` counts venue views. The buffer is written to `AdStat` in one
+batch once it holds `AD_STAT_BUFFER_SIZE` events or `AD_STAT_FLUSH_SECONDS` have
+passed.
+"""
+import threading
+import time
+import uuid
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import Advertisement, AdStat
+
+
+VERSION_KEY = 'booking:ads:version'
+
+# (date, version, built_at, ads_by_position)
+_snapshot = None
+
+_lock = threading.Lock()
+# (ad_id, date, 'impressions' | 'clicks') -> count
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def _version():
+    return cache.get_or_set(VERSION_KEY, lambda: uuid.uuid4().hex, None)
+
+
+def invalidate():
+    # a fresh token rather than incr(): it cannot collide with a version a process already holds
+    cache.set(VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def _build(today):
+    ads_by_position = {position: [] for position, _ in Advertisement.POSITION_CHOICES}
+    for ad in Advertisement.objects.filter(is_active=True, start_date__lte=today, end_date__gte=today):
+        ads_by_position.setdefault(ad.position, []).append(ad)
+    return ads_by_position
+
+
+def _current():
+    global _snapshot
+    today = timezone.now().date()
+    version = _version()
+    max_age = getattr(settings, 'ACTIVE_ADS_SNAPSHOT_SECONDS', 300)
+    snapshot = _snapshot
+    if snapshot is None or snapshot[:2] != (today, version) or time.monotonic() - snapshot[2] > max_age:
+        snapshot = _snapshot = (today, version, time.monotonic(), _build(today))
+    return snapshot[3]
+
+
+def active_by_position():
+    """Live ads grouped by position, e.g. `{'HOME_TOP': [...], 'SIDEBAR': [...]}`."""
+    # templates get their own lists so nothing can edit the shared snapshot
+    return {position: AdList(ads) for position, ads in _current().items()}
+
+
+def find(ad_id):
+    """The live ad with `ad_id` from the snapshot, or None."""
+    for ads in _current().values():
+        for ad in ads:
+            if ad.pk == ad_id:
+                return ad
+    return None
+
+
+class AdList(list):
+    """Ads of one position; looping over it in a template counts an impression for each ad shown."""
+
+    _counted = False
+
+    def __iter__(self):
+        if not self._counted:
+            self._counted = True
+            # the templates only draw ads that have an image
+            record_impressions([ad.pk for ad in list.__iter__(self) if ad.image])
+        return super().__iter__()
+
+
+def record_impressions(ad_ids):
+    _record('impressions', ad_ids)
+
+
+def record_click(ad_id):
+    _record('clicks', [ad_id])
+
+
+def _record(field, ad_ids):
+    if not ad_ids:
+        return
+    today = timezone.localdate()
+    with _lock:
+        for ad_id in ad_ids:
+            _pending[(ad_id, today, field)] += 1
+        due = (
+            sum(_pending.values()) >= getattr(settings, 'AD_STAT_BUFFER_SIZE', 500)
+            or time.monotonic() - _last_flush >= getattr(settings, 'AD_STAT_FLUSH_SECONDS', 60)
+        )
+    if due:
+        flush()
+
+
+def flush():
+    """Write the buffered counts to `AdStat`: one INSERT for missing rows, one UPDATE for all counts.
+
+    Returns the number of events written.
+    """
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not counts:
+        return 0
+
+    days = {(ad_id, day) for ad_id, day, _ in counts}
+    # ads deleted since they were counted would break the foreign key
+    live = set(Advertisement.objects.filter(pk__in={ad_id for ad_id, _ in days}).values_list('pk', flat=True))
+    days = {(ad_id, day) for ad_id, day in days if ad_id in live}
+    if not days:
+        return 0
+
+    def added(field):
+        return F(field) + Case(
+            *[
+                When(advertisement_id=ad_id, date=day, then=Value(n))
+                for (ad_id, day, name), n in counts.items() if name == field and ad_id in live
+            ],
+            default=Value(0),
+        )
+
+    with transaction.atomic():
+        AdStat.objects.bulk_create(
+            [AdStat(advertisement_id=ad_id, date=day) for ad_id, day in days],
+            ignore_conflicts=True,
+        )
+        match = Q()
+        for ad_id, day in days:
+            match |= Q(advertisement_id=ad_id, date=day)
+        AdStat.objects.filter(match).update(impressions=added('impressions'), clicks=added('clicks'))
+    return sum(n for (ad_id, _, _), n in counts.items() if ad_id in live)
+
+
+def discard():
+    """Drop buffered counts without writing them (used by tests)."""
+    with _lock:
+        _pending.clear()
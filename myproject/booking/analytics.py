@@ -0,0 +1,76 @@
+"""In-process buffer for venue page views.
+
+`record_view` only bumps a counter in memory; the buffer is written to
+`VenueViewStat` in one batch once it holds `VENUE_VIEW_BUFFER_SIZE` events or
+`VENUE_VIEW_FLUSH_SECONDS` have passed since the last flush. Both limits are
+only checked when a view is recorded: there is no timer, so a process that goes
+quiet keeps its last few views in memory until the next one arrives. Each worker
+process keeps its own buffer, and views still buffered when a process exits are
+lost, which is acceptable for analytics.
+"""
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, F, Q, Value, When
+from django.utils import timezone
+
+from .models import VenueViewStat
+
+
+_lock = threading.Lock()
+_pending = Counter()
+_last_flush = time.monotonic()
+
+
+def record_view(venue_id, user_id):
+    """Count one view of `venue_id` by `user_id`, flushing the buffer when it is due."""
+    key = (venue_id, user_id, timezone.localdate())
+    with _lock:
+        _pending[key] += 1
+        due = (
+            sum(_pending.values()) >= getattr(settings, 'VENUE_VIEW_BUFFER_SIZE', 100)
+            or time.monotonic() - _last_flush >= getattr(settings, 'VENUE_VIEW_FLUSH_SECONDS', 60)
+        )
+    if due:
+        flush()
+
+
+def flush():
+    """Write the buffered counts to `VenueViewStat` with a fixed number of queries.
+
+    Returns the number of views written.
+    """
+    global _last_flush
+    with _lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    if not counts:
+        return 0
+
+    with transaction.atomic():
+        # make sure every (venue, user, date) row exists, then add all the counts in one UPDATE
+        VenueViewStat.objects.bulk_create(
+            [VenueViewStat(venue_id=venue_id, user_id=user_id, date=day) for venue_id, user_id, day in counts],
+            ignore_conflicts=True,
+        )
+        match = Q()
+        for venue_id, user_id, day in counts:
+            match |= Q(venue_id=venue_id, user_id=user_id, date=day)
+        VenueViewStat.objects.filter(match).update(views=F('views') + Case(
+            *[
+                When(venue_id=venue_id, user_id=user_id, date=day, then=Value(n))
+                for (venue_id, user_id, day), n in counts.items()
+            ],
+            default=Value(0),
+        ))
+    return sum(counts.values())
+
+
+def discard():
+    """Drop buffered views without writing them (used by tests)."""
+    with _lock:
+        _pending.clear()
@@ -0,0 +1,253 @@
+"""REST API for the React frontend, mounted at /api/.
+
+Lists are cursor-paginated, so a page costs the same single query however deep
+the client scrolls. They accept `?fields=a,b` to trim each object. Every GET
+carries a weak ETag and a Last-Modified header derived from the `updated_at` of
+the rows shown (and of the rows they borrow names from). A client that sends
+them back as If-None-Match / If-Modified-Since gets a 304 after one aggregate
+query, without the page being fetched or serialized. The ETag also covers the
+row count and the full query string, so prefer it: a deleted row changes the
+ETag but not necessarily Last-Modified.
+"""
+import hashlib
+from datetime import datetime, time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch, Q
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import permissions, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+from . import availability, stats, utils
+from .models import Booking, Court, Venue, Tournament, TournamentRegistration, TeamMembership
+from .serializers import (BookingSerializer, CourtSerializer, VenueSerializer, TournamentSerializer,
+                          TournamentWithRegistrationsSerializer, requested_fields)
+from .views import _is_admin
+
+
+class Pagination(CursorPagination):
+    page_size = getattr(settings, 'API_PAGE_SIZE', 20)
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class VenuePagination(Pagination):
+    ordering = ('name', 'id')
+
+
+class CourtPagination(Pagination):
+    ordering = ('venue_id', 'name', 'id')
+
+
+class BookingPagination(Pagination):
+    ordering = ('-date', '-start_time', '-id')
+
+
+class UpcomingBookingPagination(Pagination):
+    ordering = ('date', 'start_time', 'id')
+
+
+class TournamentPagination(Pagination):
+    ordering = ('start_date', 'id')
+
+
+class ConditionalGetMixin:
+    """Answer GETs with 304 Not Modified when the client's ETag / Last-Modified still hold."""
+
+    # `updated_at` of the row and of the related rows its representation reads
+    modified_fields = ('updated_at',)
+
+    def validator_queryset(self):
+        """Rows whose newest `modified_fields` and count describe the current list."""
+        return self.filter_queryset(self.get_queryset())
+
+    def list_validators(self):
+        """`(last_modified, extra ETag parts)` for a list response, in one aggregate query."""
+        aggregates = {f'modified_{i}': Max(name) for i, name in enumerate(self.modified_fields)}
+        summary = self.validator_queryset().order_by().aggregate(count=Count('pk'), **aggregates)
+        count = summary.pop('count')
+        return _latest(summary.values()), [count]
+
+    def use_validators(self):
+        """False for responses that depend on rows without an `updated_at`; those are always sent in full."""
+        return True
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_validators():
+            return super().list(request, *args, **kwargs)
+        last_modified, parts = self.list_validators()
+
+        def render():
+            return super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        return self.conditional_get(request, last_modified, parts, render)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not self.use_validators():
+            return super().retrieve(request, *args, **kwargs)
+        instance = self.get_object()
+        last_modified = _latest(_lookup(instance, name) for name in self.modified_fields)
+        return self.conditional_get(request, last_modified, [], lambda: Response(self.get_serializer(instance).data))
+
+    def conditional_get(self, request, last_modified, parts, render):
+        user = request.user.pk if request.user.is_authenticated else ''
+        key = '|'.join(str(part) for part in [
+            request.get_full_path(), request.accepted_media_type, user,
+            last_modified.isoformat() if last_modified else '', *parts,
+        ])
+        etag = 'W/' + quote_etag(hashlib.md5(key.encode()).hexdigest())
+        timestamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = render()
+        response['ETag'] = etag
+        if timestamp is not None:
+            response['Last-Modified'] = http_date(timestamp)
+        # the same URL gives each user their own rows
+        patch_vary_headers(response, ('Authorization', 'Cookie'))
+        return response
+
+
+def _lookup(instance, path):
+    for name in path.split('__'):
+        instance = getattr(instance, name)
+    return instance
+
+
+def _latest(values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+class VenueViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = VenueSerializer
+    pagination_class = VenuePagination
+
+    def get_queryset(self):
+        queryset = Venue.objects.all()
+        wanted = requested_fields(self.request)
+        # skip the annotations (and the courts join) when the client did not ask for them
+        if wanted is None or 'rating' in wanted:
+            queryset = queryset.annotate(average_rating_value=Venue.average_rating_expression())
+        if wanted is None or 'courts_count' in wanted:
+            queryset = queryset.annotate(courts_count=Count('courts', filter=Q(courts__is_active=True)))
+        return queryset
+
+    def validator_queryset(self):
+        # review and court changes bump Venue.updated_at, so the bare table is enough
+        return Venue.objects.all()
+
+
+class CourtViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = CourtSerializer
+    pagination_class = CourtPagination
+    modified_fields = ('updated_at', 'venue__updated_at')
+
+    def _filter(self, queryset):
+        venue = self.request.query_params.get('venue')
+        if venue is None:
+            return queryset
+        if not venue.isdigit():
+            raise ValidationError({'venue': 'Expected a venue id.'})
+        return queryset.filter(venue_id=int(venue))
+
+    def get_queryset(self):
+        return self._filter(Court.objects.filter(is_active=True).select_related('venue'))
+
+    def validator_queryset(self):
+        # inactive courts included: deactivating one bumps its updated_at
+        return self._filter(Court.objects.all())
+
+
+class TournamentViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """Tournaments; administrators also get each one's registrations, as on the tournament page."""
+
+    pagination_class = TournamentPagination
+    modified_fields = ('updated_at', 'venue__updated_at')
+
+    def _with_registrations(self):
+        return _is_admin(self.request.user)
+
+    def get_serializer_class(self):
+        if self._with_registrations():
+            return TournamentWithRegistrationsSerializer
+        return TournamentSerializer
+
+    def get_queryset(self):
+        queryset = Tournament.objects.select_related('venue')
+        if self._with_registrations():
+            # two queries for a whole page: registrations with their teams, then the team sheets
+            registrations = TournamentRegistration.objects.select_related('team').prefetch_related(
+                Prefetch('team__memberships', queryset=TeamMembership.objects.select_related('player'))
+            )
+            queryset = queryset.prefetch_related(Prefetch('registrations', queryset=registrations))
+        return queryset
+
+    def use_validators(self):
+        # team sheets carry no updated_at, so registrations are never answered with 304
+        return not self._with_registrations()
+
+
+class BookingViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
+    """The signed-in user's bookings; `upcoming` and `past` split them at today."""
+
+    serializer_class = BookingSerializer
+    pagination_class = BookingPagination
+    permission_classes = [permissions.IsAuthenticated]
+    modified_fields = ('updated_at', 'court__updated_at', 'court__venue__updated_at')
+
+    ACTIVE_STATUSES = ('pending', 'confirmed')
+
+    def _filter(self, queryset):
+        queryset = queryset.filter(user=self.request.user)
+        upcoming = Q(date__gte=timezone.localdate(), status__in=self.ACTIVE_STATUSES)
+        if self.action == 'upcoming':
+            return queryset.filter(upcoming)
+        if self.action == 'past':
+            return queryset.exclude(upcoming)
+        return queryset
+
+    def get_queryset(self):
+        return self._filter(Booking.objects.select_related('court__venue'))
+
+    def validator_queryset(self):
+        return self._filter(Booking.objects.all())
+
+    def list_validators(self):
+        last_modified, parts = super().list_validators()
+        if self.action in ('upcoming', 'past'):
+            # bookings move from one list to the other at midnight without being saved
+            today = timezone.localdate()
+            midnight = timezone.make_aware(datetime.combine(today, time.min))
+            last_modified = _latest([last_modified, midnight])
+            parts.append(today)
+        return last_modified, parts
+
+    @action(detail=False, pagination_class=UpcomingBookingPagination)
+    def upcoming(self, request):
+        return self.list(request)
+
+    @action(detail=False)
+    def past(self, request):
+        return self.list(request)
+
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None):
+        booking = self.get_object()
+        with transaction.atomic():
+            booking = self.get_queryset().select_for_update().get(pk=booking.pk)
+            if booking.status not in self.ACTIVE_STATUSES or booking.date < timezone.localdate():
+                return Response({'error': 'This booking can no longer be cancelled.'}, status=400)
+            previous_status = booking.status
+            booking.status = 'cancelled'
+            availability.sync_cells(booking, previous_status)
+            booking.save_changed()
+            stats.booking_changed(booking, previous_status)
+            utils.notify_user_booking_status(booking)
+        return Response(self.get_serializer(booking).data)
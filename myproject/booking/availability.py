@@ -0,0 +1,331 @@
+from bisect import bisect_left
+from datetime import time, timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Booking, BookingSlot, Court, CourtOccupancy, SlotHold
+from .pricing import quote_many
+
+
+# statuses that occupy a court; pending bookings have been paid for and are only
+# waiting for admin review, so they keep the slot until they are cancelled
+BLOCKING_STATUSES = ('pending', 'confirmed')
+
+# statuses whose bookings own their BookingSlot cells
+CELL_STATUSES = BLOCKING_STATUSES + ('completed',)
+
+MINUTES_PER_DAY = 24 * 60
+FREE, BUSY = '0', '1'
+
+
+class SlotUnavailable(Exception):
+    """Raised when a slot cannot be claimed; `ranges` lists the clashing (start, end) pairs."""
+
+    def __init__(self, ranges):
+        super().__init__(format_ranges(ranges))
+        self.ranges = ranges
+
+
+def _minutes(value, round_up=False):
+    minutes = value.hour * 60 + value.minute
+    if round_up and (value.second or value.microsecond):
+        minutes += 1
+    return minutes
+
+
+class CourtDayIndex:
+    """Sorted interval list of the occupied time ranges of one court on one day.
+
+    Intervals are kept sorted by start time together with a running maximum of
+    end times, so a conflict lookup is a binary search plus a walk over the
+    intervals that actually overlap - independent of how many bookings the day has.
+    """
+
+    def __init__(self, intervals=()):
+        self.intervals = sorted(intervals)
+        self._starts = [start for start, _ in self.intervals]
+        self._max_end = []
+        running = None
+        for _, end in self.intervals:
+            running = end if running is None or end > running else running
+            self._max_end.append(running)
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def conflicts(self, start_time, end_time):
+        """Return the (start, end) ranges overlapping [start_time, end_time), sorted by start."""
+        found = []
+        # only intervals starting before the requested end can overlap
+        i = bisect_left(self._starts, end_time) - 1
+        while i >= 0 and self._max_end[i] > start_time:
+            start, end = self.intervals[i]
+            if end > start_time:
+                found.append((start, end))
+            i -= 1
+        found.reverse()
+        return found
+
+    def is_free(self, start_time, end_time):
+        return not self.conflicts(start_time, end_time)
+
+
+def active_holds():
+    return SlotHold.objects.filter(expires_at__gt=timezone.now())
+
+
+def load_court_day(court, date, exclude_pk=None, exclude_hold=None):
+    """Build the index for `court` on `date` with a single narrow query.
+
+    Blocking bookings and unexpired slot holds are read together through a UNION.
+    """
+    bookings = Booking.objects.filter(court=court, date=date, status__in=BLOCKING_STATUSES)
+    if exclude_pk:
+        bookings = bookings.exclude(pk=exclude_pk)
+    holds = active_holds().filter(court=court, date=date)
+    if exclude_hold:
+        holds = holds.exclude(pk=exclude_hold)
+    return CourtDayIndex(
+        bookings.order_by().values_list('start_time', 'end_time').union(
+            holds.order_by().values_list('start_time', 'end_time'), all=True
+        )
+    )
+
+
+def find_conflicts(court, date, start_time, end_time, exclude_pk=None, exclude_hold=None):
+    """Return the occupied ranges of `court` on `date` that clash with the requested slot."""
+    index = load_court_day(court, date, exclude_pk=exclude_pk, exclude_hold=exclude_hold)
+    return index.conflicts(start_time, end_time)
+
+
+def hold_slot(user, court, date, start_time, end_time):
+    """Reserve a slot for `user` while they pay.
+
+    Returns `(hold, conflicts)`; `hold` is None when the slot was taken in the
+    meantime. The court row is locked so concurrent holds on it are serialised.
+    """
+    with transaction.atomic():
+        Court.objects.select_for_update().get(pk=court.pk)
+        conflicts = find_conflicts(court, date, start_time, end_time)
+        if conflicts:
+            return None, conflicts
+        hold = SlotHold.objects.create(
+            user=user,
+            court=court,
+            date=date,
+            start_time=start_time,
+            end_time=end_time,
+            expires_at=timezone.now() + timedelta(minutes=getattr(settings, 'SLOT_HOLD_MINUTES', 10)),
+        )
+    return hold, []
+
+
+def release_hold(hold_id):
+    if hold_id:
+        SlotHold.objects.filter(pk=hold_id).delete()
+
+
+def cell_indexes(start_time, end_time):
+    """Indexes of the BookingSlot cells covered by [start_time, end_time), rounded outwards."""
+    size = BookingSlot.SLOT_MINUTES
+    return range(_minutes(start_time) // size, -(-_minutes(end_time, round_up=True) // size))
+
+
+def claim_cells(booking):
+    """Claim the booking's cells with one bulk INSERT.
+
+    The unique constraint rejects the insert if any cell is already taken, in which
+    case nothing is written and SlotUnavailable names the bookings in the way.
+    """
+    cells = [
+        BookingSlot(court_id=booking.court_id, date=booking.date, slot_index=i, booking=booking)
+        for i in cell_indexes(booking.start_time, booking.end_time)
+    ]
+    try:
+        with transaction.atomic():
+            BookingSlot.objects.bulk_create(cells)
+    except IntegrityError:
+        taken = Booking.objects.filter(
+            slot_cells__court_id=booking.court_id,
+            slot_cells__date=booking.date,
+            slot_cells__slot_index__in=[cell.slot_index for cell in cells],
+        ).exclude(pk=booking.pk).distinct().order_by('start_time').values_list('start_time', 'end_time')
+        raise SlotUnavailable(list(taken))
+    mark_occupied(booking.court_id, booking.date, occupancy_mask(booking.start_time, booking.end_time))
+
+
+def release_cells(bookings):
+    """Free the cells of a booking or a queryset of bookings."""
+    if isinstance(bookings, Booking):
+        cells = BookingSlot.objects.filter(booking=bookings)
+    else:
+        cells = BookingSlot.objects.filter(booking__in=bookings)
+    days = set(cells.order_by().values_list('court_id', 'date').distinct())
+    cells.delete()
+    refresh_occupancy(days)
+
+
+def sync_cells(booking, previous_status):
+    """Claim or release cells after `booking` moved from `previous_status` to its current status."""
+    if booking.status in CELL_STATUSES and previous_status not in CELL_STATUSES:
+        claim_cells(booking)
+    elif booking.status not in CELL_STATUSES and previous_status in CELL_STATUSES:
+        release_cells(booking)
+
+
+def occupancy_mask(start_time, end_time):
+    """CourtOccupancy bits covered by [start_time, end_time), rounded outwards to half hours."""
+    size = CourtOccupancy.SLOT_MINUTES
+    first = _minutes(start_time) // size
+    last = -(-_minutes(end_time, round_up=True) // size)
+    return ((1 << (last - first)) - 1) << first
+
+
+def mark_occupied(court_id, date, mask):
+    """OR `mask` into the court's bitmap for `date`, creating the row on first use."""
+    if CourtOccupancy.objects.filter(court_id=court_id, date=date).update(bits=F('bits').bitor(mask)):
+        return
+    try:
+        with transaction.atomic():
+            CourtOccupancy.objects.create(court_id=court_id, date=date, bits=mask)
+    except IntegrityError:
+        # created concurrently in the meantime
+        CourtOccupancy.objects.filter(court_id=court_id, date=date).update(bits=F('bits').bitor(mask))
+
+
+def refresh_occupancy(days):
+    """Rebuild the bitmaps of the given (court_id, date) pairs from their BookingSlot cells.
+
+    Clearing bits cannot be done incrementally because neighbouring bookings may
+    share a half hour, so removals recompute the affected days instead.
+    """
+    days = set(days)
+    if not days:
+        return
+    court_ids = {court_id for court_id, _ in days}
+    dates = {day for _, day in days}
+    bits = dict.fromkeys(days, 0)
+    cells = BookingSlot.objects.filter(court_id__in=court_ids, date__in=dates).order_by()
+    for court_id, day, slot_index in cells.values_list('court_id', 'date', 'slot_index'):
+        if (court_id, day) in bits:
+            bits[(court_id, day)] |= 1 << (slot_index * BookingSlot.SLOT_MINUTES // CourtOccupancy.SLOT_MINUTES)
+
+    existing = {
+        (row.court_id, row.date): row
+        for row in CourtOccupancy.objects.filter(court_id__in=court_ids, date__in=dates)
+        if (row.court_id, row.date) in bits
+    }
+    for key, row in existing.items():
+        row.bits = bits[key]
+    CourtOccupancy.objects.bulk_update(existing.values(), ['bits'])
+    CourtOccupancy.objects.bulk_create(
+        [CourtOccupancy(court_id=court_id, date=day, bits=value)
+         for (court_id, day), value in bits.items() if (court_id, day) not in existing],
+        ignore_conflicts=True,
+    )
+
+
+def free_courts(date, start_time, end_time, city=None):
+    """Active courts (in `city`, if given) with nothing booked in [start_time, end_time) on `date`.
+
+    Answered from the occupancy bitmaps and the unexpired holds with a single
+    query; the half-hour granularity can report a court as busy when a booking
+    only touches part of a half hour, never the other way round.
+    """
+    mask = occupancy_mask(start_time, end_time)
+    busy = CourtOccupancy.objects.filter(date=date).annotate(clash=F('bits').bitand(mask)).exclude(clash=0)
+    held = active_holds().filter(date=date, start_time__lt=end_time, end_time__gt=start_time)
+    courts = (
+        Court.objects.filter(is_active=True)
+        .exclude(pk__in=busy.values('court_id'))
+        .exclude(pk__in=held.values('court_id'))
+        .select_related('venue')
+    )
+    if city:
+        courts = courts.filter(venue__city__iexact=city)
+    return courts.order_by('venue__name', 'name')
+
+
+def expire_holds():
+    """Delete every expired hold in one statement and return how many were removed."""
+    deleted, _ = SlotHold.objects.filter(expires_at__lte=timezone.now()).delete()
+    return deleted
+
+
+def format_ranges(ranges):
+    return ', '.join(f"{start.strftime('%H:%M')} - {end.strftime('%H:%M')}" for start, end in ranges)
+
+
+def free_slot_grid(start_date, end_date, slot_minutes=60, venue=None, city=None, with_prices=False):
+    """Free/busy grid for every active court of `venue` (or of all venues in `city`).
+
+    All bookings in the date range are fetched with a single query. Each court gets
+    one string per day with a character per slot: '0' when the slot is free, '1'
+    when any blocking booking or active hold touches it. With `with_prices` each
+    court also gets the price of every slot, computed from its cached pricing table.
+    """
+    if MINUTES_PER_DAY % slot_minutes:
+        raise ValueError('slot_minutes must divide a day evenly')
+    courts = Court.objects.filter(is_active=True).select_related('venue')
+    if venue is not None:
+        courts = courts.filter(venue=venue)
+    elif city:
+        courts = courts.filter(venue__city__iexact=city)
+    courts = list(courts.order_by('venue__name', 'name'))
+
+    slots_per_day = MINUTES_PER_DAY // slot_minutes
+    days = [start_date + timedelta(days=n) for n in range((end_date - start_date).days + 1)]
+    cells = {(court.id, day): bytearray(FREE * slots_per_day, 'ascii') for court in courts for day in days}
+
+    court_ids = [court.id for court in courts]
+    fields = ('court_id', 'date', 'start_time', 'end_time')
+    rows = Booking.objects.filter(
+        court__in=court_ids,
+        date__range=(start_date, end_date),
+        status__in=BLOCKING_STATUSES,
+    ).order_by().values_list(*fields).union(
+        active_holds().filter(court__in=court_ids, date__range=(start_date, end_date)).order_by().values_list(*fields),
+        all=True,
+    )
+    busy = ord(BUSY)
+    for court_id, day, start_time, end_time in rows:
+        row = cells[(court_id, day)]
+        first = _minutes(start_time) // slot_minutes
+        last = -(-_minutes(end_time, round_up=True) // slot_minutes)
+        for i in range(first, min(last, slots_per_day)):
+            row[i] = busy
+
+    result = []
+    for court in courts:
+        entry = {
+            'id': court.id,
+            'name': court.name,
+            'venue_id': court.venue_id,
+            'venue': court.venue.name,
+            'days': {str(day): cells[(court.id, day)].decode('ascii') for day in days},
+        }
+        if with_prices:
+            entry['prices'] = _grid_prices(court, days, slot_minutes, slots_per_day)
+        result.append(entry)
+    return {
+        'start_date': str(start_date),
+        'end_date': str(end_date),
+        'slot_minutes': slot_minutes,
+        'courts': result,
+    }
+
+
+def _grid_prices(court, days, slot_minutes, slots_per_day):
+    bounds = [
+        (time(i * slot_minutes // 60, i * slot_minutes % 60),
+         time((i + 1) * slot_minutes // 60 % 24, (i + 1) * slot_minutes % 60))
+        for i in range(slots_per_day)
+    ]
+    prices = quote_many(court, [(day, start, end) for day in days for start, end in bounds])
+    return {
+        str(day): [str(price) for price in prices[n * slots_per_day:(n + 1) * slots_per_day]]
+        for n, day in enumerate(days)
+    }
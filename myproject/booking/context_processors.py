@@ -1,6 +1,6 @@
-from django.utils import timezone
+from django.utils.functional import SimpleLazyObject
 
-from .models import Advertisement
+from . import ads
 
 
 def active_ads(request):
@@ -10,16 +10,9 @@ def active_ads(request):
     - is_active is True
     - current date is between start_date and end_date (inclusive)
 
-    Templates can use the returned dict to render ads based on the configured position.
+    `active_ads` maps each position to its ads. It is only resolved when a
+    template reads it, from the process-wide snapshot in `booking.ads`.
     """
-    today = timezone.now().date()
-    active_ads_qs = Advertisement.objects.filter(is_active=True, start_date__lte=today, end_date__gte=today)
-
-    # Group by position for easier template usage:
-    ads_by_position = {choice[0]: [] for choice in Advertisement.POSITION_CHOICES}
-    for ad in active_ads_qs:
-        ads_by_position.setdefault(ad.position, []).append(ad)
-
     return {
-        'active_ads': ads_by_position,
+        'active_ads': SimpleLazyObject(ads.active_by_position),
     }
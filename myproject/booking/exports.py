@@ -0,0 +1,137 @@
+"""Streaming CSV / JSON Lines exports of bookings and payments.
+
+Rows are read with `values_list(...).iterator(chunk_size)` and encoded one at a
+time, so memory stays flat no matter how many rows are exported. Used by the
+booking/payment admin actions and `manage.py export_bookings`.
+"""
+import csv
+import json
+import zlib
+
+from django.db.models import Q
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Booking, Payment
+
+
+CHUNK_SIZE = 2000
+
+# (column, lookup) pairs read with values_list()
+BOOKING_COLUMNS = (
+    ('id', 'pk'),
+    ('user', 'user__email'),
+    ('venue', 'court__venue__name'),
+    ('court', 'court__name'),
+    ('date', 'date'),
+    ('start_time', 'start_time'),
+    ('end_time', 'end_time'),
+    ('players', 'number_of_players'),
+    ('total_price', 'total_price'),
+    ('status', 'status'),
+    ('created_at', 'created_at'),
+)
+PAYMENT_COLUMNS = (
+    ('id', 'pk'),
+    ('transaction_id', 'transaction_id'),
+    ('transaction_type', 'transaction_type'),
+    ('user', 'user__email'),
+    ('booking_id', 'booking_id'),
+    ('venue', 'booking__court__venue__name'),
+    ('amount', 'amount'),
+    ('payment_method', 'payment_method'),
+    ('status', 'status'),
+    ('admin_approved', 'admin_approved'),
+    ('created_at', 'created_at'),
+)
+EXPORTS = {
+    'bookings': (Booking, BOOKING_COLUMNS),
+    'payments': (Payment, PAYMENT_COLUMNS),
+}
+FORMATS = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+}
+
+
+def filtered(kind, start=None, end=None, venue=None, status=None):
+    """Queryset of `kind` ('bookings' or 'payments') narrowed by the optional filters.
+
+    Bookings are filtered on their play date, payments on the day they were made.
+    `venue` is a Venue or its pk.
+    """
+    model, _ = EXPORTS[kind]
+    queryset = model.objects.all()
+    date_field = 'date' if kind == 'bookings' else 'created_at__date'
+    if start:
+        queryset = queryset.filter(**{f'{date_field}__gte': start})
+    if end:
+        queryset = queryset.filter(**{f'{date_field}__lte': end})
+    if venue:
+        if kind == 'bookings':
+            queryset = queryset.filter(court__venue=venue)
+        else:
+            queryset = queryset.filter(Q(booking__court__venue=venue) | Q(tournament__venue=venue)
+                                       | Q(registration__tournament__venue=venue))
+    if status:
+        queryset = queryset.filter(status=status)
+    return queryset
+
+
+def rows(queryset, columns, chunk_size=CHUNK_SIZE):
+    # a stable order so consecutive monthly dumps diff cleanly
+    lookups = [lookup for _, lookup in columns]
+    return queryset.order_by('pk').values_list(*lookups).iterator(chunk_size=chunk_size)
+
+
+class _Echo:
+    """File-like object whose write() hands back the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _value(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def iter_csv(queryset, columns, chunk_size=CHUNK_SIZE):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in columns])
+    for row in rows(queryset, columns, chunk_size):
+        yield writer.writerow([_value(value) for value in row])
+
+
+def iter_jsonl(queryset, columns, chunk_size=CHUNK_SIZE):
+    names = [name for name, _ in columns]
+    for row in rows(queryset, columns, chunk_size):
+        yield json.dumps(dict(zip(names, map(_value, row))), default=str) + '\n'
+
+
+def iter_export(queryset, columns, fmt='csv', compress=False, chunk_size=CHUNK_SIZE):
+    """Encoded chunks (bytes) of the export, gzip-compressed on the fly when `compress`."""
+    lines = iter_csv(queryset, columns, chunk_size) if fmt == 'csv' else iter_jsonl(queryset, columns, chunk_size)
+    if not compress:
+        for line in lines:
+            yield line.encode('utf-8')
+        return
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(wbits=31)
+    for line in lines:
+        chunk = compressor.compress(line.encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+def streaming_response(kind, queryset, fmt='csv', compress=False):
+    _, columns = EXPORTS[kind]
+    filename = f"{kind}-{timezone.localdate():%Y-%m-%d}.{fmt}" + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        iter_export(queryset, columns, fmt, compress),
+        content_type='application/gzip' if compress else FORMATS[fmt],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
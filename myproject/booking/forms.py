@@ -1,7 +1,10 @@
 from django import forms
 from django.db.models import Q
 from datetime import datetime, timedelta
-from .models import Booking, Court, Advertisement, Tournament, Payment
+from .models import Booking, Court, Advertisement, Tournament, Payment, RecurringBooking
+from . import availability
+from . import recurring
+from . import players
 
 
 class BookingForm(forms.ModelForm):
@@ -45,23 +48,12 @@ class BookingForm(forms.ModelForm):
                 errors.append(f'Court capacity is {court.capacity} players. You cannot book for {number_of_players} players.')
         
         # Check for booking conflicts (overlapping bookings on same court)
+        self.court_day = None
         if court and date and start_time and end_time:
-            # Find all confirmed bookings on the same court and date
-            conflicting_bookings = Booking.objects.filter(
-                court=court,
-                date=date,
-                status='confirmed'
-            ).exclude(pk=self.instance.pk if self.instance.pk else None)
-            
-            # Check if any booking overlaps with the requested time
-            conflicts = []
-            for booking in conflicting_bookings:
-                # Check if there's time overlap
-                if not (end_time <= booking.start_time or start_time >= booking.end_time):
-                    conflicts.append(f"{booking.start_time.strftime('%H:%M')} - {booking.end_time.strftime('%H:%M')}")
-            
+            self.court_day = availability.load_court_day(court, date, exclude_pk=self.instance.pk)
+            conflicts = self.court_day.conflicts(start_time, end_time)
             if conflicts:
-                booked_times = ', '.join(conflicts)
+                booked_times = availability.format_ranges(conflicts)
                 errors.append(f'Court is already booked for this date at: {booked_times}. Please choose a different time slot.')
         
         if errors:
@@ -69,6 +61,78 @@ class BookingForm(forms.ModelForm):
         
         return cleaned
 
+class RecurringBookingForm(forms.ModelForm):
+    number_of_players = forms.IntegerField(min_value=1, max_value=12, required=True)
+    skip_dates = forms.CharField(
+        required=False,
+        widget=forms.TextInput(attrs={'placeholder': 'YYYY-MM-DD, YYYY-MM-DD'}),
+        help_text='Comma separated dates to leave out (holidays, finals day, ...)'
+    )
+    payment_method = forms.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES)
+
+    class Meta:
+        model = RecurringBooking
+        fields = ('court', 'start_date', 'end_date', 'interval_weeks', 'start_time', 'end_time')
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+            'start_time': forms.TimeInput(attrs={'type': 'time'}),
+            'end_time': forms.TimeInput(attrs={'type': 'time'}),
+        }
+
+    def clean_skip_dates(self):
+        raw = self.cleaned_data.get('skip_dates', '')
+        dates = []
+        for part in raw.split(','):
+            part = part.strip()
+            if not part:
+                continue
+            try:
+                dates.append(datetime.strptime(part, '%Y-%m-%d').date())
+            except ValueError:
+                raise forms.ValidationError(f'"{part}" is not a valid date (use YYYY-MM-DD).')
+        return dates
+
+    def clean(self):
+        cleaned = super().clean()
+        court = cleaned.get('court')
+        start_date = cleaned.get('start_date')
+        end_date = cleaned.get('end_date')
+        start_time = cleaned.get('start_time')
+        end_time = cleaned.get('end_time')
+        number_of_players = cleaned.get('number_of_players')
+
+        errors = []
+
+        if start_time and end_time:
+            if start_time >= end_time:
+                errors.append('End time must be after start time.')
+            else:
+                duration_hours = (datetime.combine(datetime.min, end_time) - datetime.combine(datetime.min, start_time)).total_seconds() / 3600
+                if duration_hours < 0.5:
+                    errors.append('Booking duration must be at least 30 minutes.')
+                elif duration_hours > 4:
+                    errors.append('Booking duration cannot exceed 4 hours.')
+
+        if court and number_of_players and number_of_players > court.capacity:
+            errors.append(f'Court capacity is {court.capacity} players. You cannot book for {number_of_players} players.')
+
+        if start_date and end_date:
+            if end_date < start_date:
+                errors.append('End date must be on or after the start date.')
+            else:
+                dates = recurring.occurrence_dates(start_date, end_date, cleaned.get('interval_weeks') or 1, cleaned.get('skip_dates') or [])
+                if not dates:
+                    errors.append('The series has no dates left to book.')
+                elif len(dates) > recurring.MAX_OCCURRENCES:
+                    errors.append(f'A series can have at most {recurring.MAX_OCCURRENCES} bookings.')
+
+        if errors:
+            raise forms.ValidationError(errors)
+
+        return cleaned
+
+
 class AdvertisementForm(forms.ModelForm):
     payment_method = forms.ChoiceField(
         choices=Payment.PAYMENT_METHOD_CHOICES,
@@ -148,6 +212,13 @@ class TournamentRegistrationForm(forms.Form):
     payment_method = forms.ChoiceField(choices=Payment.PAYMENT_METHOD_CHOICES, widget=forms.Select(attrs={'class': 'form-input'}))
     payment_proof = forms.FileField(required=True)
 
+    def clean_player_list(self):
+        # parsed into (name, phone) pairs; the view checks them against the tournament's other teams
+        entries = players.parse_player_list(self.cleaned_data.get('player_list', ''))
+        if not entries:
+            raise forms.ValidationError('List at least one player.')
+        return entries
+
     def clean_contact_number(self):
         number = self.cleaned_data.get('contact_number', '')
         if not number.isdigit():
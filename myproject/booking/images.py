@@ -0,0 +1,137 @@
+"""Resized, re-encoded copies of uploaded posters, logos and ad images.
+
+Each source image gets one derivative per entry of `WIDTHS`. Derivatives are
+re-encoded with Pillow, so camera EXIF data (GPS position included) is not
+copied, and the orientation tag is applied to the pixels first. They are stored
+under `derivatives/<sha256 of the source>/`, so identical uploads share files and
+a changed upload never reuses a stale URL. What was produced is recorded in the
+model's `<field>_derivatives` JSON column, which the `{% srcset %}` template tag
+reads.
+
+Work happens out of band. Saving a model hands stale images to a small thread
+pool once the transaction commits; see `IMAGE_DERIVATIVE_THREADS`. The
+`generate_image_derivatives` command backfills or repairs everything with a
+process pool. This module does not import models at load time, so pool workers
+can import `render` without setting Django up.
+"""
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+
+
+# (label, width in pixels); images are never scaled up
+WIDTHS = (
+    ('thumb', 320),
+    ('card', 640),
+    ('full', 1280),
+)
+JPEG_QUALITY = 82
+
+_executor = None
+
+
+def image_fields():
+    """`(model, field name)` for every image that gets derivatives."""
+    from .models import Advertisement, Sponsor, Tournament
+    return [(Tournament, 'poster'), (Sponsor, 'logo'), (Advertisement, 'image')]
+
+
+def derivatives_attname(field_name):
+    return f'{field_name}_derivatives'
+
+
+def render(name, storage=None):
+    """Write the derivatives of the stored image `name` and describe them.
+
+    Returns `{'source': name, 'digest': ..., '<label>': {'name', 'width', 'height'}, ...}`,
+    or `{'source': name, 'error': ...}` when the file cannot be read as an image.
+    Touches storage only, never the database.
+    """
+    from PIL import Image, ImageOps, UnidentifiedImageError
+
+    storage = storage or default_storage
+    try:
+        with storage.open(name, 'rb') as source:
+            data = source.read()
+        image = Image.open(BytesIO(data))
+        image = ImageOps.exif_transpose(image)
+    except (OSError, UnidentifiedImageError, Image.DecompressionBombError) as exc:
+        return {'source': name, 'error': f"{type(exc).__name__}: {exc}"}
+
+    digest = hashlib.sha256(data).hexdigest()
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+    if has_alpha:
+        image, fmt, ext, options = image.convert('RGBA'), 'PNG', 'png', {'optimize': True}
+    else:
+        image, fmt, ext, options = image.convert('RGB'), 'JPEG', 'jpg', {
+            'quality': JPEG_QUALITY, 'optimize': True, 'progressive': True,
+        }
+
+    result = {'source': name, 'digest': digest}
+    for label, width in WIDTHS:
+        width = min(width, image.width)
+        height = max(1, round(image.height * width / image.width))
+        target = f'derivatives/{digest[:2]}/{digest}/{label}-{width}.{ext}'
+        if not storage.exists(target):
+            resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+            out = BytesIO()
+            # a fresh encode carries no EXIF unless it is passed in
+            resized.save(out, fmt, **options)
+            target = storage.save(target, ContentFile(out.getvalue()))
+        result[label] = {'name': target, 'width': width, 'height': height}
+    return result
+
+
+def is_stale(file, derivatives):
+    if not file:
+        return bool(derivatives)
+    return derivatives.get('source') != file.name
+
+
+def store(model, pk, field_name, source, derivatives):
+    """Record `derivatives` unless the image was replaced in the meantime. Returns True if written."""
+    if source:
+        unchanged = Q(**{field_name: source})
+    else:
+        unchanged = Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True})
+    return bool(model.objects.filter(unchanged, pk=pk).update(**{derivatives_attname(field_name): derivatives}))
+
+
+def process(model, pk, field_name):
+    """Bring the derivatives of one row's image up to date."""
+    source = model.objects.filter(pk=pk).values_list(field_name, flat=True).first()
+    derivatives = render(source) if source else {}
+    return store(model, pk, field_name, source, derivatives)
+
+
+def schedule_stale(instance, field_name):
+    """After commit, regenerate the derivatives of `instance`'s image if it changed."""
+    if not is_stale(getattr(instance, field_name), getattr(instance, derivatives_attname(field_name))):
+        return
+    threads = getattr(settings, 'IMAGE_DERIVATIVE_THREADS', 1)
+    if not threads:
+        # left for `manage.py generate_image_derivatives`
+        return
+    model, pk = type(instance), instance.pk
+    transaction.on_commit(lambda: _submit(threads, model, pk, field_name))
+
+
+def _submit(threads, model, pk, field_name):
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix='image-derivatives')
+    _executor.submit(_process_in_thread, model, pk, field_name)
+
+
+def _process_in_thread(model, pk, field_name):
+    try:
+        process(model, pk, field_name)
+    finally:
+        # each thread opens its own connection; do not leave it dangling
+        connection.close()
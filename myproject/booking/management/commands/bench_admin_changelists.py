@@ -0,0 +1,82 @@
+import time
+from datetime import date, time as dtime, timedelta
+
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from booking.models import Booking, Court, Tournament, Venue
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed N rows per model, render the venue, court, booking and tournament admin changelists '
+        'and report queries and time per page. Everything is rolled back afterwards.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000, help='Rows seeded per model')
+        parser.add_argument('--repeat', type=int, default=3, help='Renders per page; the fastest is reported')
+
+    def handle(self, *args, **options):
+        rows = options['rows']
+        with transaction.atomic():
+            superuser = self._seed(rows)
+            factory = RequestFactory()
+            self.stdout.write(f"{'changelist':<30} {'rows':>8} {'queries':>8} {'ms/page':>10}")
+            for model, params in (
+                (Venue, {}),
+                (Venue, {'o': '5'}),  # sorted by the court count annotation
+                (Court, {}),
+                (Court, {'o': '6'}),  # sorted by the booking count annotation
+                (Booking, {}),
+                (Tournament, {}),
+            ):
+                label = model._meta.model_name + (f" ?o={params['o']}" if params else '')
+                queries, ms = self._render(factory, superuser, model, params, options['repeat'])
+                self.stdout.write(f"{label:<30} {model.objects.count():>8} {queries:>8} {ms:>10.1f}")
+            transaction.set_rollback(True)
+
+    def _seed(self, rows):
+        User = get_user_model()
+        superuser = User.objects.create_superuser(email='bench-admin@example.com', password=None)
+        users = User.objects.bulk_create([User(email=f'bench{i}@example.com') for i in range(100)])
+        venues = Venue.objects.bulk_create([Venue(name=f'Venue {i}', city=f'City {i % 50}') for i in range(rows)])
+        courts = Court.objects.bulk_create([Court(venue=venues[i], name=f'Court {i}') for i in range(rows)])
+        Booking.objects.bulk_create([
+            Booking(
+                user=users[i % len(users)],
+                court=courts[i % len(courts)],
+                date=date(2030, 1, 1) + timedelta(days=i // len(courts)),
+                start_time=dtime(10, 0),
+                end_time=dtime(11, 0),
+                status='confirmed',
+            )
+            for i in range(rows)
+        ])
+        Tournament.objects.bulk_create([
+            Tournament(
+                name=f'Tournament {i}', description='', venue=venues[i], start_date=date(2030, 1, 1),
+                end_date=date(2030, 1, 2), start_time=dtime(9, 0), contact_person='Bench',
+                contact_email='bench@example.com', contact_phone='0',
+            )
+            for i in range(rows)
+        ])
+        return superuser
+
+    def _render(self, factory, user, model, params, repeat):
+        model_admin = admin.site._registry[model]
+        best_ms, queries = None, 0
+        for _ in range(repeat):
+            request = factory.get(f'/admin/{model._meta.app_label}/{model._meta.model_name}/', params)
+            request.user = user
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                model_admin.changelist_view(request).render()
+                ms = (time.perf_counter() - started) * 1000
+            queries = len(ctx.captured_queries)
+            best_ms = ms if best_ms is None else min(best_ms, ms)
+        return queries, best_ms
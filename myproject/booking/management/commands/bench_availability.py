@@ -0,0 +1,74 @@
+import random
+import time
+from datetime import time as dtime
+
+from django.core.management.base import BaseCommand
+
+from booking.availability import CourtDayIndex
+
+
+DAY_US = 24 * 60 * 60 * 1000000
+
+
+def _us_to_time(us):
+    seconds, micro = divmod(us, 1000000)
+    return dtime(seconds // 3600, seconds // 60 % 60, seconds % 60, micro)
+
+
+def _day_intervals(count, rng):
+    """Split a day into `count` back-to-back bookings with small random gaps.
+
+    Confirmed bookings on a court never overlap each other, so this is the shape
+    the index sees in production, just denser.
+    """
+    width = DAY_US // count
+    intervals = []
+    for i in range(count):
+        start = i * width
+        intervals.append((_us_to_time(start), _us_to_time(start + rng.randrange(width // 2, width))))
+    return intervals, width
+
+
+def _linear_conflicts(intervals, start_time, end_time):
+    # the per-row loop BookingForm.clean used before the index existed
+    return [(s, e) for s, e in intervals if not (end_time <= s or start_time >= e)]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark conflict-check latency of the court/day availability index as bookings per day grow.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,100,1000,10000', help='Comma separated bookings-per-court/day counts')
+        parser.add_argument('--lookups', type=int, default=2000, help='Conflict checks per size')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        lookups = options['lookups']
+        sizes = [int(s) for s in options['sizes'].split(',') if s.strip()]
+
+        self.stdout.write(f"{'bookings':>10} {'build ms':>10} {'index us/check':>15} {'loop us/check':>15}")
+        for size in sizes:
+            intervals, width = _day_intervals(size, rng)
+            # probe with slots as long as one booking so every check touches at most
+            # a couple of intervals and the timing reflects the lookup itself
+            probes = []
+            for _ in range(lookups):
+                start = rng.randrange(0, DAY_US - width)
+                probes.append((_us_to_time(start), _us_to_time(start + width)))
+
+            started = time.perf_counter()
+            index = CourtDayIndex(intervals)
+            build_ms = (time.perf_counter() - started) * 1000
+
+            started = time.perf_counter()
+            for start_time, end_time in probes:
+                index.conflicts(start_time, end_time)
+            index_us = (time.perf_counter() - started) / lookups * 1e6
+
+            started = time.perf_counter()
+            for start_time, end_time in probes:
+                _linear_conflicts(intervals, start_time, end_time)
+            loop_us = (time.perf_counter() - started) / lookups * 1e6
+
+            self.stdout.write(f"{size:>10} {build_ms:>10.2f} {index_us:>15.2f} {loop_us:>15.2f}")
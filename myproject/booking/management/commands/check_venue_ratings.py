@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+
+from booking.models import Review, Venue
+
+
+class Command(BaseCommand):
+    help = "Compare each venue's stored review_count/rating_sum with its reviews; --fix recomputes the drifted ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite the totals of venues that have drifted')
+
+    def handle(self, *args, **options):
+        actual = {
+            row['venue']: (row['n'], row['total'])
+            for row in Review.objects.order_by().values('venue').annotate(n=Count('pk'), total=Sum('rating'))
+        }
+        drifted = []
+        for pk, name, count, total in Venue.objects.values_list('pk', 'name', 'review_count', 'rating_sum').iterator():
+            expected = actual.get(pk, (0, 0))
+            if (count, total) != expected:
+                drifted.append(pk)
+                self.stdout.write(f'{name} (id={pk}): stored {count} reviews / sum {total}, '
+                                  f'actual {expected[0]} / {expected[1]}')
+
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('All venue rating totals are consistent.'))
+        elif options['fix']:
+            Venue.refresh_review_totals(drifted)
+            self.stdout.write(self.style.SUCCESS(f'Fixed {len(drifted)} venue(s).'))
+        else:
+            raise CommandError(f'{len(drifted)} venue(s) have drifted; rerun with --fix.')
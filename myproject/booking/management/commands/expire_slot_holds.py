@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from booking.availability import expire_holds
+
+
+class Command(BaseCommand):
+    help = 'Delete expired slot holds in bulk. Safe to run from cron every minute.'
+
+    def handle(self, *args, **options):
+        deleted = expire_holds()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} expired hold(s) removed.'))
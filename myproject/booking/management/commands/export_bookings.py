@@ -0,0 +1,52 @@
+import argparse
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import exports
+
+
+def _date(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid date {value!r}; use YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Stream bookings or payments to a CSV / JSON Lines file (or stdout), optionally gzipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('kind', choices=sorted(exports.EXPORTS), help='What to export')
+        parser.add_argument('--format', choices=sorted(exports.FORMATS), default='csv')
+        parser.add_argument('--from', dest='start', type=_date, help='First day (YYYY-MM-DD)')
+        parser.add_argument('--to', dest='end', type=_date, help='Last day (YYYY-MM-DD)')
+        parser.add_argument('--venue', type=int, help='Venue id')
+        parser.add_argument('--status')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--chunk-size', type=int, default=exports.CHUNK_SIZE, help='Rows fetched per database round trip')
+        parser.add_argument('-o', '--output', help='File to write (default stdout)')
+
+    def handle(self, *args, **options):
+        kind = options['kind']
+        queryset = exports.filtered(kind, options['start'], options['end'], options['venue'], options['status'])
+        _, columns = exports.EXPORTS[kind]
+        chunks = exports.iter_export(queryset, columns, options['format'], options['gzip'], options['chunk_size'])
+
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                written = self._write(chunks, out)
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}."))
+        else:
+            out = getattr(self.stdout, 'buffer', None)
+            if out is None:
+                raise CommandError('stdout does not accept bytes here; use --output')
+            self._write(chunks, out)
+
+    def _write(self, chunks, out):
+        written = 0
+        for chunk in chunks:
+            out.write(chunk)
+            written += len(chunk)
+        out.flush()
+        return written
@@ -0,0 +1,63 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from booking import images
+
+
+class Command(BaseCommand):
+    help = (
+        'Generate the resized derivatives of tournament posters, sponsor logos and ad images '
+        'that are missing or out of date, rendering in parallel worker processes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='Worker processes (1 renders inline)')
+        parser.add_argument('--force', action='store_true', help='Regenerate every image, not only stale ones')
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry images that failed to decode before')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        # rows per source file: several rows may point at the same upload
+        jobs = {}
+        cleared = 0
+        for model, field_name in images.image_fields():
+            attname = images.derivatives_attname(field_name)
+            for pk, name, derivatives in model.objects.values_list('pk', field_name, attname).iterator():
+                derivatives = derivatives or {}
+                if not name:
+                    if derivatives:
+                        cleared += images.store(model, pk, field_name, name, {})
+                    continue
+                stale = derivatives.get('source') != name or ('error' in derivatives and options['retry_failed'])
+                if stale or options['force']:
+                    jobs.setdefault(name, []).append((model, pk, field_name))
+
+        names = sorted(jobs)
+        if options['workers'] > 1 and len(names) > 1:
+            # workers only read and write media; no database connection may cross the fork
+            connections.close_all()
+            with ProcessPoolExecutor(max_workers=options['workers']) as pool:
+                results = pool.map(images.render, names, chunksize=4)
+                written, failed = self._store(jobs, zip(names, results))
+        else:
+            written, failed = self._store(jobs, ((name, images.render(name)) for name in names))
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Rendered {len(names)} image(s) for {written} row(s) in {elapsed:.1f}s; '
+            f'{failed} could not be decoded, {cleared} cleared.'
+        ))
+
+    def _store(self, jobs, results):
+        written = failed = 0
+        for name, derivatives in results:
+            if 'error' in derivatives:
+                failed += 1
+                self.stderr.write(f"{name}: {derivatives['error']}")
+            for model, pk, field_name in jobs[name]:
+                written += images.store(model, pk, field_name, name, derivatives)
+        return written, failed
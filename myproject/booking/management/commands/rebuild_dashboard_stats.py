@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import stats
+
+
+class Command(BaseCommand):
+    help = 'Recompute the dashboard statistics rollup from bookings and registrations, reporting any drift.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only compare; exit with an error if the rollup has drifted')
+
+    def handle(self, *args, **options):
+        mismatches = stats.check()
+        for (day, venue_id), (stored, expected) in sorted(mismatches.items(), key=lambda item: (item[0][0], item[0][1])):
+            changed = ', '.join(
+                f'{field} {stored[field]} != {expected[field]}'
+                for field in stats.COUNTER_FIELDS if stored[field] != expected[field]
+            )
+            self.stdout.write(f'{day} venue {venue_id}: {changed}')
+
+        if options['check']:
+            if mismatches:
+                raise CommandError(f'{len(mismatches)} dashboard stats row(s) out of date.')
+            self.stdout.write(self.style.SUCCESS('Dashboard stats are consistent.'))
+            return
+
+        rows = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(f'{len(mismatches)} row(s) had drifted; rebuilt {rows} row(s).'))
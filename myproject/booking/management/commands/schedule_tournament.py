@@ -0,0 +1,61 @@
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from booking import scheduling
+from booking.models import Tournament
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a tournament's fixtures from its approved teams and book them on the venue's free court time."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='Tournament id')
+        parser.add_argument('--format', choices=scheduling.FORMATS, default=scheduling.ROUND_ROBIN)
+        parser.add_argument('--match-minutes', type=int, default=60)
+        parser.add_argument('--rest-minutes', type=int, default=30, help='Minimum break for a team between matches')
+        parser.add_argument('--group-size', type=int, default=4)
+        parser.add_argument('--qualifiers', type=int, default=2, help='Teams per group going through to the knockout')
+        parser.add_argument('--user', help='Email of the account that owns the bookings (default ADMIN_EMAIL)')
+        parser.add_argument('--replace', action='store_true', help='Cancel the existing fixtures and schedule again')
+        parser.add_argument('--dry-run', action='store_true', help='Print the fixtures without booking anything')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.select_related('venue').get(pk=options['tournament'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Tournament {options['tournament']} does not exist.")
+        email = options['user'] or getattr(settings, 'ADMIN_EMAIL', '')
+        user = get_user_model().objects.filter(email=email).first()
+        if user is None:
+            raise CommandError(f'No user with email {email!r}; pass --user.')
+
+        started = time.perf_counter()
+        try:
+            placed = scheduling.schedule_tournament(
+                tournament, user,
+                format=options['format'],
+                match_minutes=options['match_minutes'],
+                rest_minutes=options['rest_minutes'],
+                group_size=options['group_size'],
+                qualifiers_per_group=options['qualifiers'],
+                replace=options['replace'],
+                commit=not options['dry_run'],
+            )
+        except scheduling.SchedulingError as exc:
+            raise CommandError(str(exc))
+        elapsed = (time.perf_counter() - started) * 1000
+
+        for match in sorted(placed, key=lambda m: m.number):
+            if options['dry_run']:
+                day, start_time, _ = scheduling.slot_of(match, tournament.start_date)
+                home, away = match.home[1], match.away[1]
+            else:
+                day, start_time, home, away = match.date, match.start_time, match.home_label, match.away_label
+            self.stdout.write(f'M{match.number:<4} court {match.court_id:<5} {day} {start_time:%H:%M}  {home} v {away}')
+        verb = 'Planned' if options['dry_run'] else 'Booked'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {len(placed)} match(es) in {elapsed:.0f} ms.'))
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued email/SMS notifications from the outbox in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=5, help='Give up on a notification after this many tries')
+        parser.add_argument('--loop', action='store_true', help='Keep running and poll for new notifications')
+        parser.add_argument('--interval', type=float, default=5, help='Seconds to sleep between polls with --loop')
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            processed, sent, failed = deliver_pending(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if processed:
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f'{total_sent} notification(s) sent, {total_failed} failed permanently.'))
@@ -0,0 +1,44 @@
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from booking.models import VenueViewStat
+from booking.utils import queue_email
+
+
+class Command(BaseCommand):
+    help = 'Email the admin a summary of the most viewed venues for one day. Meant to run daily from cron.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Day to summarise (YYYY-MM-DD, default yesterday)')
+        parser.add_argument('--top', type=int, default=10, help='Number of venues to list')
+
+    def handle(self, *args, **options):
+        if options['date']:
+            try:
+                day = date.fromisoformat(options['date'])
+            except ValueError:
+                raise CommandError('--date must be YYYY-MM-DD')
+        else:
+            day = timezone.localdate() - timedelta(days=1)
+
+        rows = list(
+            VenueViewStat.objects.filter(date=day)
+            .values('venue__name')
+            .annotate(total=Sum('views'), users=Count('user'))
+            .order_by('-total', 'venue__name')[:options['top']]
+        )
+        if not rows:
+            self.stdout.write(f'No venue views recorded on {day}; nothing sent.')
+            return
+
+        lines = [f"{row['venue__name']}: {row['total']} view(s) by {row['users']} user(s)" for row in rows]
+        queue_email(
+            f"Most viewed venues on {day}",
+            "Venue page views by signed-in users:\n\n" + "\n".join(lines) + "\n",
+            [settings.ADMIN_EMAIL],
+        )
+        self.stdout.write(self.style.SUCCESS(f'Digest for {day} queued ({len(rows)} venue(s)).'))
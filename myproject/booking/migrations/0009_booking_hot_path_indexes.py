@@ -0,0 +1,27 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_sponsor_remove_advertisement_advertise_duration_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['court', 'date', 'status', 'start_time'], name='booking_boo_court_i_d01d71_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', '-date'], name='booking_boo_user_id_07e7fe_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', '-created_at'], name='booking_boo_status_75aeac_idx'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+SLOT_MINUTES = 15
+CELL_STATUSES = ('pending', 'confirmed', 'completed')
+
+
+def claim_existing_cells(apps, schema_editor):
+    """Claim cells for bookings that already occupy a court.
+
+    Historic data may contain overlaps; the earliest booking keeps the cell.
+    """
+    Booking = apps.get_model('booking', 'Booking')
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+    rows = Booking.objects.filter(status__in=CELL_STATUSES).order_by('created_at').values_list(
+        'pk', 'court_id', 'date', 'start_time', 'end_time'
+    )
+    batch = []
+    for pk, court_id, date, start_time, end_time in rows.iterator(chunk_size=2000):
+        first = (start_time.hour * 60 + start_time.minute) // SLOT_MINUTES
+        end = end_time.hour * 60 + end_time.minute + (1 if end_time.second or end_time.microsecond else 0)
+        last = -(-end // SLOT_MINUTES)
+        batch.extend(
+            BookingSlot(court_id=court_id, date=date, slot_index=i, booking_id=pk) for i in range(first, last)
+        )
+        if len(batch) >= 5000:
+            BookingSlot.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    BookingSlot.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_slothold'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('slot_index', models.PositiveSmallIntegerField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_cells', to='booking.booking')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slot_cells', to='booking.court')),
+            ],
+            options={
+                'ordering': ['court', 'date', 'slot_index'],
+                'unique_together': {('court', 'date', 'slot_index')},
+            },
+        ),
+        migrations.RunPython(claim_existing_cells, migrations.RunPython.noop),
+    ]
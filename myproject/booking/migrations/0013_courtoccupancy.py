@@ -0,0 +1,47 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+CELL_MINUTES = 15
+OCCUPANCY_MINUTES = 30
+
+
+def build_bitmaps(apps, schema_editor):
+    BookingSlot = apps.get_model('booking', 'BookingSlot')
+    CourtOccupancy = apps.get_model('booking', 'CourtOccupancy')
+    bits = {}
+    cells = BookingSlot.objects.order_by().values_list('court_id', 'date', 'slot_index')
+    for court_id, date, slot_index in cells.iterator(chunk_size=5000):
+        key = (court_id, date)
+        bits[key] = bits.get(key, 0) | (1 << (slot_index * CELL_MINUTES // OCCUPANCY_MINUTES))
+    CourtOccupancy.objects.bulk_create(
+        [CourtOccupancy(court_id=court_id, date=date, bits=value) for (court_id, date), value in bits.items()],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_recurringbooking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourtOccupancy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bits', models.BigIntegerField(default=0)),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='occupancy', to='booking.court')),
+            ],
+            options={
+                'ordering': ['date', 'court'],
+                'indexes': [models.Index(fields=['date'], name='booking_cou_date_61d865_idx')],
+                'unique_together': {('court', 'date')},
+            },
+        ),
+        migrations.RunPython(build_bitmaps, migrations.RunPython.noop),
+    ]
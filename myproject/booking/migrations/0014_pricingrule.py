@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0013_courtoccupancy'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PricingRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50)),
+                ('weekdays', models.CharField(default='0123456', help_text='Days the rule applies to: 0 = Monday ... 6 = Sunday, e.g. "56" for weekends', max_length=7)),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField(help_text='Use 00:00 for "until midnight"')),
+                ('price_per_hour', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('priority', models.PositiveSmallIntegerField(default=0, help_text='Higher priority rules win where rules overlap')),
+                ('is_active', models.BooleanField(default=True)),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pricing_rules', to='booking.court')),
+            ],
+            options={
+                'ordering': ['court', '-priority', 'start_time'],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0015_notification'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VenueViewStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('views', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='venue_view_stats', to=settings.AUTH_USER_MODEL)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_stats', to='booking.venue')),
+            ],
+            options={
+                'ordering': ['-date', '-views'],
+                'indexes': [models.Index(fields=['date', 'venue'], name='booking_ven_date_c9f186_idx')],
+                'unique_together': {('venue', 'user', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncDate
+
+
+BOOKING_FIELDS = {
+    'pending': 'pending_bookings',
+    'confirmed': 'confirmed_bookings',
+    'cancelled': 'cancelled_bookings',
+    'completed': 'completed_bookings',
+}
+
+
+def build_stats(apps, schema_editor):
+    Booking = apps.get_model('booking', 'Booking')
+    TournamentRegistration = apps.get_model('booking', 'TournamentRegistration')
+    DashboardStats = apps.get_model('booking', 'DashboardStats')
+    rows = {}
+    bookings = (
+        Booking.objects.values('date', 'court__venue_id')
+        .annotate(
+            revenue=Sum('total_price', filter=Q(status__in=('confirmed', 'completed'))),
+            **{field: Count('pk', filter=Q(status=status)) for status, field in BOOKING_FIELDS.items()}
+        )
+        .order_by()
+    )
+    for row in bookings:
+        rows[(row['date'], row['court__venue_id'])] = DashboardStats(
+            date=row['date'], venue_id=row['court__venue_id'], revenue=row['revenue'] or 0,
+            **{field: row[field] for field in BOOKING_FIELDS.values()}
+        )
+    registrations = (
+        TournamentRegistration.objects.filter(status='pending')
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'tournament__venue_id')
+        .annotate(pending=Count('pk'))
+        .order_by()
+    )
+    for row in registrations:
+        key = (row['day'], row['tournament__venue_id'])
+        rows.setdefault(key, DashboardStats(date=key[0], venue_id=key[1])).pending_registrations = row['pending']
+    DashboardStats.objects.bulk_create(rows.values(), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0016_venueviewstat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('pending_bookings', models.IntegerField(default=0)),
+                ('confirmed_bookings', models.IntegerField(default=0)),
+                ('cancelled_bookings', models.IntegerField(default=0)),
+                ('completed_bookings', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('pending_registrations', models.IntegerField(default=0)),
+                ('venue', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='dashboard_stats', to='booking.venue')),
+            ],
+            options={
+                'verbose_name_plural': 'dashboard stats',
+                'ordering': ['-date', 'venue'],
+                'unique_together': {('date', 'venue')},
+            },
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:43
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def backfill_totals(apps, schema_editor):
+    Venue = apps.get_model('booking', 'Venue')
+    Review = apps.get_model('booking', 'Review')
+    reviews = Review.objects.filter(venue=OuterRef('pk')).order_by().values('venue')
+    Venue.objects.update(
+        review_count=Coalesce(Subquery(reviews.annotate(n=Count('pk')).values('n')), 0),
+        rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0017_dashboardstats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venue',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='venue',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:45
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_counts(apps, schema_editor):
+    Tournament = apps.get_model('booking', 'Tournament')
+    TournamentRegistration = apps.get_model('booking', 'TournamentRegistration')
+    approved = (
+        TournamentRegistration.objects.filter(tournament=OuterRef('pk'), status='approved')
+        .order_by().values('tournament').annotate(n=Count('pk')).values('n')
+    )
+    Tournament.objects.update(approved_count=Coalesce(Subquery(approved), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0018_venue_review_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='approved_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:51
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0019_tournament_approved_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Match',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField()),
+                ('stage', models.CharField(choices=[('league', 'League'), ('group', 'Group stage'), ('knockout', 'Knockout')], max_length=10)),
+                ('round', models.PositiveSmallIntegerField()),
+                ('group', models.CharField(blank=True, max_length=10)),
+                ('home_label', models.CharField(max_length=100)),
+                ('away_label', models.CharField(max_length=100)),
+                ('date', models.DateField()),
+                ('start_time', models.TimeField()),
+                ('end_time', models.TimeField()),
+                ('away_team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='away_matches', to='booking.team')),
+                ('booking', models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='match', to='booking.booking')),
+                ('court', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='booking.court')),
+                ('home_team', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='home_matches', to='booking.team')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matches', to='booking.tournament')),
+            ],
+            options={
+                'ordering': ['date', 'start_time', 'court'],
+                'unique_together': {('tournament', 'number')},
+            },
+        ),
+    ]
@@ -0,0 +1,137 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:53
+
+import re
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Frozen copies of booking.players as of this migration, so later changes to the
+# app code cannot change what replaying it does.
+_PHONE = re.compile(r'(\+?\d[\d\s().-]{8,}\d)\s*$')
+_MARKER = re.compile(r'^\s*(?:\d{1,2}[.)]|[-*•])\s*')
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+def parse_player_list(text):
+    entries = []
+    seen = set()
+    for line in text.splitlines():
+        line = _MARKER.sub('', line)
+        phone = ''
+        match = _PHONE.search(line)
+        if match:
+            digits = ''.join(ch for ch in match.group(1) if ch.isdigit())
+            if 10 <= len(digits) <= 15:
+                phone = digits
+                line = line[:match.start()]
+        name = ' '.join(line.strip(' \t,;:-').split())[:100]
+        if not name:
+            continue
+        key = (normalize_name(name), phone)
+        if key not in seen:
+            seen.add(key)
+            entries.append((name, phone))
+    return entries
+
+
+def get_or_create_players(entries, Player):
+    keys = {(normalize_name(name), phone): name for name, phone in entries}
+    if not keys:
+        return {}
+    Player.objects.bulk_create(
+        [Player(name=name, normalized_name=key[0], phone=key[1]) for key, name in keys.items()],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    names = {name for name, _ in keys}
+    phones = {phone for _, phone in keys}
+    return {
+        (player.normalized_name, player.phone): player
+        for player in Player.objects.filter(normalized_name__in=names, phone__in=phones)
+        if (player.normalized_name, player.phone) in keys
+    }
+
+
+def parse_team_sheets(apps, schema_editor):
+    Team = apps.get_model('booking', 'Team')
+    Player = apps.get_model('booking', 'Player')
+    TeamMembership = apps.get_model('booking', 'TeamMembership')
+    sheets = Team.objects.order_by('pk').values_list('pk', 'player_list')
+    batch = []
+    for row in sheets.iterator(chunk_size=1000):
+        batch.append(row)
+        if len(batch) == 1000:
+            _create_memberships(batch, Player, TeamMembership)
+            batch = []
+    _create_memberships(batch, Player, TeamMembership)
+
+
+def _create_memberships(batch, Player, TeamMembership):
+    parsed = [(team_id, parse_player_list(text)) for team_id, text in batch]
+    players = get_or_create_players([entry for _, entries in parsed for entry in entries], Player)
+    TeamMembership.objects.bulk_create([
+        TeamMembership(team_id=team_id, player=players[(normalize_name(name), phone)], position=position)
+        for team_id, entries in parsed
+        for position, (name, phone) in enumerate(entries)
+    ], batch_size=1000)
+
+
+def write_team_sheets(apps, schema_editor):
+    Team = apps.get_model('booking', 'Team')
+    TeamMembership = apps.get_model('booking', 'TeamMembership')
+    lines = {}
+    for team_id, name, phone in TeamMembership.objects.order_by('team', 'position').values_list(
+        'team_id', 'player__name', 'player__phone',
+    ).iterator(chunk_size=2000):
+        lines.setdefault(team_id, []).append(f'{name} {phone}'.strip())
+    teams = list(Team.objects.filter(pk__in=lines))
+    for team in teams:
+        team.player_list = '\n'.join(lines[team.pk])
+    Team.objects.bulk_update(teams, ['player_list'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0020_match'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Player',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('normalized_name', models.CharField(db_index=True, max_length=100)),
+                ('phone', models.CharField(blank=True, db_index=True, max_length=15)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['name'],
+                'unique_together': {('normalized_name', 'phone')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TeamMembership',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='booking.player')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='memberships', to='booking.team')),
+            ],
+            options={
+                'ordering': ['team', 'position'],
+                'unique_together': {('team', 'player')},
+            },
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='players',
+            field=models.ManyToManyField(related_name='teams', through='booking.TeamMembership', to='booking.player'),
+        ),
+        migrations.RunPython(parse_team_sheets, write_team_sheets),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0021_player_teammembership'),
+    ]
+
+    operations = [
+        # a default lets the column be re-added when migrating backwards
+        migrations.AlterField(
+            model_name='team',
+            name='player_list',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.RemoveField(
+            model_name='team',
+            name='player_list',
+        ),
+    ]
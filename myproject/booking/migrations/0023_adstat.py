@@ -0,0 +1,28 @@
+# Generated by Django 6.0.2 on 2026-10-18 07:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0022_remove_team_player_list'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AdStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('advertisement', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='booking.advertisement')),
+            ],
+            options={
+                'ordering': ['-date'],
+                'unique_together': {('advertisement', 'date')},
+            },
+        ),
+    ]
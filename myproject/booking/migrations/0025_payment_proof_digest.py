@@ -0,0 +1,44 @@
+# Generated by Django 6.0.2 on 2026-10-18 08:01
+
+import booking.storage
+from django.db import migrations, models
+
+
+def hash_existing_proofs(apps, schema_editor):
+    Payment = apps.get_model('booking', 'Payment')
+    storage = booking.storage.proof_storage
+    digests = {}
+    payments = []
+    rows = Payment.objects.exclude(payment_proof='').exclude(payment_proof__isnull=True).only('pk', 'payment_proof')
+    for payment in rows.iterator(chunk_size=500):
+        name = payment.payment_proof.name
+        if name not in digests:
+            digests[name] = storage.digest_of(name)
+            if not digests[name] and storage.exists(name):
+                # files uploaded before this storage keep their name; hash their contents
+                with storage.open(name, 'rb') as proof:
+                    digests[name] = booking.storage.file_digest(proof)
+        payment.proof_digest = digests[name]
+        payments.append(payment)
+    Payment.objects.bulk_update(payments, ['proof_digest'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0024_image_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='payment',
+            name='proof_digest',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='payment',
+            name='payment_proof',
+            field=models.FileField(blank=True, null=True, storage=booking.storage.ContentAddressedStorage(), upload_to='payment_proofs/'),
+        ),
+        migrations.RunPython(hash_existing_proofs, migrations.RunPython.noop),
+    ]
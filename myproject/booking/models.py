@@ -1,8 +1,68 @@
-from django.db import models
+from datetime import time
+
+from django.db import models, transaction
+from django.db.models import Case, Count, F, FloatField, OuterRef, Subquery, Sum, When
+from django.db.models.functions import Cast, Coalesce
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .storage import proof_storage
+
+
+class StateTrackingMixin:
+    """Remember the field values an instance was loaded with.
+
+    `original(name)` gives a field's value as last read from or written to the
+    database without querying, so save() overrides can react to status
+    transitions; `changed_fields` lists what differs, for `save(update_fields=...)`.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._original_state = dict(zip(field_names, values))
+        return instance
+
+    def original(self, attname):
+        """Value of `attname` in the database; None when the row does not exist yet."""
+        state = getattr(self, '_original_state', None)
+        if state is not None and attname in state:
+            return state[attname]
+        if self.pk is None:
+            return None
+        # built by hand with a pk, or the field was deferred: fall back to a query
+        return type(self)._base_manager.filter(pk=self.pk).values_list(attname, flat=True).first()
+
+    @property
+    def changed_fields(self):
+        """Attnames whose current value differs from the loaded one (empty for unsaved instances)."""
+        state = getattr(self, '_original_state', None) or {}
+        return [name for name, value in state.items() if getattr(self, name) != value]
+
+    def save_changed(self):
+        """Write only the changed fields (plus `auto_now` ones). Returns False if nothing changed."""
+        fields = self.changed_fields
+        if not fields:
+            return False
+        fields += [f.attname for f in self._meta.concrete_fields if getattr(f, 'auto_now', False) and f.attname not in fields]
+        self.save(update_fields=fields)
+        return True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get('update_fields')
+        state = getattr(self, '_original_state', None)
+        if update_fields is not None and state is not None:
+            names = {self._meta.get_field(name).attname for name in update_fields}
+        else:
+            state = self._original_state = {}
+            names = [f.attname for f in self._meta.concrete_fields]
+        state.update({name: getattr(self, name) for name in names})
+
 
 class Venue(models.Model):
     name = models.CharField(max_length=100)
@@ -12,7 +72,12 @@ class Venue(models.Model):
     email = models.EmailField(blank=True)
     description = models.TextField(blank=True)
     rating = models.FloatField(default=4.5, validators=[MinValueValidator(0), MaxValueValidator(5)])
+    # running totals of the venue's reviews, maintained by Review.save()/delete()
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(default=timezone.now)
+    # also bumped by review and court changes, which alter what the API shows for the venue
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -21,11 +86,35 @@ class Venue(models.Model):
         return self.name
 
     def average_rating(self):
-        ratings = self.reviews.all()
-        if ratings:
-            return sum([r.rating for r in ratings]) / len(ratings)
+        if self.review_count:
+            return self.rating_sum / self.review_count
         return self.rating
 
+    @staticmethod
+    def average_rating_expression():
+        """`average_rating()` as a database expression, for annotating and ordering venue querysets."""
+        return Case(
+            When(review_count=0, then=F('rating')),
+            default=Cast('rating_sum', FloatField()) / F('review_count'),
+            output_field=FloatField(),
+        )
+
+    @classmethod
+    def refresh_review_totals(cls, venues=None):
+        """Recompute `review_count`/`rating_sum` from the reviews table for `venues` (default: all)."""
+        reviews = Review.objects.filter(venue=OuterRef('pk')).order_by().values('venue')
+        queryset = cls.objects.all() if venues is None else cls.objects.filter(pk__in=venues)
+        return queryset.update(
+            review_count=Coalesce(Subquery(reviews.annotate(n=Count('pk')).values('n')), 0),
+            rating_sum=Coalesce(Subquery(reviews.annotate(total=Sum('rating')).values('total')), 0),
+            updated_at=timezone.now(),
+        )
+
+    @classmethod
+    def touch(cls, pk):
+        """Bump `updated_at` after a change to related rows, so API clients refetch the venue."""
+        cls.objects.filter(pk=pk).update(updated_at=timezone.now())
+
 
 class Court(models.Model):
     venue = models.ForeignKey(Venue, related_name='courts', on_delete=models.CASCADE)
@@ -34,6 +123,7 @@ class Court(models.Model):
     price_per_hour = models.DecimalField(max_digits=10, decimal_places=2, default=500)
     description = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -41,8 +131,87 @@ class Court(models.Model):
     def __str__(self):
         return f"{self.venue.name} - {self.name}"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # the base hourly rate is part of the compiled pricing table
+        from .pricing import invalidate
+        invalidate(self.pk)
+        # the venue's court count may have changed
+        Venue.touch(self.venue_id)
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        Venue.touch(self.venue_id)
+        return result
+
+
+class PricingRule(models.Model):
+    """Hourly rate override for part of the day on some weekdays (peak, off-peak, weekend)."""
+    ALL_DAYS = '0123456'
+    WEEKDAYS = '01234'
+    WEEKEND = '56'
+
+    court = models.ForeignKey(Court, related_name='pricing_rules', on_delete=models.CASCADE)
+    name = models.CharField(max_length=50)
+    weekdays = models.CharField(max_length=7, default=ALL_DAYS, help_text='Days the rule applies to: 0 = Monday ... 6 = Sunday, e.g. "56" for weekends')
+    start_time = models.TimeField()
+    end_time = models.TimeField(help_text='Use 00:00 for "until midnight"')
+    price_per_hour = models.DecimalField(max_digits=10, decimal_places=2)
+    priority = models.PositiveSmallIntegerField(default=0, help_text='Higher priority rules win where rules overlap')
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ['court', '-priority', 'start_time']
+
+    def __str__(self):
+        return f"{self.court} - {self.name} (₹{self.price_per_hour}/hr)"
+
+    def weekday_numbers(self):
+        return sorted({int(c) for c in self.weekdays if c in self.ALL_DAYS})
+
+    def clean(self):
+        # 00:00 as the end means midnight; any other end must come after the start
+        if self.start_time and self.end_time and self.end_time != time(0, 0) and self.start_time >= self.end_time:
+            raise ValidationError({'end_time': 'End time must be after start time (use 00:00 for "until midnight").'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .pricing import invalidate
+        invalidate(self.court_id)
+
+    def delete(self, *args, **kwargs):
+        court_id = self.court_id
+        result = super().delete(*args, **kwargs)
+        from .pricing import invalidate
+        invalidate(court_id)
+        return result
+
+
+class RecurringBooking(models.Model):
+    """A weekly or biweekly series of bookings, e.g. a league's season slot."""
+    INTERVAL_CHOICES = (
+        (1, 'Weekly'),
+        (2, 'Every two weeks'),
+    )
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='recurring_bookings', on_delete=models.CASCADE)
+    court = models.ForeignKey(Court, related_name='recurring_bookings', on_delete=models.CASCADE)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    interval_weeks = models.PositiveSmallIntegerField(choices=INTERVAL_CHOICES, default=1)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    skip_dates = models.JSONField(default=list, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.court} every {self.interval_weeks} week(s) from {self.start_date} to {self.end_date}"
+
 
-class Booking(models.Model):
+class Booking(StateTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('confirmed', 'Confirmed'),
         ('cancelled', 'Cancelled'),
@@ -60,6 +229,7 @@ class Booking(models.Model):
     # new bookings start out pending so that an administrator can review them
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     notes = models.TextField(blank=True)
+    series = models.ForeignKey(RecurringBooking, null=True, blank=True, related_name='bookings', on_delete=models.SET_NULL)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -68,20 +238,94 @@ class Booking(models.Model):
         # allow only one booking with same status at given time; pending and confirmed
         # will no longer conflict with each other
         unique_together = ('court', 'date', 'start_time', 'status')
+        indexes = [
+            # availability checks: court/day/status with a time-range predicate
+            models.Index(fields=['court', 'date', 'status', 'start_time']),
+            # booking_list / profile_view
+            models.Index(fields=['user', '-date']),
+            # admin_dashboard sections
+            models.Index(fields=['status', '-created_at']),
+        ]
 
     def __str__(self):
         return f"{self.user} - {self.court} on {self.date} {self.start_time}-{self.end_time}"
 
     def calculate_price(self):
-        from datetime import datetime
-        start = datetime.combine(self.date, self.start_time)
-        end = datetime.combine(self.date, self.end_time)
-        hours = (end - start).total_seconds() / 3600
-        self.total_price = float(self.court.price_per_hour) * hours
+        from .pricing import quote
+        self.total_price = quote(self.court, self.date, self.start_time, self.end_time)
         return self.total_price
 
 
-class Review(models.Model):
+class BookingSlot(models.Model):
+    """One fixed-size time cell of a court claimed by a booking.
+
+    The unique constraint on (court, date, slot_index) makes the database reject
+    overlapping bookings at insert time.
+    """
+    SLOT_MINUTES = 15
+
+    court = models.ForeignKey(Court, related_name='slot_cells', on_delete=models.CASCADE)
+    date = models.DateField()
+    slot_index = models.PositiveSmallIntegerField()
+    booking = models.ForeignKey(Booking, related_name='slot_cells', on_delete=models.CASCADE)
+
+    class Meta:
+        ordering = ['court', 'date', 'slot_index']
+        unique_together = ('court', 'date', 'slot_index')
+
+    def __str__(self):
+        return f"{self.court} on {self.date} cell {self.slot_index}"
+
+
+class CourtOccupancy(models.Model):
+    """Half-hour occupancy bitmap of one court on one day.
+
+    Bit `n` is set when any booking occupies part of the half hour starting at
+    `n * 30` minutes past midnight. Derived from BookingSlot cells so cross-venue
+    searches can test availability with a bitwise AND.
+    """
+    SLOT_MINUTES = 30
+
+    court = models.ForeignKey(Court, related_name='occupancy', on_delete=models.CASCADE)
+    date = models.DateField()
+    bits = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['date', 'court']
+        unique_together = ('court', 'date')
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.court} on {self.date}: {self.bits:048b}"
+
+
+class SlotHold(models.Model):
+    """Temporary reservation of a court slot while the user completes payment."""
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='slot_holds', on_delete=models.CASCADE)
+    court = models.ForeignKey(Court, related_name='holds', on_delete=models.CASCADE)
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    expires_at = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['court', 'date', 'expires_at']),
+        ]
+
+    def __str__(self):
+        return f"Hold {self.court} on {self.date} {self.start_time}-{self.end_time} until {self.expires_at}"
+
+    @property
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+
+class Review(StateTrackingMixin, models.Model):
     venue = models.ForeignKey(Venue, related_name='reviews', on_delete=models.CASCADE)
     user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='reviews', on_delete=models.CASCADE)
     rating = models.PositiveIntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
@@ -95,6 +339,29 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user} - {self.venue} ({self.rating}/5)"
 
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            previous = None
+            if self.pk and self.original('venue_id') is not None:
+                previous = (self.original('venue_id'), self.original('rating'))
+            super().save(*args, **kwargs)
+            if previous:
+                Venue.objects.filter(pk=previous[0]).update(review_count=F('review_count') - 1,
+                                                            rating_sum=F('rating_sum') - previous[1],
+                                                            updated_at=timezone.now())
+            Venue.objects.filter(pk=self.venue_id).update(review_count=F('review_count') + 1,
+                                                          rating_sum=F('rating_sum') + self.rating,
+                                                          updated_at=timezone.now())
+
+
+@receiver(post_delete, sender=Review)
+def _review_deleted(sender, instance, **kwargs):
+    # a receiver rather than a delete() override: queryset and cascade deletes
+    # (of a user or a venue) never call Model.delete() but still send post_delete
+    Venue.objects.filter(pk=instance.venue_id).update(review_count=F('review_count') - 1,
+                                                      rating_sum=F('rating_sum') - instance.rating,
+                                                      updated_at=timezone.now())
+
 
 class Advertisement(models.Model):
     HOME_TOP = 'HOME_TOP'
@@ -111,6 +378,7 @@ class Advertisement(models.Model):
 
     title = models.CharField(max_length=200, blank=True, default='')
     image = models.ImageField(upload_to='advertisements/', blank=True, null=True)
+    image_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     link = models.URLField(blank=True)
     position = models.CharField(max_length=20, choices=POSITION_CHOICES, default=HOME_TOP)
     start_date = models.DateField(default=timezone.now, null=True, blank=True)
@@ -124,6 +392,25 @@ class Advertisement(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._invalidate_snapshot()
+        from .images import schedule_stale
+        schedule_stale(self, 'image')
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        self._invalidate_snapshot()
+        return result
+
+    @staticmethod
+    def _invalidate_snapshot():
+        from .ads import invalidate
+        # now for this process, and again after commit so no process keeps a
+        # snapshot it rebuilt from the rows before they were committed
+        invalidate()
+        transaction.on_commit(invalidate)
+
     @classmethod
     def active_ads(cls, position=None):
         """Return ads that should be shown right now.
@@ -137,6 +424,10 @@ class Advertisement(models.Model):
         return qs
 
 
+class TournamentFull(Exception):
+    """Raised when approving a registration would exceed the tournament's `max_teams`."""
+
+
 class Tournament(models.Model):
     STATUS_CHOICES = (
         ('upcoming', 'Upcoming'),
@@ -148,11 +439,15 @@ class Tournament(models.Model):
     name = models.CharField(max_length=150)
     description = models.TextField()
     poster = models.ImageField(upload_to='tournament_posters/', blank=True, null=True)
+    # resized copies of the poster, written by booking.images
+    poster_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     start_date = models.DateField()
     end_date = models.DateField()
     start_time = models.TimeField()
     venue = models.ForeignKey(Venue, related_name='tournaments', on_delete=models.CASCADE)
     max_teams = models.PositiveIntegerField(default=8)
+    # approved registrations, kept in step by TournamentRegistration and the admin bulk actions
+    approved_count = models.PositiveIntegerField(default=0)
     entry_fee = models.DecimalField(max_digits=10, decimal_places=2, default=0)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='upcoming')
     contact_person = models.CharField(max_length=100)
@@ -168,6 +463,11 @@ class Tournament(models.Model):
     
     def __str__(self):
         return f"{self.name} - {self.start_date}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .images import schedule_stale
+        schedule_stale(self, 'poster')
     
     def is_upcoming(self):
         from datetime import date
@@ -175,7 +475,36 @@ class Tournament(models.Model):
 
     @property
     def approved_registrations_count(self):
-        return self.registrations.filter(status='approved').count()
+        return self.approved_count
+
+    def reserve_places(self, n=1):
+        """Count `n` more approved teams unless that would exceed `max_teams`.
+
+        The check and the increment are one conditional UPDATE, so concurrent
+        approvals cannot overfill the tournament. Returns False when full.
+        """
+        reserved = Tournament.objects.filter(pk=self.pk, approved_count__lte=F('max_teams') - n).update(
+            approved_count=F('approved_count') + n, updated_at=timezone.now()
+        )
+        if reserved:
+            self.approved_count += n
+        return bool(reserved)
+
+    def release_places(self, n=1):
+        Tournament.objects.filter(pk=self.pk, approved_count__gte=n).update(
+            approved_count=F('approved_count') - n, updated_at=timezone.now()
+        )
+        self.approved_count = max(self.approved_count - n, 0)
+
+    @classmethod
+    def refresh_approved_counts(cls, tournaments=None):
+        """Recompute `approved_count` from the registrations table for `tournaments` (default: all)."""
+        approved = (
+            TournamentRegistration.objects.filter(tournament=OuterRef('pk'), status='approved')
+            .order_by().values('tournament').annotate(n=Count('pk')).values('n')
+        )
+        queryset = cls.objects.all() if tournaments is None else cls.objects.filter(pk__in=tournaments)
+        return queryset.update(approved_count=Coalesce(Subquery(approved), 0), updated_at=timezone.now())
 
     @property
     def registration_open(self):
@@ -191,11 +520,33 @@ class Tournament(models.Model):
         return self.approved_registrations_count >= self.max_teams
 
 
+class Player(models.Model):
+    """A person listed on team sheets.
+
+    Players are matched on their normalized name and phone, so the same person
+    entered on several teams is one row and `teams` answers "which teams is X on".
+    Players entered without a phone are told apart by name alone.
+    """
+    name = models.CharField(max_length=100)
+    # casefolded with whitespace collapsed; see players.normalize_name()
+    normalized_name = models.CharField(max_length=100, db_index=True)
+    # digits only, blank when not given
+    phone = models.CharField(max_length=15, blank=True, db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['name']
+        unique_together = ('normalized_name', 'phone')
+
+    def __str__(self):
+        return f"{self.name} ({self.phone})" if self.phone else self.name
+
+
 class Team(models.Model):
     name = models.CharField(max_length=150)
     captain_name = models.CharField(max_length=100)
     contact_number = models.CharField(max_length=15)
-    player_list = models.TextField(help_text='List players (one per line)')
+    players = models.ManyToManyField(Player, through='TeamMembership', related_name='teams')
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='teams', on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
 
@@ -205,8 +556,29 @@ class Team(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def player_list(self):
+        """The team sheet as text, one "name phone" line per player, in the order it was entered."""
+        return '\n'.join(
+            f'{membership.player.name} {membership.player.phone}'.strip() for membership in self.memberships.all()
+        )
+
+
+class TeamMembership(models.Model):
+    team = models.ForeignKey(Team, related_name='memberships', on_delete=models.CASCADE)
+    player = models.ForeignKey(Player, related_name='memberships', on_delete=models.CASCADE)
+    # line of the team sheet the player was entered on
+    position = models.PositiveSmallIntegerField(default=0)
 
-class TournamentRegistration(models.Model):
+    class Meta:
+        ordering = ['team', 'position']
+        unique_together = ('team', 'player')
+
+    def __str__(self):
+        return f"{self.player} in {self.team}"
+
+
+class TournamentRegistration(StateTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
         ('approved', 'Approved'),
@@ -228,19 +600,66 @@ class TournamentRegistration(models.Model):
         return f"{self.team.name} ({self.tournament.name}) - {self.status}"
 
     def save(self, *args, **kwargs):
-        # When a registration is approved, automatically close registration if the tournament is full.
-        previous_status = None
-        if self.pk:
-            previous_status = TournamentRegistration.objects.filter(pk=self.pk).values_list('status', flat=True).first()
-        super().save(*args, **kwargs)
+        # moving into or out of 'approved' adjusts the tournament's counter; approving
+        # raises TournamentFull instead of going over max_teams
+        with transaction.atomic():
+            previous_status = self.original('status')
+            if self.status == 'approved' and previous_status != 'approved':
+                if not self.tournament.reserve_places():
+                    raise TournamentFull(f"{self.tournament.name} already has {self.tournament.max_teams} approved teams")
+            elif previous_status == 'approved' and self.status != 'approved':
+                self.tournament.release_places()
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            # the stored status decides: an edited, unsaved instance was never counted as such
+            was_approved = self.original('status') == 'approved'
+            result = super().delete(*args, **kwargs)
+            if was_approved:
+                self.tournament.release_places()
+        return result
+
+
+class Match(models.Model):
+    """One fixture of a tournament, placed on a court and held by a confirmed Booking.
+
+    Knockout fixtures are created before their teams are known; `home_label` and
+    `away_label` then say where the teams come from (e.g. "Winner M12").
+    """
+    STAGE_CHOICES = (
+        ('league', 'League'),
+        ('group', 'Group stage'),
+        ('knockout', 'Knockout'),
+    )
+
+    tournament = models.ForeignKey(Tournament, related_name='matches', on_delete=models.CASCADE)
+    number = models.PositiveIntegerField()
+    stage = models.CharField(max_length=10, choices=STAGE_CHOICES)
+    round = models.PositiveSmallIntegerField()
+    group = models.CharField(max_length=10, blank=True)
+    home_team = models.ForeignKey(Team, null=True, blank=True, related_name='home_matches', on_delete=models.SET_NULL)
+    away_team = models.ForeignKey(Team, null=True, blank=True, related_name='away_matches', on_delete=models.SET_NULL)
+    home_label = models.CharField(max_length=100)
+    away_label = models.CharField(max_length=100)
+    court = models.ForeignKey(Court, related_name='matches', on_delete=models.CASCADE)
+    date = models.DateField()
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    booking = models.OneToOneField(Booking, null=True, blank=True, related_name='match', on_delete=models.SET_NULL)
 
-        if self.status == 'approved' and previous_status != 'approved':
-            self.tournament.close_registration_if_full()
+    class Meta:
+        ordering = ['date', 'start_time', 'court']
+        unique_together = ('tournament', 'number')
+
+    def __str__(self):
+        return f"M{self.number} {self.home_label} v {self.away_label} ({self.court} {self.date} {self.start_time})"
 
 
 class Sponsor(models.Model):
     name = models.CharField(max_length=150)
     logo = models.ImageField(upload_to='sponsor_logos/')
+    logo_derivatives = models.JSONField(default=dict, blank=True, editable=False)
     website = models.URLField(blank=True)
     description = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -251,6 +670,11 @@ class Sponsor(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .images import schedule_stale
+        schedule_stale(self, 'logo')
+
 
 class TournamentSponsor(models.Model):
     TITLE_SPONSOR = 'TITLE_SPONSOR'
@@ -277,7 +701,7 @@ class TournamentSponsor(models.Model):
         return f"{self.sponsor.name} ({self.get_sponsor_type_display()}) - {self.tournament.name}"
 
 
-class Payment(models.Model):
+class Payment(StateTrackingMixin, models.Model):
     PAYMENT_METHOD_CHOICES = (
         ('upi', 'UPI'),
         ('paytm', 'PayTM'),
@@ -325,8 +749,10 @@ class Payment(models.Model):
     admin_approved_at = models.DateTimeField(null=True, blank=True)
     admin_approved_by = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, related_name='approved_payments', on_delete=models.SET_NULL)
     
-    # Optional proof / receipt
-    payment_proof = models.FileField(upload_to='payment_proofs/', null=True, blank=True)
+    # Optional proof / receipt, stored once per distinct file under its SHA-256
+    payment_proof = models.FileField(upload_to='payment_proofs/', storage=proof_storage, null=True, blank=True)
+    # digest of the proof file; payments sharing one reused the same proof
+    proof_digest = models.CharField(max_length=64, blank=True, db_index=True, editable=False)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -342,6 +768,25 @@ class Payment(models.Model):
     def __str__(self):
         return f"Payment {self.transaction_id} - {self.user.email} ({self.status})"
     
+    def save(self, *args, **kwargs):
+        proof = self.payment_proof
+        if proof and not proof._committed:
+            # write the upload now (as FileField.pre_save would) so its digest is known
+            proof.save(proof.name, proof.file, save=False)
+        original = self.original('payment_proof')
+        if (proof.name or None) != (getattr(original, 'name', original) or None):
+            self.proof_digest = proof_storage.digest_of(proof.name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'payment_proof' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'proof_digest'}
+        super().save(*args, **kwargs)
+
+    def reused_proof_payments(self):
+        """Other payments whose proof is the same file as this one."""
+        if not self.proof_digest:
+            return Payment.objects.none()
+        return Payment.objects.filter(proof_digest=self.proof_digest).exclude(pk=self.pk)
+
     def get_related_object(self):
         """Get the related object (booking, advertisement, tournament, or registration)"""
         if self.booking:
@@ -352,4 +797,100 @@ class Payment(models.Model):
             return self.registration
         elif self.tournament:
             return self.tournament
-        return None
\ No newline at end of file
+        return None
+
+
+class Notification(models.Model):
+    """Outbox row for an email or SMS; delivered by the `send_notifications` worker."""
+    EMAIL = 'email'
+    SMS = 'sms'
+    CHANNEL_CHOICES = (
+        (EMAIL, 'Email'),
+        (SMS, 'SMS'),
+    )
+
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    )
+
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default=EMAIL)
+    recipient = models.CharField(max_length=254)
+    subject = models.CharField(max_length=255, blank=True)
+    body = models.TextField()
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_channel_display()} to {self.recipient} ({self.status})"
+
+
+class VenueViewStat(models.Model):
+    """Daily count of venue page views per signed-in user, flushed in batches from `booking.analytics`."""
+    venue = models.ForeignKey(Venue, related_name='view_stats', on_delete=models.CASCADE)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='venue_view_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    views = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', '-views']
+        unique_together = ('venue', 'user', 'date')
+        indexes = [
+            models.Index(fields=['date', 'venue']),
+        ]
+
+    def __str__(self):
+        return f"{self.venue} viewed {self.views}x by {self.user} on {self.date}"
+
+
+class AdStat(models.Model):
+    """Daily impressions and clicks of an advertisement, flushed in batches from `booking.ads`."""
+    advertisement = models.ForeignKey(Advertisement, related_name='daily_stats', on_delete=models.CASCADE)
+    date = models.DateField()
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('advertisement', 'date')
+
+    def __str__(self):
+        return f"{self.advertisement} on {self.date}: {self.impressions} shown, {self.clicks} clicked"
+
+
+class DashboardStats(models.Model):
+    """Per-venue daily rollup of the admin dashboard's headline numbers.
+
+    Kept current with `F()` increments by `booking.stats` on every status change, so
+    totals are a sum over days instead of a scan over bookings. Bookings count on
+    their play date and registrations on the day they were submitted;
+    `manage.py rebuild_dashboard_stats` recomputes the table from scratch.
+    """
+    date = models.DateField()
+    venue = models.ForeignKey(Venue, related_name='dashboard_stats', on_delete=models.CASCADE)
+    pending_bookings = models.IntegerField(default=0)
+    confirmed_bookings = models.IntegerField(default=0)
+    cancelled_bookings = models.IntegerField(default=0)
+    completed_bookings = models.IntegerField(default=0)
+    # total price of confirmed and completed bookings
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    pending_registrations = models.IntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date', 'venue']
+        unique_together = ('date', 'venue')
+        verbose_name_plural = 'dashboard stats'
+
+    def __str__(self):
+        return f"{self.venue} on {self.date}"
@@ -0,0 +1,100 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+from . import sms
+
+
+def _backoff(attempts):
+    base = getattr(settings, 'NOTIFICATION_RETRY_SECONDS', 60)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def _lease():
+    return timedelta(seconds=getattr(settings, 'NOTIFICATION_LEASE_SECONDS', 300))
+
+
+def _claim(batch_size, now):
+    """Lease a batch of due notifications to this worker, in a short transaction.
+
+    The rows stay pending but are pushed out of the due window by their retry
+    delay (at least the lease), so no other worker picks them up while they are
+    being sent. If this worker dies, they come due again after that delay.
+    """
+    with transaction.atomic():
+        batch = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'pk')[:batch_size]
+        )
+        for notification in batch:
+            notification.attempts += 1
+            notification.next_attempt_at = now + max(_backoff(notification.attempts), _lease())
+        Notification.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _record(notification):
+    Notification.objects.filter(pk=notification.pk).update(
+        status=notification.status, next_attempt_at=notification.next_attempt_at,
+        last_error=notification.last_error, sent_at=notification.sent_at,
+    )
+
+
+def deliver_pending(batch_size=100, max_attempts=5):
+    """Send one batch of due notifications and record the outcome of each.
+
+    The batch is claimed first and sent outside any transaction; each outcome is
+    written as soon as it is known, so a crash or rollback cannot send a
+    notification twice except the one in flight. Emails share a single SMTP
+    connection for the whole batch. Failures are retried with exponential
+    backoff and marked failed after `max_attempts`.
+    Returns `(processed, sent, failed)` counts for the batch.
+    """
+    now = timezone.now()
+    sent = failed = 0
+    batch = _claim(batch_size, now)
+    if not batch:
+        return 0, sent, failed
+
+    connection = None
+    sms_backend = None
+    try:
+        for notification in batch:
+            try:
+                if notification.channel == Notification.EMAIL:
+                    if connection is None:
+                        connection = get_connection()
+                        connection.open()
+                    message = EmailMessage(
+                        notification.subject, notification.body, settings.DEFAULT_FROM_EMAIL,
+                        [notification.recipient], connection=connection,
+                    )
+                    connection.send_messages([message])
+                else:
+                    if sms_backend is None:
+                        sms_backend = sms.get_backend()
+                    if sms_backend is None:
+                        raise RuntimeError('No SMS backend configured')
+                    sms_backend.send(notification.recipient, notification.body)
+            except Exception as exc:
+                notification.last_error = f"{type(exc).__name__}: {exc}"
+                if notification.attempts >= max_attempts:
+                    notification.status = 'failed'
+                    failed += 1
+                else:
+                    notification.next_attempt_at = now + _backoff(notification.attempts)
+            else:
+                notification.status = 'sent'
+                notification.sent_at = timezone.now()
+                notification.last_error = ''
+                sent += 1
+            _record(notification)
+    finally:
+        if connection is not None:
+            connection.close()
+    return len(batch), sent, failed
@@ -0,0 +1,111 @@
+"""Team sheets: parsing the submitted player list into Player / TeamMembership rows.
+
+A team sheet is free text with one player per line, optionally followed by a
+phone number ("Asha Rao 98450 12345"). Players are keyed on
+`(normalize_name(name), phone digits)` so repeat entries share a row.
+"""
+import re
+
+from django.db.models import Q
+
+from .models import Player, TeamMembership
+
+
+# a trailing run of 10-15 digits, allowing the usual separators and a leading +
+_PHONE = re.compile(r'(\+?\d[\d\s().-]{8,}\d)\s*$')
+# list markers people type in front of names: "1.", "2)", "-", "*", "•"
+_MARKER = re.compile(r'^\s*(?:\d{1,2}[.)]|[-*•])\s*')
+
+# registrations whose players cannot also play for another team
+ACTIVE_REGISTRATION_STATUSES = ('pending', 'approved')
+
+
+def normalize_name(name):
+    return ' '.join(name.split()).casefold()
+
+
+def normalize_phone(value):
+    return ''.join(ch for ch in value if ch.isdigit())
+
+
+def parse_player_list(text):
+    """`(name, phone)` pairs from a team sheet, in order, without blank or repeated lines."""
+    entries = []
+    seen = set()
+    for line in text.splitlines():
+        line = _MARKER.sub('', line)
+        phone = ''
+        match = _PHONE.search(line)
+        if match:
+            digits = normalize_phone(match.group(1))
+            if 10 <= len(digits) <= 15:
+                phone = digits
+                line = line[:match.start()]
+        name = ' '.join(line.strip(' \t,;:-').split())[:100]
+        if not name:
+            continue
+        key = (normalize_name(name), phone)
+        if key not in seen:
+            seen.add(key)
+            entries.append((name, phone))
+    return entries
+
+
+def get_or_create_players(entries):
+    """Map each `(normalized_name, phone)` key of `entries` to its Player, creating missing ones.
+
+    Two queries however many players: an INSERT that skips existing keys and a
+    SELECT of the rows.
+    """
+    keys = {(normalize_name(name), phone): name for name, phone in entries}
+    if not keys:
+        return {}
+    Player.objects.bulk_create(
+        [Player(name=name, normalized_name=key[0], phone=key[1]) for key, name in keys.items()],
+        ignore_conflicts=True,
+        batch_size=500,
+    )
+    names = {name for name, _ in keys}
+    phones = {phone for _, phone in keys}
+    return {
+        (player.normalized_name, player.phone): player
+        for player in Player.objects.filter(normalized_name__in=names, phone__in=phones)
+        if (player.normalized_name, player.phone) in keys
+    }
+
+
+def set_team_players(team, entries):
+    """Replace the team's sheet with `entries` (as returned by parse_player_list)."""
+    players = get_or_create_players(entries)
+    TeamMembership.objects.filter(team=team).delete()
+    TeamMembership.objects.bulk_create([
+        TeamMembership(team=team, player=players[(normalize_name(name), phone)], position=position)
+        for position, (name, phone) in enumerate(entries)
+    ])
+
+
+def duplicate_players(tournament, entries, exclude_team=None):
+    """Players of `entries` already on another active team of `tournament`.
+
+    A listed phone matches that phone; a name matches the same name where either
+    side has no phone. Runs as a single query over the normalized-name and phone
+    indexes. Returns `(player name, team name)` pairs.
+    """
+    phones = {phone for _, phone in entries if phone}
+    names = {normalize_name(name) for name, _ in entries}
+    names_without_phone = {normalize_name(name) for name, phone in entries if not phone}
+    if not names:
+        return []
+    clash = (
+        Q(player__phone__in=phones)
+        | Q(player__normalized_name__in=names, player__phone='')
+        | Q(player__normalized_name__in=names_without_phone)
+    )
+    memberships = TeamMembership.objects.filter(
+        clash,
+        team__tournament_registrations__tournament=tournament,
+        team__tournament_registrations__status__in=ACTIVE_REGISTRATION_STATUSES,
+    )
+    if exclude_team is not None:
+        memberships = memberships.exclude(team=exclude_team)
+    return list(memberships.order_by('player__name', 'team__name').values_list('player__name', 'team__name').distinct())
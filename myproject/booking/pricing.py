@@ -0,0 +1,98 @@
+"""Prices of court slots from the court's hourly rate and its PricingRules.
+
+Each court's rules are compiled into a lookup table kept in the default cache.
+Saving a Court or PricingRule deletes that entry. The delete only reaches other
+worker processes if CACHES is shared (Redis, Memcached, ...). With the default
+per-process LocMemCache, they keep quoting from their old table for up to
+`PRICING_TABLE_SECONDS`.
+"""
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import PricingRule
+
+
+CELL_MINUTES = 15
+CELLS_PER_DAY = 24 * 60 // CELL_MINUTES
+CENTS = Decimal('0.01')
+
+
+def _cache_key(court_id):
+    return f'booking:pricing:{court_id}'
+
+
+def invalidate(court_id):
+    cache.delete(_cache_key(court_id))
+
+
+def _minutes(value):
+    # bookings are made at minute resolution
+    return value.hour * 60 + value.minute
+
+
+def compile_table(court):
+    """Build the per-weekday lookup table of hourly rates for `court`.
+
+    Returns `(rates, prefix)`: `rates[weekday][cell]` is the hourly rate of each
+    15 minute cell and `prefix[weekday][n]` the sum of `rate * CELL_MINUTES` over the
+    first `n` cells, so any slot is priced with two lookups plus its partial cells.
+    """
+    base = Decimal(court.price_per_hour)
+    rates = [[base] * CELLS_PER_DAY for _ in range(7)]
+    # later (higher priority) rules override earlier ones
+    for rule in PricingRule.objects.filter(court=court, is_active=True).order_by('priority', 'pk'):
+        first = _minutes(rule.start_time) // CELL_MINUTES
+        # a rule ending at 00:00 runs until midnight
+        last = -(-_minutes(rule.end_time) // CELL_MINUTES) or CELLS_PER_DAY
+        for weekday in rule.weekday_numbers():
+            rates[weekday][first:last] = [rule.price_per_hour] * (last - first)
+
+    prefix = []
+    for day_rates in rates:
+        running = [Decimal(0)]
+        for rate in day_rates:
+            running.append(running[-1] + rate * CELL_MINUTES)
+        prefix.append(running)
+    return rates, prefix
+
+
+def get_table(court):
+    table = cache.get(_cache_key(court.pk))
+    if table is None:
+        table = compile_table(court)
+        cache.set(_cache_key(court.pk), table, getattr(settings, 'PRICING_TABLE_SECONDS', 300))
+    return table
+
+
+def _price(rates, prefix, weekday, start_time, end_time):
+    # an end of 00:00 closes the last slot of the day
+    start, end = _minutes(start_time), _minutes(end_time) or CELLS_PER_DAY * CELL_MINUTES
+    first_full = -(-start // CELL_MINUTES)
+    last_full = end // CELL_MINUTES
+    day_rates = rates[weekday]
+    if first_full > last_full:
+        # the whole slot sits inside a single cell
+        total = day_rates[start // CELL_MINUTES] * (end - start)
+    else:
+        total = prefix[weekday][last_full] - prefix[weekday][first_full]
+        if start < first_full * CELL_MINUTES:
+            total += day_rates[first_full - 1] * (first_full * CELL_MINUTES - start)
+        if end > last_full * CELL_MINUTES:
+            total += day_rates[last_full] * (end - last_full * CELL_MINUTES)
+    return (total / 60).quantize(CENTS, rounding=ROUND_HALF_UP)
+
+
+def quote_many(court, slots):
+    """Price many `(date, start_time, end_time)` slots of one court in a single pass.
+
+    Uses the court's cached lookup table, so no query is made per slot. Prices are
+    exact `Decimal`s rounded to paise.
+    """
+    rates, prefix = get_table(court)
+    return [_price(rates, prefix, day.weekday(), start_time, end_time) for day, start_time, end_time in slots]
+
+
+def quote(court, date, start_time, end_time):
+    return quote_many(court, [(date, start_time, end_time)])[0]
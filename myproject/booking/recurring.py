@@ -0,0 +1,119 @@
+import uuid
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+
+from .models import Booking, BookingSlot, Court, Payment, RecurringBooking
+from . import availability
+from . import stats
+from .pricing import quote_many
+
+
+# a season of weekly slots; keeps a single request bounded
+MAX_OCCURRENCES = 52
+
+
+class _CellTaken(Exception):
+    """Raised out of the series transaction when a concurrent booking took one of its cells."""
+
+
+def occurrence_dates(start_date, end_date, interval_weeks=1, skip_dates=()):
+    """Dates from `start_date` to `end_date` (inclusive) every `interval_weeks`, minus `skip_dates`."""
+    step = timedelta(weeks=interval_weeks)
+    skip = set(skip_dates)
+    dates = []
+    day = start_date
+    while day <= end_date:
+        if day not in skip:
+            dates.append(day)
+        day += step
+    return dates
+
+
+def find_clashes(court, dates, start_time, end_time):
+    """Map each clashing date to the occupied (start, end) ranges, using one query for all dates."""
+    fields = ('date', 'start_time', 'end_time')
+    overlapping = dict(court=court, date__in=dates, start_time__lt=end_time, end_time__gt=start_time)
+    rows = Booking.objects.filter(status__in=availability.BLOCKING_STATUSES, **overlapping).order_by().values_list(*fields).union(
+        availability.active_holds().filter(**overlapping).order_by().values_list(*fields),
+        all=True,
+    )
+    clashes = {}
+    for day, start, end in rows:
+        clashes.setdefault(day, []).append((start, end))
+    return {day: sorted(ranges) for day, ranges in sorted(clashes.items())}
+
+
+def create_series(user, court, start_date, end_date, start_time, end_time, interval_weeks=1, skip_dates=(),
+                  number_of_players=8, payment_method='upi', notes=''):
+    """Check every occurrence for conflicts, then book them all in one transaction.
+
+    Returns `(series, clashes)`. When any occurrence clashes nothing is written,
+    `series` is None and `clashes` maps the dates to the ranges in the way.
+    """
+    dates = occurrence_dates(start_date, end_date, interval_weeks, skip_dates)
+    try:
+        with transaction.atomic():
+            Court.objects.select_for_update().get(pk=court.pk)
+            clashes = find_clashes(court, dates, start_time, end_time)
+            if clashes:
+                return None, clashes
+
+            series = RecurringBooking.objects.create(
+                user=user,
+                court=court,
+                start_date=start_date,
+                end_date=end_date,
+                interval_weeks=interval_weeks,
+                start_time=start_time,
+                end_time=end_time,
+                skip_dates=[str(day) for day in sorted(skip_dates)],
+            )
+            prices = quote_many(court, [(day, start_time, end_time) for day in dates])
+            bookings = [
+                Booking(
+                    user=user,
+                    court=court,
+                    date=day,
+                    start_time=start_time,
+                    end_time=end_time,
+                    number_of_players=number_of_players,
+                    notes=notes,
+                    status='pending',
+                    series=series,
+                    total_price=price,
+                )
+                for day, price in zip(dates, prices)
+            ]
+            Booking.objects.bulk_create(bookings)
+            stats.bookings_changed([(court.venue_id, booking.date, None, booking.total_price) for booking in bookings], 'pending')
+
+            cells = availability.cell_indexes(start_time, end_time)
+            try:
+                with transaction.atomic():
+                    BookingSlot.objects.bulk_create([
+                        BookingSlot(court=court, date=booking.date, slot_index=i, booking=booking)
+                        for booking in bookings
+                        for i in cells
+                    ])
+            except IntegrityError:
+                # a concurrent booking claimed one of the cells after our check
+                raise _CellTaken()
+            availability.refresh_occupancy((court.pk, day) for day in dates)
+
+            Payment.objects.bulk_create([
+                Payment(
+                    user=user,
+                    transaction_id=str(uuid.uuid4()),
+                    transaction_type='booking',
+                    booking=booking,
+                    amount=booking.total_price,
+                    payment_method=payment_method,
+                    status='completed',
+                )
+                for booking in bookings
+            ])
+    except _CellTaken:
+        # look again once the series has been rolled back, so only the bookings in the way are found
+        return None, find_clashes(court, dates, start_time, end_time)
+    return series, {}
@@ -0,0 +1,362 @@
+"""Fixture generation and court scheduling for tournaments.
+
+`schedule_tournament` builds the fixture list from the approved teams, packs the
+matches into the free time of the venue's courts between the tournament's start
+and end dates, and books them all in one transaction. Planning works on integer
+minutes in memory; the database is read once for the existing bookings and
+written with bulk inserts.
+"""
+from bisect import bisect_right
+from datetime import time, timedelta
+from math import ceil
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Booking, BookingSlot, Court, Match
+from . import availability
+from . import stats
+
+
+ROUND_ROBIN = 'round_robin'
+GROUPS = 'groups'
+FORMATS = (ROUND_ROBIN, GROUPS)
+
+CELL_MINUTES = BookingSlot.SLOT_MINUTES
+MINUTES_PER_DAY = 24 * 60
+
+
+class SchedulingError(Exception):
+    """The fixtures cannot be generated or do not fit in the free court time."""
+
+
+class Fixture:
+    """A match before it is placed: who plays, and the fixtures whose results it waits for."""
+
+    def __init__(self, number, stage, round, home, away, group='', after=()):
+        self.number = number
+        self.stage = stage
+        self.round = round
+        self.group = group
+        # (team or None, label)
+        self.home = home
+        self.away = away
+        self.after = tuple(after)
+        # absolute minutes from midnight of the first day, and the court, once placed
+        self.start = self.end = self.court_id = None
+
+
+def round_robin_rounds(entrants):
+    """Pair every entrant with every other one using the circle method.
+
+    Returns a list of rounds, each a list of `(home, away)` pairs, where no
+    entrant plays twice in a round. With an odd count one entrant rests each round.
+    """
+    entrants = list(entrants)
+    if len(entrants) % 2:
+        entrants.append(None)
+    n = len(entrants)
+    rounds = []
+    for r in range(n - 1):
+        pairs = []
+        for i in range(n // 2):
+            home, away = entrants[i], entrants[n - 1 - i]
+            if home is None or away is None:
+                continue
+            # alternate the fixed entrant's side so home/away stays balanced
+            pairs.append((away, home) if i == 0 and r % 2 else (home, away))
+        rounds.append(pairs)
+        entrants = [entrants[0], entrants[-1]] + entrants[1:-1]
+    return rounds
+
+
+def _bracket_order(size):
+    # standard seeding positions: 1 v size, 2 v size-1, ... with top seeds kept apart
+    order = [1]
+    while len(order) < size:
+        order = [seed for s in order for seed in (s, len(order) * 2 + 1 - s)]
+    return order
+
+
+def build_fixtures(teams, format=ROUND_ROBIN, group_size=4, qualifiers_per_group=2):
+    """Fixture list for `teams` (in seeding order), numbered from 1 in play order."""
+    if format not in FORMATS:
+        raise SchedulingError(f'Unknown format {format!r}')
+    if len(teams) < 2:
+        raise SchedulingError('At least two approved teams are needed')
+    entrants = [(team, team.name) for team in teams]
+    fixtures = []
+
+    def add(stage, round, home, away, group='', after=()):
+        fixture = Fixture(len(fixtures) + 1, stage, round, home, away, group, after)
+        fixtures.append(fixture)
+        return fixture
+
+    if format == ROUND_ROBIN:
+        for r, pairs in enumerate(round_robin_rounds(entrants), start=1):
+            for home, away in pairs:
+                add('league', r, home, away)
+        return fixtures
+
+    if group_size < 2 or not 1 <= qualifiers_per_group <= group_size:
+        raise SchedulingError('Groups need at least two teams and at most group_size qualifiers each')
+    group_count = ceil(len(entrants) / group_size)
+    # deal seeds across groups so the strongest teams are spread out
+    groups = [entrants[g::group_count] for g in range(group_count)]
+    names = [chr(ord('A') + g) if g < 26 else f'G{g + 1}' for g in range(group_count)]
+    group_rounds = [round_robin_rounds(members) for members in groups]
+    for r in range(max(len(rounds) for rounds in group_rounds)):
+        for name, rounds in zip(names, group_rounds):
+            for home, away in rounds[r] if r < len(rounds) else ():
+                add('group', r + 1, home, away, group=name)
+    group_stage = [fixture.number for fixture in fixtures]
+
+    places = ['Winner', 'Runner-up'] + [f'#{n}' for n in range(3, qualifiers_per_group + 1)]
+    seeds = [
+        (None, f'{places[q]} Group {name}')
+        for q in range(qualifiers_per_group)
+        for name, members in zip(names, groups) if q < len(members)
+    ]
+    size = 1
+    while size < len(seeds):
+        size *= 2
+    # each slot is (team, label, feeder fixture numbers); missing seeds are byes
+    slots = [(*seeds[p - 1], group_stage) if p <= len(seeds) else None for p in _bracket_order(size)]
+    r = 1
+    while len(slots) > 1:
+        winners = []
+        for home, away in zip(slots[::2], slots[1::2]):
+            if home is None or away is None:
+                winners.append(home or away)
+                continue
+            fixture = add('knockout', r, home[:2], away[:2], after=(*home[2], *away[2]))
+            winners.append((None, f'Winner M{fixture.number}', (fixture.number,)))
+        slots = winners
+        r += 1
+    return fixtures
+
+
+def _free_windows(court_ids, days, day_start, day_end, busy):
+    """Free `[start, end)` minute ranges per court, on the cell grid, within the daily window."""
+    windows = {}
+    for court_id in court_ids:
+        free = []
+        for index, day in enumerate(days):
+            offset = index * MINUTES_PER_DAY
+            cursor = day_start
+            for start, end in sorted(busy.get((court_id, day), ())):
+                # round out to whole cells: a match must not share a cell with a booking
+                start = start // CELL_MINUTES * CELL_MINUTES
+                end = -(-end // CELL_MINUTES) * CELL_MINUTES
+                if start > cursor:
+                    free.append([offset + cursor, offset + min(start, day_end)])
+                cursor = max(cursor, end)
+                if cursor >= day_end:
+                    break
+            if cursor < day_end:
+                free.append([offset + cursor, offset + day_end])
+        windows[court_id] = [w for w in free if w[1] > w[0]]
+    return windows
+
+
+def place_fixtures(fixtures, windows, match_minutes, rest_minutes=30):
+    """Greedily give each fixture the earliest court slot once its teams are ready.
+
+    A team is ready `rest_minutes` after its previous match; knockout fixtures wait
+    for the fixtures they depend on. `windows` maps court ids to free minute ranges
+    and is consumed. Raises SchedulingError when a fixture does not fit.
+    """
+    block = -(-match_minutes // CELL_MINUTES) * CELL_MINUTES
+    starts = {court_id: [w[0] for w in free] for court_id, free in windows.items()}
+    ready_at = {}
+    by_number = {}
+    for fixture in fixtures:
+        teams = [side[0].pk for side in (fixture.home, fixture.away) if side[0] is not None]
+        ready = max([ready_at.get(team, 0) for team in teams] + [by_number[n].end + rest_minutes for n in fixture.after])
+        ready = -(-ready // CELL_MINUTES) * CELL_MINUTES
+
+        best = None
+        for court_id, free in windows.items():
+            # the window holding `ready`, or the first one after it
+            i = max(bisect_right(starts[court_id], ready) - 1, 0)
+            while i < len(free):
+                start = max(free[i][0], ready)
+                if free[i][1] - start >= block:
+                    if best is None or start < best[0]:
+                        best = (start, court_id, i)
+                    break
+                i += 1
+        if best is None:
+            raise SchedulingError(
+                f'Not enough free court time: M{fixture.number} and {len(fixtures) - fixture.number} later match(es) do not fit'
+            )
+
+        start, court_id, i = best
+        free, window = windows[court_id], windows[court_id][i]
+        # split the window around the match
+        pieces = [piece for piece in ([window[0], start], [start + block, window[1]]) if piece[1] > piece[0]]
+        free[i:i + 1] = pieces
+        starts[court_id][i:i + 1] = [piece[0] for piece in pieces]
+
+        fixture.start, fixture.end, fixture.court_id = start, start + match_minutes, court_id
+        by_number[fixture.number] = fixture
+        for team in teams:
+            ready_at[team] = fixture.end + rest_minutes
+    return fixtures
+
+
+def _clock(minutes):
+    minutes %= MINUTES_PER_DAY
+    return time(minutes // 60, minutes % 60)
+
+
+def _end_clock(minutes):
+    # a match that runs to midnight ends at the last second of its day
+    if minutes % MINUTES_PER_DAY == 0:
+        return time(23, 59, 59)
+    return _clock(minutes)
+
+
+def slot_of(fixture, first_day):
+    """`(date, start_time, end_time)` of a placed fixture."""
+    day = first_day + timedelta(days=fixture.start // MINUTES_PER_DAY)
+    return day, _clock(fixture.start), _end_clock(fixture.end)
+
+
+def _busy_ranges(court_ids, start_date, end_date):
+    """Occupied minute ranges per (court_id, date) from bookings and holds, in one query."""
+    fields = ('court_id', 'date', 'start_time', 'end_time')
+    rows = Booking.objects.filter(
+        court__in=court_ids, date__range=(start_date, end_date), status__in=availability.CELL_STATUSES,
+    ).order_by().values_list(*fields).union(
+        availability.active_holds().filter(court__in=court_ids, date__range=(start_date, end_date))
+        .order_by().values_list(*fields),
+        all=True,
+    )
+    busy = {}
+    for court_id, day, start_time, end_time in rows:
+        busy.setdefault((court_id, day), []).append(
+            (availability._minutes(start_time), availability._minutes(end_time, round_up=True))
+        )
+    return busy
+
+
+def schedule_tournament(tournament, user, format=ROUND_ROBIN, match_minutes=60, rest_minutes=30, group_size=4,
+                        qualifiers_per_group=2, day_end=time(22, 0), courts=None, replace=False, commit=True):
+    """Generate and book the fixtures of `tournament`.
+
+    Teams are the approved registrations in the order they registered. Matches are
+    played on the venue's active courts (or `courts`) from `tournament.start_time`
+    to `day_end` on each day of the tournament, around existing bookings. Each match
+    becomes a confirmed Booking owned by `user`. With `replace` earlier fixtures are
+    cancelled first; with `commit=False` nothing is written and the placed
+    `Fixture`s are returned for review.
+
+    Returns the created `Match` rows (or the fixtures when not committing).
+    """
+    if match_minutes <= 0:
+        raise SchedulingError('match_minutes must be positive')
+    teams = [
+        registration.team
+        for registration in tournament.registrations.filter(status='approved').select_related('team').order_by('created_at', 'pk')
+    ]
+    fixtures = build_fixtures(teams, format, group_size, qualifiers_per_group)
+
+    if courts is None:
+        courts = Court.objects.filter(venue_id=tournament.venue_id, is_active=True)
+    days = [tournament.start_date + timedelta(days=n) for n in range((tournament.end_date - tournament.start_date).days + 1)]
+    day_start = availability._minutes(tournament.start_time)
+    day_end = availability._minutes(day_end) or MINUTES_PER_DAY
+
+    with transaction.atomic():
+        # lock the courts so no booking can slip into the gaps we are filling
+        venue_of = dict(Court.objects.select_for_update().filter(pk__in=[c.pk for c in courts]).order_by('pk')
+                        .values_list('pk', 'venue_id'))
+        court_ids = list(venue_of)
+        if not court_ids:
+            raise SchedulingError(f'{tournament.venue} has no active courts')
+
+        existing = Match.objects.filter(tournament=tournament)
+        if existing.exists():
+            if not replace:
+                raise SchedulingError('The tournament already has fixtures; pass replace=True to reschedule')
+            if commit:
+                _cancel_fixtures(existing)
+
+        busy = _busy_ranges(court_ids, days[0], days[-1])
+        if replace and not commit:
+            # ignore the bookings of the fixtures that would be replaced
+            for match in existing:
+                ranges = busy.get((match.court_id, match.date), [])
+                span = (availability._minutes(match.start_time), availability._minutes(match.end_time, round_up=True))
+                if span in ranges:
+                    ranges.remove(span)
+        windows = _free_windows(court_ids, days, day_start, day_end, busy)
+        place_fixtures(fixtures, windows, match_minutes, rest_minutes)
+        if not commit:
+            transaction.set_rollback(True)
+            return fixtures
+        return _book(tournament, user, fixtures, days, venue_of)
+
+
+def _cancel_fixtures(matches):
+    bookings = Booking.objects.filter(match__in=matches)
+    rows = stats.booking_rows(bookings)
+    availability.release_cells(bookings)
+    bookings.update(status='cancelled', updated_at=timezone.now())
+    stats.bookings_changed(rows, 'cancelled')
+    matches.delete()
+
+
+def _book(tournament, user, fixtures, days, venue_of):
+    bookings = []
+    for fixture in fixtures:
+        day, start_time, end_time = slot_of(fixture, days[0])
+        bookings.append(Booking(
+            user=user,
+            court_id=fixture.court_id,
+            date=day,
+            start_time=start_time,
+            end_time=end_time,
+            status='confirmed',
+            total_price=0,
+            notes=f'{tournament.name} M{fixture.number}: {fixture.home[1]} v {fixture.away[1]}',
+        ))
+    Booking.objects.bulk_create(bookings, batch_size=500)
+
+    try:
+        with transaction.atomic():
+            BookingSlot.objects.bulk_create([
+                BookingSlot(court_id=booking.court_id, date=booking.date, slot_index=i, booking=booking)
+                for booking in bookings
+                for i in availability.cell_indexes(booking.start_time, booking.end_time)
+            ], batch_size=2000)
+    except IntegrityError:
+        # cannot happen while the courts are locked, but never double book
+        raise SchedulingError('A court slot was taken while scheduling; try again')
+    availability.refresh_occupancy({(booking.court_id, booking.date) for booking in bookings})
+    # `courts` may come from other venues than the tournament's; credit each booking to its court's
+    stats.bookings_changed(
+        [(venue_of[booking.court_id], booking.date, None, booking.total_price) for booking in bookings], 'confirmed'
+    )
+
+    matches = [
+        Match(
+            tournament=tournament,
+            number=fixture.number,
+            stage=fixture.stage,
+            round=fixture.round,
+            group=fixture.group,
+            home_team=fixture.home[0],
+            away_team=fixture.away[0],
+            home_label=fixture.home[1],
+            away_label=fixture.away[1],
+            court_id=booking.court_id,
+            date=booking.date,
+            start_time=booking.start_time,
+            end_time=booking.end_time,
+            booking=booking,
+        )
+        for fixture, booking in zip(fixtures, bookings)
+    ]
+    return Match.objects.bulk_create(matches, batch_size=500)
@@ -1,9 +1,88 @@
 from rest_framework import serializers
-from .models import Tournament, Team, TournamentRegistration
+from .models import Booking, Court, Venue, Tournament, Team, TournamentRegistration
 
 
-class TournamentSerializer(serializers.ModelSerializer):
-    approved_registrations_count = serializers.IntegerField(source='approved_registrations_count', read_only=True)
+def requested_fields(request):
+    """Field names asked for with `?fields=a,b`, or None when every field is wanted."""
+    value = request.query_params.get('fields', '') if request is not None else ''
+    names = {name.strip() for name in value.split(',') if name.strip()}
+    return names or None
+
+
+class FieldSelectionMixin:
+    """Serialize only the fields named in the request's `?fields=`, to keep list payloads small."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted = requested_fields(self.context.get('request'))
+        if wanted is None:
+            return fields
+        unknown = wanted - set(fields)
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown field(s): {', '.join(sorted(unknown))}"})
+        return {name: field for name, field in fields.items() if name in wanted}
+
+
+class VenueSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    # both annotated by VenueViewSet, so a page of venues costs one query
+    rating = serializers.FloatField(source='average_rating_value', read_only=True)
+    courts_count = serializers.IntegerField(read_only=True)
+
+    class Meta:
+        model = Venue
+        fields = [
+            'id',
+            'name',
+            'address',
+            'city',
+            'phone',
+            'email',
+            'description',
+            'rating',
+            'review_count',
+            'courts_count',
+            'updated_at',
+        ]
+
+
+class CourtSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    venue_name = serializers.CharField(source='venue.name', read_only=True)
+
+    class Meta:
+        model = Court
+        fields = ['id', 'venue', 'venue_name', 'name', 'capacity', 'price_per_hour', 'description', 'updated_at']
+
+
+class BookingSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    venue = serializers.IntegerField(source='court.venue_id', read_only=True)
+    venue_name = serializers.CharField(source='court.venue.name', read_only=True)
+    court_name = serializers.CharField(source='court.name', read_only=True)
+
+    class Meta:
+        model = Booking
+        fields = [
+            'id',
+            'court',
+            'court_name',
+            'venue',
+            'venue_name',
+            'date',
+            'start_time',
+            'end_time',
+            'number_of_players',
+            'total_price',
+            'status',
+            'notes',
+            'created_at',
+            'updated_at',
+        ]
+        read_only_fields = fields
+
+
+class TournamentSerializer(FieldSelectionMixin, serializers.ModelSerializer):
+    # a counter column kept by TournamentRegistration.save(), so no COUNT per tournament
+    approved_registrations_count = serializers.IntegerField(source='approved_count', read_only=True)
+    venue_name = serializers.CharField(source='venue.name', read_only=True)
 
     class Meta:
         model = Tournament
@@ -16,6 +95,7 @@ class TournamentSerializer(serializers.ModelSerializer):
             'end_date',
             'start_time',
             'venue',
+            'venue_name',
             'max_teams',
             'entry_fee',
             'status',
@@ -41,3 +121,11 @@ class TournamentRegistrationSerializer(serializers.ModelSerializer):
         model = TournamentRegistration
         fields = ['id', 'tournament', 'team', 'status', 'created_at']
         read_only_fields = ['status', 'created_at']
+
+
+class TournamentWithRegistrationsSerializer(TournamentSerializer):
+    """Tournament plus every team registration, for administrators."""
+    registrations = TournamentRegistrationSerializer(many=True, read_only=True)
+
+    class Meta(TournamentSerializer.Meta):
+        fields = TournamentSerializer.Meta.fields + ['registrations']
@@ -0,0 +1,52 @@
+"""Pluggable SMS providers used by the notification worker.
+
+Select one with the `SMS_BACKEND` setting (a dotted path). When it is empty the
+Twilio backend is used if Twilio credentials are configured, otherwise SMS is
+disabled and no text messages are queued.
+"""
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+# messages "sent" through LocMemBackend, for tests
+outbox = []
+
+
+class ConsoleBackend:
+    """Fake provider that prints messages; enough to exercise the outbox locally."""
+
+    def send(self, to, body):
+        print(f"SMS to {to}: {body}")
+
+
+class LocMemBackend:
+    def send(self, to, body):
+        outbox.append({'to': to, 'body': body})
+
+
+class TwilioBackend:
+    """Sends through Twilio, reusing one REST client for the worker's lifetime."""
+
+    def __init__(self):
+        from twilio.rest import Client
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, to, body):
+        self.client.messages.create(body=body, from_=settings.TWILIO_PHONE_NUMBER, to=to)
+
+
+def _twilio_configured():
+    return bool(settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER)
+
+
+def is_enabled():
+    return bool(getattr(settings, 'SMS_BACKEND', '')) or _twilio_configured()
+
+
+def get_backend():
+    path = getattr(settings, 'SMS_BACKEND', '')
+    if path:
+        return import_string(path)()
+    if _twilio_configured():
+        return TwilioBackend()
+    return None
@@ -0,0 +1,185 @@
+"""Incremental maintenance of the `DashboardStats` rollup.
+
+Every code path that creates a booking or registration or changes its status
+reports the change here. The change becomes `F()` increments on the affected
+(day, venue) rows, applied in the caller's transaction.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Booking, DashboardStats, TournamentRegistration
+
+
+BOOKING_FIELDS = {
+    'pending': 'pending_bookings',
+    'confirmed': 'confirmed_bookings',
+    'cancelled': 'cancelled_bookings',
+    'completed': 'completed_bookings',
+}
+REVENUE_STATUSES = ('confirmed', 'completed')
+COUNTER_FIELDS = tuple(BOOKING_FIELDS.values()) + ('revenue', 'pending_registrations')
+
+
+def _booking_delta(deltas, key, status, total_price, sign):
+    field = BOOKING_FIELDS.get(status)
+    if field:
+        deltas[key][field] += sign
+    if status in REVENUE_STATUSES:
+        deltas[key]['revenue'] += sign * (total_price or Decimal(0))
+
+
+def apply(deltas):
+    """Add `{(day, venue_id): {field: delta}}` to the rollup, creating missing rows."""
+    deltas = {key: {f: d for f, d in changes.items() if d} for key, changes in deltas.items()}
+    deltas = {key: changes for key, changes in deltas.items() if changes}
+    if not deltas:
+        return
+    with transaction.atomic():
+        DashboardStats.objects.bulk_create(
+            [DashboardStats(date=day, venue_id=venue_id) for day, venue_id in deltas],
+            ignore_conflicts=True,
+        )
+        for (day, venue_id), changes in deltas.items():
+            DashboardStats.objects.filter(date=day, venue_id=venue_id).update(
+                **{field: F(field) + delta for field, delta in changes.items()}
+            )
+
+
+def booking_changed(booking, previous_status=None):
+    """Record a single booking entering `booking.status`; `previous_status` is None for a new booking."""
+    bookings_changed([(booking.court.venue_id, booking.date, previous_status, booking.total_price)], booking.status)
+
+
+def bookings_changed(rows, new_status):
+    """Record bookings moving to `new_status`.
+
+    `rows` are `(venue_id, date, previous_status, total_price)`; a previous status of
+    None means the booking is new.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for venue_id, day, previous_status, total_price in rows:
+        if previous_status == new_status:
+            continue
+        if previous_status is not None:
+            _booking_delta(deltas, (day, venue_id), previous_status, total_price, -1)
+        _booking_delta(deltas, (day, venue_id), new_status, total_price, 1)
+    apply(deltas)
+
+
+def bookings_removed(rows):
+    """Take bookings out of the rollup, e.g. when deleted; rows as from `booking_rows`."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for venue_id, day, status, total_price in rows:
+        _booking_delta(deltas, (day, venue_id), status, total_price, -1)
+    apply(deltas)
+
+
+def booking_rows(queryset):
+    """Lock the bookings of `queryset` and return them as rows for `bookings_changed`."""
+    return list(queryset.select_for_update().values_list('court__venue_id', 'date', 'status', 'total_price'))
+
+
+def registration_rows(queryset):
+    """Lock the registrations of `queryset` and return `(venue_id, submitted day, status)` rows."""
+    return [
+        (venue_id, day, status)
+        for venue_id, day, status in queryset.select_for_update()
+        .annotate(day=TruncDate('created_at'))
+        .values_list('tournament__venue_id', 'day', 'status')
+    ]
+
+
+def registrations_changed(rows, new_status):
+    """Record registrations moving to `new_status`; rows as from `registration_rows`, status None if new."""
+    deltas = defaultdict(lambda: defaultdict(int))
+    for venue_id, day, previous_status in rows:
+        if previous_status == new_status:
+            continue
+        if previous_status == 'pending':
+            deltas[(day, venue_id)]['pending_registrations'] -= 1
+        if new_status == 'pending':
+            deltas[(day, venue_id)]['pending_registrations'] += 1
+    apply(deltas)
+
+
+def registrations_removed(rows):
+    """Take registrations out of the rollup, e.g. when deleted; rows as from `registration_rows`."""
+    registrations_changed(rows, None)
+
+
+def registration_changed(registration, previous_status=None):
+    """Record a single registration entering `registration.status`; None for a new one."""
+    day = timezone.localdate(registration.created_at)
+    registrations_changed([(registration.tournament.venue_id, day, previous_status)], registration.status)
+
+
+def compute():
+    """Recompute the rollup from the source tables as `{(day, venue_id): {field: value}}`."""
+    totals = defaultdict(lambda: dict.fromkeys(COUNTER_FIELDS, 0))
+    booking_aggregates = {field: Count('pk', filter=Q(status=status)) for status, field in BOOKING_FIELDS.items()}
+    rows = (
+        Booking.objects.values('date', 'court__venue_id')
+        .annotate(revenue=Sum('total_price', filter=Q(status__in=REVENUE_STATUSES)), **booking_aggregates)
+        .order_by()
+    )
+    for row in rows:
+        values = totals[(row['date'], row['court__venue_id'])]
+        values.update({field: row[field] for field in BOOKING_FIELDS.values()})
+        values['revenue'] = row['revenue'] or Decimal(0)
+    rows = (
+        TournamentRegistration.objects.filter(status='pending')
+        .annotate(day=TruncDate('created_at'))
+        .values('day', 'tournament__venue_id')
+        .annotate(pending=Count('pk'))
+        .order_by()
+    )
+    for row in rows:
+        totals[(row['day'], row['tournament__venue_id'])]['pending_registrations'] = row['pending']
+    return {key: values for key, values in totals.items() if any(values.values())}
+
+
+def check():
+    """Compare the stored rollup with a fresh `compute()`.
+
+    Returns `{(day, venue_id): (stored, expected)}` for every row that differs.
+    """
+    expected = compute()
+    stored = {
+        (row['date'], row['venue_id']): {field: row[field] for field in COUNTER_FIELDS}
+        for row in DashboardStats.objects.values('date', 'venue_id', *COUNTER_FIELDS)
+    }
+    zero = dict.fromkeys(COUNTER_FIELDS, 0)
+    mismatches = {}
+    for key in stored.keys() | expected.keys():
+        have, want = stored.get(key, zero), expected.get(key, zero)
+        if have != want:
+            mismatches[key] = (have, want)
+    return mismatches
+
+
+def rebuild():
+    """Replace the rollup with freshly computed values."""
+    expected = compute()
+    with transaction.atomic():
+        DashboardStats.objects.all().delete()
+        DashboardStats.objects.bulk_create(
+            [DashboardStats(date=day, venue_id=venue_id, **values) for (day, venue_id), values in expected.items()],
+            batch_size=500,
+        )
+    return len(expected)
+
+
+def headline(start=None, end=None):
+    """Sum the rollup over `start`..`end` (inclusive, both optional) in one query."""
+    rows = DashboardStats.objects.all()
+    if start:
+        rows = rows.filter(date__gte=start)
+    if end:
+        rows = rows.filter(date__lte=end)
+    totals = rows.aggregate(**{field: Sum(field) for field in COUNTER_FIELDS})
+    return {field: value or 0 for field, value in totals.items()}
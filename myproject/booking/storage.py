@@ -0,0 +1,79 @@
+"""Content-addressed file storage for payment proofs.
+
+An upload is hashed while it is copied to a temporary file, chunk by chunk, so
+memory stays flat whatever its size. It is then stored as
+`<upload_to>/<aa>/<sha256><ext>`. A blob that already exists is not written a
+second time, so a screenshot uploaded again costs no disk and gets the same
+name. The digest is what `Payment.proof_digest` indexes to find proofs reused
+across payments.
+
+Blobs may be shared between payments. Nothing in the app deletes proof files;
+any cleanup must first check that no `Payment.proof_digest` still points at one.
+"""
+import hashlib
+import os
+import posixpath
+import tempfile
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+CHUNK_SIZE = 64 * 1024
+
+
+def file_digest(file, chunk_size=CHUNK_SIZE):
+    """SHA-256 hex digest of an open file, read in chunks from the start."""
+    digest = hashlib.sha256()
+    if hasattr(file, 'seek'):
+        file.seek(0)
+    chunks = file.chunks(chunk_size) if hasattr(file, 'chunks') else iter(lambda: file.read(chunk_size), b'')
+    for chunk in chunks:
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    def get_available_name(self, name, max_length=None):
+        # the final name is the digest, decided in _save(); an existing blob is reused, not renamed
+        return name
+
+    def _save(self, name, content):
+        directory = posixpath.dirname(name)
+        ext = os.path.splitext(name)[1].lower()[:10]
+        os.makedirs(self.path(directory or '.'), exist_ok=True)
+
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=self.path(directory or '.'), prefix='.upload-')
+        try:
+            with os.fdopen(handle, 'wb') as temp:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    temp.write(chunk)
+            hexdigest = digest.hexdigest()
+            final = posixpath.join(directory, hexdigest[:2], hexdigest + ext)
+            if self.exists(final):
+                return final
+            os.makedirs(os.path.dirname(self.path(final)), exist_ok=True)
+            if self.file_permissions_mode is not None:
+                os.chmod(temp_path, self.file_permissions_mode)
+            # atomic on one filesystem: a concurrent identical upload just writes the same bytes
+            os.replace(temp_path, self.path(final))
+            return final
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    @staticmethod
+    def digest_of(name):
+        """The digest a stored name was derived from, or '' for names not written by this storage."""
+        stem = os.path.splitext(posixpath.basename(name or ''))[0]
+        if len(stem) == 64 and all(c in '0123456789abcdef' for c in stem):
+            return stem
+        return ''
+
+
+proof_storage = ContentAddressedStorage()
@@ -0,0 +1,31 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.utils.html import format_html
+
+from booking.images import WIDTHS, derivatives_attname, is_stale
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def srcset(file, sizes='100vw', default='card'):
+    """`src`, `srcset` and `sizes` attributes for an <img> of a poster, logo or ad image.
+
+    Usage: `<img {% srcset tournament.poster sizes="(max-width: 600px) 100vw, 360px" %} alt="...">`.
+    Falls back to the original upload until its derivatives have been generated.
+    """
+    if not file:
+        return ''
+    derivatives = getattr(file.instance, derivatives_attname(file.field.name), None) or {}
+    if is_stale(file, derivatives) or 'error' in derivatives:
+        return format_html('src="{}"', file.url)
+
+    by_width = {}
+    for label, _ in WIDTHS:
+        if label in derivatives:
+            # a small original yields the same width for several labels
+            by_width.setdefault(derivatives[label]['width'], derivatives[label]['name'])
+    src = derivatives.get(default) or derivatives[WIDTHS[-1][0]]
+    candidates = ', '.join(f'{default_storage.url(name)} {width}w' for width, name in sorted(by_width.items()))
+    return format_html('src="{}" srcset="{}" sizes="{}"', default_storage.url(src['name']), candidates, sizes)
@@ -1,9 +1,47 @@
+import csv
+import hashlib
+import gzip
+import json
+import os
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock, skipUnless
 from django.test import TestCase, Client
+from django.db import connection
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
-from .models import Venue, Court, Booking
+from .models import (Venue, Court, PricingRule, Booking, BookingSlot, CourtOccupancy, SlotHold, Payment, Notification, VenueViewStat,
+                     Advertisement, Review, Tournament, TournamentFull, Team, TournamentRegistration, Match,
+                     Player, AdStat, Sponsor, DashboardStats)
 from django.core import mail
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from PIL import Image
 from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management import call_command, CommandError
+from django.test import override_settings
+from datetime import date, time, timedelta
+from decimal import Decimal
+from . import availability
+from . import pricing
+from . import sms
+from . import analytics
+from . import stats
+from . import scheduling
+from . import players
+from . import recurring
+from . import ads
+from . import images
+from . import utils
+from .outbox import deliver_pending
+from .availability import CourtDayIndex, expire_holds
+from django.utils import timezone
+from .forms import BookingForm
 
 User = get_user_model()
 
@@ -59,3 +97,1453 @@ class BookingWorkflowTests(TestCase):
         self.assertEqual(resp.status_code, 302)
         self.assertIn(reverse('admin_dashboard'), resp.url)
 
+
+
+class AvailabilityIndexTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+
+    def test_conflicts_returns_overlapping_ranges_only(self):
+        index = CourtDayIndex([
+            (time(14, 0), time(15, 0)),
+            (time(9, 0), time(10, 0)),
+            (time(10, 30), time(12, 0)),
+        ])
+        self.assertEqual(index.conflicts(time(9, 30), time(11, 0)), [
+            (time(9, 0), time(10, 0)),
+            (time(10, 30), time(12, 0)),
+        ])
+        # touching ranges are not conflicts
+        self.assertTrue(index.is_free(time(10, 0), time(10, 30)))
+        self.assertTrue(index.is_free(time(12, 0), time(14, 0)))
+
+    def test_form_reports_conflicting_confirmed_booking(self):
+        Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1),
+                               start_time=time(10, 0), end_time=time(11, 0), status='confirmed')
+        # cancelled bookings do not block the slot
+        Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1),
+                               start_time=time(12, 0), end_time=time(13, 0), status='cancelled')
+        form = BookingForm(data={
+            'court': self.court.id, 'date': '2030-01-01',
+            'start_time': '10:30', 'end_time': '12:30', 'number_of_players': 6,
+        })
+        self.assertFalse(form.is_valid())
+        self.assertIn('10:00 - 11:00', str(form.non_field_errors()))
+        self.assertNotIn('12:00 - 13:00', str(form.non_field_errors()))
+
+    def test_venue_availability_grid(self):
+        other = Court.objects.create(venue=self.venue, name='Court2')
+        Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1),
+                               start_time=time(10, 0), end_time=time(11, 30), status='confirmed')
+        resp = self.client.get(reverse('venue_availability', kwargs={'pk': self.venue.pk}),
+                               {'start': '2030-01-01', 'days': 2, 'slot': 60})
+        self.assertEqual(resp.status_code, 200)
+        grid = {c['id']: c['days'] for c in resp.json()['courts']}
+        self.assertEqual(grid[self.court.id]['2030-01-01'], '0' * 10 + '11' + '0' * 12)
+        self.assertEqual(grid[self.court.id]['2030-01-02'], '0' * 24)
+        self.assertEqual(grid[other.id]['2030-01-01'], '0' * 24)
+
+        resp = self.client.get(reverse('venue_availability', kwargs={'pk': self.venue.pk}), {'slot': 7})
+        self.assertEqual(resp.status_code, 400)
+
+
+@skipUnless(connection.vendor == 'sqlite', 'EXPLAIN QUERY PLAN is SQLite specific')
+class BookingQueryPlanTests(TestCase):
+    """Hot Booking queries must be answered through an index, never a full table scan."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [User.objects.create_user(email=f'plan{i}@example.com') for i in range(20)]
+        venue = Venue.objects.create(name='Plan Venue')
+        cls.courts = [Court.objects.create(venue=venue, name=f'Court{i}') for i in range(10)]
+        statuses = [choice[0] for choice in Booking.STATUS_CHOICES]
+        Booking.objects.bulk_create([
+            Booking(
+                user=cls.users[i % len(cls.users)],
+                court=cls.courts[i % 10],
+                date=date(2030, 1, 1) + timedelta(days=i // 40),
+                start_time=time(8 + i % 40 // 10, 0),
+                end_time=time(8 + i % 40 // 10, 30),
+                status=statuses[i % len(statuses)],
+            )
+            for i in range(2000)
+        ])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def assertUsesIndex(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+            plan = [row[-1] for row in cursor.fetchall()]
+        scans = [step for step in plan if step.startswith('SCAN booking_booking')]
+        self.assertFalse(scans, f'full table scan in plan: {plan}')
+
+    def test_availability_check(self):
+        court_day = Booking.objects.filter(court=self.courts[0], date=date(2030, 1, 1), status__in=availability.BLOCKING_STATUSES)
+        self.assertUsesIndex(court_day.values_list('start_time', 'end_time'))
+        self.assertUsesIndex(court_day.filter(start_time__lt=time(12, 0), end_time__gt=time(10, 0)))
+
+    def test_user_booking_lists(self):
+        user = self.users[0]
+        self.assertUsesIndex(Booking.objects.filter(user=user).order_by('-date', 'start_time'))
+        self.assertUsesIndex(user.bookings.all().order_by('-date', '-start_time'))
+
+    def test_admin_dashboard_sections(self):
+        for status in ('pending', 'confirmed', 'cancelled'):
+            self.assertUsesIndex(Booking.objects.filter(status=status).order_by('-created_at'))
+
+
+class SlotHoldTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.other = User.objects.create_user(email='other@example.com', password='otherpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+        self.data = {
+            'court': self.court.id,
+            'date': '2030-01-01',
+            'start_time': '10:00',
+            'end_time': '12:00',
+            'number_of_players': 6,
+        }
+
+    def test_hold_blocks_other_users_until_it_expires(self):
+        self.client.login(email='user@example.com', password='userpass')
+        self.client.post(reverse('booking_create'), self.data)
+        hold = SlotHold.objects.get(user=self.user)
+
+        other = Client()
+        other.login(email='other@example.com', password='otherpass')
+        resp = other.post(reverse('booking_create'), self.data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(SlotHold.objects.filter(user=self.other).exists())
+
+        SlotHold.objects.filter(pk=hold.pk).update(expires_at=timezone.now() - timedelta(minutes=1))
+        resp = other.post(reverse('booking_create'), self.data)
+        self.assertEqual(resp.url, reverse('booking_payment'))
+        self.assertEqual(expire_holds(), 1)
+
+    def test_payment_converts_hold_and_rejects_taken_slot(self):
+        self.client.login(email='user@example.com', password='userpass')
+        self.client.post(reverse('booking_create'), self.data)
+        SlotHold.objects.all().update(expires_at=timezone.now() - timedelta(minutes=1))
+
+        other = Client()
+        other.login(email='other@example.com', password='otherpass')
+        other.post(reverse('booking_create'), self.data)
+        resp = other.post(reverse('booking_payment'), {'method': 'upi'})
+        booking = Booking.objects.get(user=self.other)
+        self.assertEqual(resp.url, reverse('booking_payment_success', kwargs={'pk': booking.pk}))
+        self.assertFalse(SlotHold.objects.filter(user=self.other).exists())
+
+        # the first user's hold lapsed and the slot is now paid for by someone else
+        resp = self.client.post(reverse('booking_payment'), {'method': 'upi'})
+        self.assertEqual(resp.url, reverse('booking_create'))
+        self.assertFalse(Booking.objects.filter(user=self.user).exists())
+
+
+class BookingSlotCellTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+
+    def _booking(self, start, end, status='cancelled'):
+        return Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1),
+                                      start_time=start, end_time=end, status=status)
+
+    def test_overlapping_confirmation_is_rejected_at_insert(self):
+        first = self._booking(time(10, 0), time(11, 0))
+        second = self._booking(time(10, 30), time(11, 30))
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+
+        self.client.get(reverse('admin_update_booking', args=[first.pk, 'confirm']))
+        self.assertEqual(BookingSlot.objects.filter(booking=first).count(), 4)
+
+        self.client.get(reverse('admin_update_booking', args=[second.pk, 'confirm']))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'cancelled')
+        self.assertFalse(BookingSlot.objects.filter(booking=second).exists())
+
+        # cancelling releases the cells so the other booking can take the slot
+        self.client.get(reverse('admin_update_booking', args=[first.pk, 'cancel']))
+        self.assertFalse(BookingSlot.objects.filter(booking=first).exists())
+        self.client.get(reverse('admin_update_booking', args=[second.pk, 'confirm']))
+        second.refresh_from_db()
+        self.assertEqual(second.status, 'confirmed')
+
+    def test_claim_cells_reports_clashing_ranges(self):
+        first = self._booking(time(10, 0), time(11, 0), status='confirmed')
+        availability.claim_cells(first)
+        second = self._booking(time(9, 45), time(10, 15), status='confirmed')
+        with self.assertRaises(availability.SlotUnavailable) as ctx:
+            availability.claim_cells(second)
+        self.assertEqual(ctx.exception.ranges, [(time(10, 0), time(11, 0))])
+
+    def _edit(self, booking, **changes):
+        data = {'court': booking.court_id, 'date': booking.date.isoformat(), 'start_time': booking.start_time.strftime('%H:%M'),
+                'end_time': booking.end_time.strftime('%H:%M'), 'number_of_players': booking.number_of_players,
+                'status': booking.status, 'notes': ''}
+        data.update(changes)
+        return self.client.post(reverse('admin:booking_booking_change', args=[booking.pk]), data)
+
+    def test_admin_change_form_moves_and_releases_cells(self):
+        booking = self._booking(time(10, 0), time(11, 0), status='confirmed')
+        availability.claim_cells(booking)
+        other = self._booking(time(14, 0), time(15, 0), status='confirmed')
+        availability.claim_cells(other)
+        self.client.force_login(self.admin)
+
+        self.assertEqual(self._edit(booking, start_time='18:00', end_time='19:00').status_code, 302)
+        self.assertEqual(sorted(BookingSlot.objects.filter(booking=booking).values_list('slot_index', flat=True)),
+                         list(availability.cell_indexes(time(18, 0), time(19, 0))))
+        bits = CourtOccupancy.objects.get(court=self.court, date=date(2030, 1, 1)).bits
+        self.assertEqual(bits, availability.occupancy_mask(time(14, 0), time(15, 0)) | availability.occupancy_mask(time(18, 0), time(19, 0)))
+
+        # a clash is a form error, not a 500
+        booking.refresh_from_db()
+        response = self._edit(booking, start_time='14:30', end_time='15:30')
+        self.assertContains(response, 'already booked at 14:00 - 15:00')
+
+        self._edit(booking, status='cancelled')
+        self.assertFalse(BookingSlot.objects.filter(booking=booking).exists())
+        self.client.post(reverse('admin:booking_booking_delete', args=[other.pk]), {'post': 'yes'})
+        self.assertFalse(BookingSlot.objects.exists())
+        self.assertEqual(CourtOccupancy.objects.get(court=self.court, date=date(2030, 1, 1)).bits, 0)
+
+
+class RecurringBookingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+        self.client.login(email='user@example.com', password='userpass')
+        self.data = {
+            'court': self.court.id,
+            'start_date': '2030-01-01',
+            'end_date': '2030-03-26',
+            'interval_weeks': 1,
+            'start_time': '19:00',
+            'end_time': '21:00',
+            'skip_dates': '2030-01-15',
+            'number_of_players': 8,
+            'payment_method': 'upi',
+        }
+
+    def test_series_creates_all_occurrences_with_payments(self):
+        resp = self.client.post(reverse('recurring_booking_create'), self.data)
+        self.assertEqual(resp.status_code, 302)
+        bookings = Booking.objects.filter(user=self.user)
+        # 13 Tuesdays minus one skipped date
+        self.assertEqual(bookings.count(), 12)
+        self.assertFalse(bookings.filter(date=date(2030, 1, 15)).exists())
+        self.assertEqual(Payment.objects.filter(booking__in=bookings).count(), 12)
+        self.assertEqual(BookingSlot.objects.filter(booking__in=bookings).count(), 12 * 8)
+
+    def test_clashing_dates_are_reported_and_nothing_is_booked(self):
+        Booking.objects.create(user=self.user, court=self.court, date=date(2030, 2, 5),
+                               start_time=time(20, 0), end_time=time(22, 0), status='confirmed')
+        resp = self.client.post(reverse('recurring_booking_create'), self.data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['clashes'], [(date(2030, 2, 5), '20:00 - 22:00')])
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_cells_taken_after_the_check_are_reported_as_clashes(self):
+        booking = Booking.objects.create(user=self.user, court=self.court, date=date(2030, 2, 5),
+                                         start_time=time(20, 0), end_time=time(22, 0), status='confirmed')
+        availability.claim_cells(booking)
+        find_clashes = recurring.find_clashes
+        calls = []
+
+        def racing_find_clashes(*args):
+            # the first check runs before the other booking commits, so it sees nothing
+            calls.append(args)
+            return {} if len(calls) == 1 else find_clashes(*args)
+
+        with mock.patch.object(recurring, 'find_clashes', racing_find_clashes):
+            resp = self.client.post(reverse('recurring_booking_create'), self.data)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context['clashes'], [(date(2030, 2, 5), '20:00 - 22:00')])
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(BookingSlot.objects.exclude(booking=booking).count(), 0)
+
+
+class OccupancyBitmapTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue', city='Pune')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+        self.other_court = Court.objects.create(venue=self.venue, name='Court2')
+        Court.objects.create(venue=Venue.objects.create(name='Elsewhere', city='Goa'), name='Court3')
+
+    def test_confirm_and_cancel_update_bitmap(self):
+        booking = Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 4),
+                                         start_time=time(19, 0), end_time=time(20, 15), status='cancelled')
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.client.get(reverse('admin_update_booking', args=[booking.pk, 'confirm']))
+        bits = CourtOccupancy.objects.get(court=self.court, date=date(2030, 1, 4)).bits
+        # 19:00-20:15 occupies the half hours starting at 19:00, 19:30 and 20:00
+        self.assertEqual(bits, 0b111 << 38)
+
+        resp = self.client.get(reverse('free_courts'), {'city': 'pune', 'date': '2030-01-04', 'start': '20:00', 'end': '21:00'})
+        self.assertEqual([c['id'] for c in resp.json()['courts']], [self.other_court.id])
+        resp = self.client.get(reverse('free_courts'), {'city': 'pune', 'date': '2030-01-04', 'start': '20:30', 'end': '21:00'})
+        self.assertEqual(len(resp.json()['courts']), 2)
+
+        self.client.get(reverse('admin_update_booking', args=[booking.pk, 'cancel']))
+        self.assertEqual(CourtOccupancy.objects.get(court=self.court, date=date(2030, 1, 4)).bits, 0)
+
+    def test_held_courts_are_not_free(self):
+        availability.hold_slot(self.user, self.court, date(2030, 1, 4), time(19, 0), time(20, 0))
+        params = {'city': 'pune', 'date': '2030-01-04', 'start': '19:30', 'end': '21:00'}
+        with self.assertNumQueries(1):
+            resp = self.client.get(reverse('free_courts'), params)
+        self.assertEqual([c['id'] for c in resp.json()['courts']], [self.other_court.id])
+
+        # expired holds no longer block the court
+        SlotHold.objects.update(expires_at=timezone.now())
+        resp = self.client.get(reverse('free_courts'), params)
+        self.assertEqual(len(resp.json()['courts']), 2)
+
+
+class PricingTests(TestCase):
+    def setUp(self):
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1', price_per_hour=Decimal('500.00'))
+        PricingRule.objects.create(court=self.court, name='Evening peak', weekdays=PricingRule.WEEKDAYS,
+                                   start_time=time(18, 0), end_time=time(22, 0), price_per_hour=Decimal('800.00'))
+        PricingRule.objects.create(court=self.court, name='Weekend', weekdays=PricingRule.WEEKEND,
+                                   start_time=time(6, 0), end_time=time(0, 0), price_per_hour=Decimal('900.00'))
+
+    def test_quote_many_applies_rules_exactly(self):
+        tuesday, saturday = date(2030, 1, 1), date(2030, 1, 5)
+        with self.assertNumQueries(1):
+            prices = pricing.quote_many(self.court, [
+                (tuesday, time(10, 0), time(11, 0)),
+                # half off-peak, half peak
+                (tuesday, time(17, 30), time(18, 30)),
+                (tuesday, time(21, 50), time(22, 10)),
+                (saturday, time(19, 0), time(21, 0)),
+            ])
+        self.assertEqual(prices, [Decimal('500.00'), Decimal('650.00'), Decimal('216.67'), Decimal('1800.00')])
+        # the compiled table is cached per court
+        with self.assertNumQueries(0):
+            pricing.quote(self.court, tuesday, time(9, 0), time(10, 0))
+
+    def test_rule_changes_invalidate_the_table(self):
+        tuesday = date(2030, 1, 1)
+        self.assertEqual(pricing.quote(self.court, tuesday, time(10, 0), time(11, 0)), Decimal('500.00'))
+        self.court.price_per_hour = Decimal('600.00')
+        self.court.save()
+        self.assertEqual(pricing.quote(self.court, tuesday, time(10, 0), time(11, 0)), Decimal('600.00'))
+
+    def test_rules_must_end_after_they_start(self):
+        rule = PricingRule(court=self.court, name='Backwards', start_time=time(22, 0), end_time=time(18, 0),
+                           price_per_hour=Decimal('700.00'))
+        with self.assertRaises(ValidationError):
+            rule.full_clean()
+        rule.end_time = time(0, 0)
+        rule.full_clean()
+
+
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.user = User.objects.create_user(email='user@example.com', password='userpass', phone='9876543210')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+        self.booking = Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1),
+                                              start_time=time(10, 0), end_time=time(11, 0), status='cancelled')
+        sms.outbox.clear()
+
+    @override_settings(SMS_BACKEND='booking.sms.LocMemBackend')
+    def test_status_change_is_queued_then_delivered_by_worker(self):
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.client.get(reverse('admin_update_booking', args=[self.booking.pk, 'confirm']))
+        # the request only writes outbox rows
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(Notification.objects.filter(status='pending').count(), 2)
+
+        self.assertEqual(deliver_pending(), (2, 2, 0))
+        self.assertEqual(mail.outbox[0].to, ['user@example.com'])
+        self.assertEqual(sms.outbox[0]['to'], '9876543210')
+        self.assertFalse(Notification.objects.exclude(status='sent').exists())
+
+    @override_settings(SMS_BACKEND='booking.sms.LocMemBackend', NOTIFICATION_RETRY_SECONDS=30)
+    def test_failed_delivery_backs_off_then_gives_up(self):
+        notification = Notification.objects.create(channel=Notification.EMAIL, recipient='user@example.com',
+                                                   subject='Hi', body='Hello')
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_PORT=1):
+            self.assertEqual(deliver_pending(max_attempts=2), (1, 0, 0))
+        notification.refresh_from_db()
+        self.assertEqual((notification.status, notification.attempts), ('pending', 1))
+        self.assertGreater(notification.next_attempt_at, timezone.now() + timedelta(seconds=20))
+        # not due yet
+        self.assertEqual(deliver_pending(), (0, 0, 0))
+
+        Notification.objects.update(next_attempt_at=timezone.now())
+        with override_settings(EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend', EMAIL_PORT=1):
+            self.assertEqual(deliver_pending(max_attempts=2), (1, 0, 1))
+        notification.refresh_from_db()
+        self.assertEqual(notification.status, 'failed')
+        self.assertTrue(notification.last_error)
+
+    @override_settings(SMS_BACKEND='booking.tests.CrashingSmsBackend')
+    def test_worker_crash_mid_batch_does_not_resend(self):
+        first = Notification.objects.create(channel=Notification.SMS, recipient='1', body='first')
+        crash = Notification.objects.create(channel=Notification.SMS, recipient='2', body='crash')
+        with self.assertRaises(SystemExit):
+            deliver_pending()
+        first.refresh_from_db()
+        crash.refresh_from_db()
+        self.assertEqual(first.status, 'sent')
+        # still leased to the dead worker: retried later, not by the next run
+        self.assertEqual((crash.status, crash.attempts), ('pending', 1))
+        self.assertGreater(crash.next_attempt_at, timezone.now() + timedelta(seconds=60))
+        self.assertEqual(deliver_pending(), (0, 0, 0))
+        self.assertEqual([m['body'] for m in sms.outbox], ['first'])
+
+
+class CrashingSmsBackend(sms.LocMemBackend):
+    def send(self, to, body):
+        if body == 'crash':
+            raise SystemExit('worker killed')
+        super().send(to, body)
+
+
+@override_settings(VENUE_VIEW_BUFFER_SIZE=3, VENUE_VIEW_FLUSH_SECONDS=3600)
+class VenueViewAnalyticsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.other_venue = Venue.objects.create(name='Other Venue')
+        analytics.discard()
+        self.addCleanup(analytics.discard)
+
+    def test_views_are_buffered_and_flushed_in_batches(self):
+        self.client.login(email='user@example.com', password='userpass')
+        self.client.get(reverse('venue_detail', args=[self.venue.pk]))
+        self.client.get(reverse('venue_detail', args=[self.venue.pk]))
+        # nothing written and no admin email per view
+        self.assertFalse(VenueViewStat.objects.exists())
+        self.assertFalse(Notification.objects.exists())
+
+        self.client.get(reverse('venue_detail', args=[self.other_venue.pk]))
+        stats = dict(VenueViewStat.objects.values_list('venue__name', 'views'))
+        self.assertEqual(stats, {'Test Venue': 2, 'Other Venue': 1})
+
+        # later flushes add to the existing rows
+        analytics.record_view(self.venue.pk, self.user.pk)
+        # one INSERT and one UPDATE inside a savepoint, however many rows are buffered
+        with self.assertNumQueries(4):
+            self.assertEqual(analytics.flush(), 1)
+        self.assertEqual(VenueViewStat.objects.get(venue=self.venue).views, 3)
+
+    def test_daily_digest_lists_most_viewed_venues(self):
+        day = timezone.localdate() - timedelta(days=1)
+        VenueViewStat.objects.create(venue=self.venue, user=self.user, date=day, views=2)
+        VenueViewStat.objects.create(venue=self.other_venue, user=self.user, date=day, views=5)
+        call_command('send_venue_view_digest', stdout=StringIO())
+        notification = Notification.objects.get()
+        self.assertEqual(notification.recipient, settings.ADMIN_EMAIL)
+        self.assertLess(notification.body.index('Other Venue'), notification.body.index('Test Venue'))
+
+
+class AdminDashboardTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.tournament = Tournament.objects.create(
+            name='Cup', description='', start_date=date(2030, 2, 1), end_date=date(2030, 2, 2), start_time=time(9, 0),
+            venue=Venue.objects.create(name='Cup Venue'), contact_person='Org', contact_email='org@example.com',
+            contact_phone='123',
+        )
+        self.seeded = 0
+
+    def seed(self, n):
+        """Add `n` rows to every dashboard section, each with its own user, venue and court."""
+        for _ in range(n):
+            i = self.seeded = self.seeded + 1
+            user = User.objects.create(email=f'player{i}@example.com')
+            court = Court.objects.create(venue=Venue.objects.create(name=f'Venue {i}'), name='Court')
+            for status in ('pending', 'confirmed', 'cancelled'):
+                booking = Booking.objects.create(user=user, court=court, date=date(2030, 1, 1) + timedelta(days=i),
+                                                 start_time=time(10, 0), end_time=time(11, 0), status=status)
+            Payment.objects.create(user=user, transaction_id=f'tx{i}', transaction_type='booking', booking=booking,
+                                   amount=500, payment_method='upi')
+            Advertisement.objects.create(title=f'Ad {i}')
+            Advertisement.objects.create(title=f'Live ad {i}', is_active=True)
+            team = Team.objects.create(name=f'Team {i}', captain_name='C', contact_number='1', created_by=user)
+            TournamentRegistration.objects.create(tournament=self.tournament, team=team, user=user)
+
+    def render_dashboard(self, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('admin_dashboard'), params or {})
+        self.assertEqual(resp.status_code, 200)
+        return resp, len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.seed(2)
+        _, few = self.render_dashboard()
+        self.seed(40)
+        resp, many = self.render_dashboard()
+        self.assertEqual(few, many)
+        # session + user, the headline rollup, three section aggregates and one query
+        # per section page; the lazy site-wide ads are never read on this page
+        self.assertEqual(many, 2 + 1 + 3 + 6)
+        self.assertEqual(resp.context['confirmed_bookings']['count'], 42)
+        self.assertEqual(len(resp.context['confirmed_bookings']['page']), 25)
+
+    def test_sections_filter_and_page_independently(self):
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.seed(30)
+        resp, _ = self.render_dashboard({'confirmed_from': '2030-01-11', 'confirmed_to': '2030-01-20', 'cancelled_page': 2})
+        confirmed = resp.context['confirmed_bookings']
+        self.assertEqual(confirmed['count'], 10)
+        self.assertTrue(all(date(2030, 1, 11) <= b.date <= date(2030, 1, 20) for b in confirmed['page']))
+        self.assertEqual(resp.context['cancelled_bookings']['page'].number, 2)
+        self.assertEqual(len(resp.context['cancelled_bookings']['page']), 5)
+        self.assertIn('confirmed_from=2030-01-11', resp.context['cancelled_bookings']['previous_url'])
+
+
+class AdminChangelistQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.client.force_login(self.admin)
+        self.seeded = 0
+
+    def seed(self, n):
+        for _ in range(n):
+            i = self.seeded = self.seeded + 1
+            venue = Venue.objects.create(name=f'Venue {i}')
+            court = Court.objects.create(venue=venue, name='Court')
+            Booking.objects.create(user=User.objects.create(email=f'player{i}@example.com'), court=court,
+                                   date=date(2030, 1, 1), start_time=time(10, 0), end_time=time(11, 0))
+            Tournament.objects.create(name=f'Cup {i}', description='', venue=venue, start_date=date(2030, 2, 1),
+                                      end_date=date(2030, 2, 2), start_time=time(9, 0), contact_person='Org',
+                                      contact_email='org@example.com', contact_phone='123')
+
+    def changelist_queries(self, model, params=None):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse(f'admin:booking_{model}_changelist'), params or {})
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_changelists_do_not_query_per_row(self):
+        pages = [('venue', None), ('venue', {'o': '5'}), ('court', None), ('court', {'o': '6'}),
+                 ('booking', None), ('tournament', None)]
+        self.seed(2)
+        few = [self.changelist_queries(model, params) for model, params in pages]
+        self.seed(20)
+        many = [self.changelist_queries(model, params) for model, params in pages]
+        self.assertEqual(few, many)
+
+    def test_count_columns_sort_on_annotations(self):
+        self.seed(2)
+        busy = Court.objects.first()
+        Booking.objects.create(user=self.admin, court=busy, date=date(2030, 1, 2), start_time=time(10, 0), end_time=time(11, 0))
+        resp = self.client.get(reverse('admin:booking_court_changelist'), {'o': '-6'})
+        self.assertEqual(resp.context['cl'].result_list[0], busy)
+
+
+class DashboardStatsTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1', price_per_hour=Decimal('500.00'))
+
+    def test_transitions_keep_rollup_in_sync(self):
+        self.client.login(email='user@example.com', password='userpass')
+        self.client.post(reverse('booking_create'), {'court': self.court.id, 'date': '2030-01-01',
+                                                     'start_time': '10:00', 'end_time': '12:00', 'number_of_players': 6})
+        self.client.post(reverse('booking_payment'), {'method': 'upi'})
+        self.assertEqual(stats.headline()['pending_bookings'], 1)
+
+        booking = Booking.objects.get()
+        self.client.login(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.client.get(reverse('admin_update_booking', args=[booking.pk, 'confirm']))
+        headline = stats.headline()
+        self.assertEqual((headline['pending_bookings'], headline['confirmed_bookings']), (0, 1))
+        self.assertEqual(headline['revenue'], Decimal('1000.00'))
+
+        # bulk admin actions go through the rollup too
+        self.client.post(reverse('admin:booking_booking_changelist'),
+                         {'action': 'mark_completed', '_selected_action': [booking.pk]})
+        self.client.post(reverse('admin:booking_booking_changelist'),
+                         {'action': 'cancel_booking', '_selected_action': [booking.pk]})
+        headline = stats.headline()
+        self.assertEqual((headline['completed_bookings'], headline['cancelled_bookings']), (1, 0))
+        self.assertEqual(stats.check(), {})
+
+    def test_admin_edits_and_deletes_keep_rollup_in_sync(self):
+        other = Court.objects.create(venue=Venue.objects.create(name='Other Venue'), name='Court2')
+        bookings = [
+            Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1), start_time=time(h, 0),
+                                   end_time=time(h + 1, 0), status='confirmed', total_price=Decimal('500.00'))
+            for h in (10, 12, 14)
+        ]
+        for booking in bookings:
+            stats.booking_changed(booking)
+        self.client.force_login(self.admin)
+
+        first = bookings[0]
+        self.client.post(reverse('admin:booking_booking_change', args=[first.pk]), {
+            'court': other.pk, 'date': '2030-01-02', 'start_time': '10:00', 'end_time': '11:00',
+            'number_of_players': 8, 'status': 'cancelled', 'notes': '',
+        })
+        first.refresh_from_db()
+        self.assertEqual((first.court_id, first.status), (other.pk, 'cancelled'))
+        self.assertEqual(stats.check(), {})
+
+        self.client.post(reverse('admin:booking_booking_delete', args=[bookings[1].pk]), {'post': 'yes'})
+        self.client.post(reverse('admin:booking_booking_changelist'), {
+            'action': 'delete_selected', '_selected_action': [bookings[2].pk], 'post': 'yes',
+        })
+        self.assertEqual(Booking.objects.count(), 1)
+        self.assertEqual(stats.check(), {})
+        self.assertEqual(stats.headline()['revenue'], 0)
+
+        # registrations edited and deleted in the admin leave the pending count in step too
+        tournament = Tournament.objects.create(
+            name='Cup', description='', start_date=date(2030, 2, 1), end_date=date(2030, 2, 2), start_time=time(9, 0),
+            venue=self.venue, contact_person='Org', contact_email='org@example.com', contact_phone='123', max_teams=4,
+        )
+        registrations = []
+        for i in range(3):
+            team = Team.objects.create(name=f'Team {i}', captain_name='C', contact_number='1', created_by=self.user)
+            registration = TournamentRegistration.objects.create(tournament=tournament, team=team, user=self.user)
+            stats.registration_changed(registration)
+            registrations.append(registration)
+        self.assertEqual(stats.headline()['pending_registrations'], 3)
+
+        first = registrations[0]
+        self.client.post(reverse('admin:booking_tournamentregistration_change', args=[first.pk]), {
+            'team': first.team_id, 'user': self.user.pk, 'status': 'approved',
+        })
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'approved')
+        self.client.post(reverse('admin:booking_tournamentregistration_delete', args=[registrations[1].pk]),
+                         {'post': 'yes'})
+        self.client.post(reverse('admin:booking_tournamentregistration_changelist'), {
+            'action': 'delete_selected', '_selected_action': [registrations[2].pk], 'post': 'yes',
+        })
+        self.assertEqual(TournamentRegistration.objects.count(), 1)
+        self.assertEqual(stats.headline()['pending_registrations'], 0)
+        self.assertEqual(stats.check(), {})
+
+    def test_rebuild_command_reports_and_repairs_drift(self):
+        Booking.objects.create(user=self.user, court=self.court, date=date(2030, 1, 1), start_time=time(10, 0),
+                               end_time=time(11, 0), status='confirmed', total_price=Decimal('500.00'))
+        with self.assertRaises(CommandError):
+            call_command('rebuild_dashboard_stats', '--check', stdout=StringIO())
+        out = StringIO()
+        call_command('rebuild_dashboard_stats', stdout=out)
+        self.assertIn('confirmed_bookings 0 != 1', out.getvalue())
+        self.assertEqual(stats.headline(start=date(2030, 1, 1))['revenue'], Decimal('500.00'))
+        self.assertEqual(stats.check(), {})
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.user = User.objects.create_user(email='user@example.com', password='userpass')
+        self.venue = Venue.objects.create(name='Test Venue')
+        self.court = Court.objects.create(venue=self.venue, name='Court1')
+        other = Court.objects.create(venue=Venue.objects.create(name='Other'), name='Court2')
+        for day, court, status in ((1, self.court, 'confirmed'), (2, self.court, 'cancelled'),
+                                   (3, other, 'confirmed'), (40, self.court, 'confirmed')):
+            booking = Booking.objects.create(user=self.user, court=court, date=date(2029, 12, 31) + timedelta(days=day),
+                                             start_time=time(10, 0), end_time=time(11, 0), status=status, total_price=Decimal('500.00'))
+            Payment.objects.create(user=self.user, transaction_id=f'tx{day}', transaction_type='booking',
+                                   booking=booking, amount=Decimal('500.00'), payment_method='upi', status='completed')
+
+    def test_command_filters_and_gzips(self):
+        path = os.path.join(self.enterContext(tempfile.TemporaryDirectory()), 'bookings.csv.gz')
+        call_command('export_bookings', 'bookings', '--from', '2030-01-01', '--to', '2030-01-31',
+                     '--venue', str(self.venue.pk), '--status', 'confirmed', '--gzip', '-o', path, stderr=StringIO())
+        with gzip.open(path, 'rt', newline='') as f:
+            rows = list(csv.DictReader(f))
+        self.assertEqual([(r['date'], r['venue'], r['total_price']) for r in rows], [('2030-01-01', 'Test Venue', '500.00')])
+
+    def test_admin_action_streams_payments(self):
+        self.client.force_login(self.admin)
+        resp = self.client.post(reverse('admin:booking_payment_changelist'), {
+            'action': 'export_jsonl_gz', '_selected_action': list(Payment.objects.values_list('pk', flat=True)),
+        })
+        self.assertTrue(resp.streaming)
+        lines = gzip.decompress(b''.join(resp.streaming_content)).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(json.loads(lines[0])['transaction_id'], 'tx1')
+
+
+class VenueRatingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.users = [User.objects.create_user(email=f'user{i}@example.com', password='userpass') for i in range(3)]
+        self.venue = Venue.objects.create(name='Alpha', rating=4.5)
+        self.other = Venue.objects.create(name='Beta', rating=3.0)
+
+    def test_totals_follow_review_save_and_delete(self):
+        first = Review.objects.create(venue=self.venue, user=self.users[0], rating=5)
+        Review.objects.create(venue=self.venue, user=self.users[1], rating=2)
+        self.venue.refresh_from_db()
+        self.assertEqual((self.venue.review_count, self.venue.rating_sum), (2, 7))
+        self.assertEqual(self.venue.average_rating(), 3.5)
+
+        # editing a review moves its rating, to another venue if need be
+        first.venue, first.rating = self.other, 4
+        first.save()
+        self.venue.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.venue.review_count, self.venue.rating_sum), (1, 2))
+        self.assertEqual((self.other.review_count, self.other.rating_sum), (1, 4))
+
+        first.delete()
+        self.other.refresh_from_db()
+        self.assertEqual(self.other.review_count, 0)
+        # without reviews the admin-set rating is shown
+        self.assertEqual(self.other.average_rating(), 3.0)
+
+    def test_venue_list_sorts_by_rating_without_reading_reviews(self):
+        Review.objects.create(venue=self.venue, user=self.users[0], rating=2)
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(reverse('venue_list'), {'sort': 'rating'})
+        self.assertEqual([v.name for v in resp.context['venues']], ['Beta', 'Alpha'])
+        self.assertFalse(any('booking_review' in q['sql'] for q in ctx.captured_queries))
+
+    def test_check_command_reports_and_fixes_drift(self):
+        Review.objects.create(venue=self.venue, user=self.users[0], rating=5)
+        # queryset updates bypass Review.save()
+        Review.objects.update(rating=1)
+        with self.assertRaises(CommandError):
+            call_command('check_venue_ratings', stdout=StringIO())
+        call_command('check_venue_ratings', '--fix', stdout=StringIO())
+        self.venue.refresh_from_db()
+        self.assertEqual((self.venue.review_count, self.venue.rating_sum), (1, 1))
+
+    def test_bulk_and_cascade_deletes_keep_totals(self):
+        for user, rating in zip(self.users, (5, 2, 4)):
+            Review.objects.create(venue=self.venue, user=user, rating=rating)
+        Review.objects.create(venue=self.other, user=self.users[0], rating=3)
+
+        # deleting a reviewer takes their reviews with them
+        self.users[0].delete()
+        self.venue.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertEqual((self.venue.review_count, self.venue.rating_sum), (2, 6))
+        self.assertEqual((self.other.review_count, self.other.rating_sum), (0, 0))
+
+        Review.objects.filter(rating=2).delete()
+        self.venue.refresh_from_db()
+        self.assertEqual((self.venue.review_count, self.venue.rating_sum), (1, 4))
+        call_command('check_venue_ratings', stdout=StringIO())
+
+
+class TournamentCapacityTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.tournament = Tournament.objects.create(
+            name='Cup', description='', start_date=date(2030, 2, 1), end_date=date(2030, 2, 2), start_time=time(9, 0),
+            venue=Venue.objects.create(name='Cup Venue'), contact_person='Org', contact_email='org@example.com',
+            contact_phone='123', max_teams=2,
+        )
+        self.registrations = []
+        for i in range(3):
+            user = User.objects.create(email=f'captain{i}@example.com')
+            team = Team.objects.create(name=f'Team {i}', captain_name='C', contact_number='1', created_by=user)
+            self.registrations.append(TournamentRegistration.objects.create(tournament=self.tournament, team=team, user=user))
+
+    def test_counter_tracks_approvals_and_enforces_cap(self):
+        first, second, third = self.registrations
+        first.status = 'approved'
+        first.save()
+        second.status = 'approved'
+        second.save()
+        self.tournament.refresh_from_db()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.tournament.approved_registrations_count, 2)
+            self.assertFalse(self.tournament.registration_open)
+
+        third.status = 'approved'
+        with self.assertRaises(TournamentFull):
+            third.save()
+        third.refresh_from_db()
+        self.assertEqual(third.status, 'pending')
+
+        first.status = 'rejected'
+        first.save()
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.approved_count, 1)
+
+    def test_bulk_approve_respects_remaining_places(self):
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:booking_tournamentregistration_changelist'), {
+            'action': 'approve_registrations', '_selected_action': [r.pk for r in self.registrations],
+        })
+        # three would not fit in two places, so none of them were approved
+        self.assertFalse(TournamentRegistration.objects.filter(status='approved').exists())
+
+        self.client.post(reverse('admin:booking_tournamentregistration_changelist'), {
+            'action': 'approve_registrations', '_selected_action': [r.pk for r in self.registrations[:2]],
+        })
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.approved_count, 2)
+        self.assertEqual(TournamentRegistration.objects.filter(status='approved').count(), 2)
+
+        resp = self.client.get(reverse('admin_update_registration', args=[self.registrations[2].pk, 'approve']))
+        self.assertEqual(resp.status_code, 302)
+        self.registrations[2].refresh_from_db()
+        self.assertEqual(self.registrations[2].status, 'pending')
+
+    def test_admin_form_reports_a_full_tournament(self):
+        for registration in self.registrations[:2]:
+            registration.status = 'approved'
+            registration.save()
+        third = self.registrations[2]
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:booking_tournamentregistration_change', args=[third.pk]), {
+            'team': third.team_id, 'user': third.user_id, 'status': 'approved',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'already has 2 approved teams')
+        third.refresh_from_db()
+        self.assertEqual(third.status, 'pending')
+
+    def test_delete_releases_places_by_stored_status(self):
+        first, second, _ = self.registrations
+        first.status = 'approved'
+        first.save()
+        # edited but not saved: the row is still pending and holds no place
+        second.status = 'approved'
+        second.delete()
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.approved_count, 1)
+        # and the other way round
+        first.status = 'rejected'
+        first.delete()
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.approved_count, 0)
+
+
+class StateTrackingTests(TournamentCapacityTests):
+    def test_status_change_needs_no_extra_select(self):
+        registration = TournamentRegistration.objects.select_related('tournament').get(pk=self.registrations[0].pk)
+        self.assertEqual(registration.changed_fields, [])
+        registration.status = 'approved'
+        self.assertEqual(registration.changed_fields, ['status'])
+        self.assertEqual(registration.original('status'), 'pending')
+        with CaptureQueriesContext(connection) as ctx:
+            registration.save_changed()
+        statements = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        # the conditional counter update and a narrow UPDATE of the row itself
+        self.assertEqual(len(statements), 2)
+        self.assertFalse(any(sql.startswith('SELECT') for sql in statements))
+        self.assertIn('SET "status"', statements[1])
+        self.assertNotIn('"team_id"', statements[1])
+        # the saved value becomes the new original
+        self.assertEqual(registration.original('status'), 'approved')
+        self.assertFalse(registration.save_changed())
+
+    def test_instances_not_loaded_from_db_fall_back_to_a_query(self):
+        registration = TournamentRegistration(pk=self.registrations[0].pk)
+        self.assertEqual(registration.original('status'), 'pending')
+        self.assertIsNone(TournamentRegistration().original('status'))
+
+
+class TournamentSchedulingTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        venue = Venue.objects.create(name='Arena')
+        self.courts = [Court.objects.create(venue=venue, name=f'Pitch {i}') for i in range(8)]
+        self.tournament = Tournament.objects.create(
+            name='Big Cup', description='', start_date=date(2030, 3, 1), end_date=date(2030, 3, 3), start_time=time(9, 0),
+            venue=venue, contact_person='Org', contact_email='org@example.com', contact_phone='123', max_teams=64,
+        )
+
+    def _register(self, count):
+        teams = Team.objects.bulk_create([
+            Team(name=f'Team {i}', captain_name='C', contact_number='1', created_by=self.admin)
+            for i in range(count)
+        ])
+        TournamentRegistration.objects.bulk_create([
+            TournamentRegistration(tournament=self.tournament, team=team, user=self.admin, status='approved')
+            for team in teams
+        ])
+        return teams
+
+    def test_round_robin_pairs_every_team_once(self):
+        teams = self._register(5)
+        fixtures = scheduling.build_fixtures(teams, scheduling.ROUND_ROBIN)
+        pairs = [frozenset((f.home[0].pk, f.away[0].pk)) for f in fixtures]
+        self.assertEqual(len(pairs), 10)
+        self.assertEqual(len(set(pairs)), 10)
+        for r in {f.round for f in fixtures}:
+            playing = [side[0].pk for f in fixtures if f.round == r for side in (f.home, f.away)]
+            self.assertEqual(len(playing), len(set(playing)))
+
+    def test_64_team_groups_are_packed_around_existing_bookings(self):
+        self._register(64)
+        existing = Booking.objects.create(
+            user=self.admin, court=self.courts[0], date=date(2030, 3, 1), start_time=time(9, 0), end_time=time(10, 10),
+            status='confirmed',
+        )
+        with CaptureQueriesContext(connection) as ctx:
+            matches = scheduling.schedule_tournament(self.tournament, self.admin, scheduling.GROUPS, match_minutes=45)
+        # 16 groups of four play 6 matches each, then a 32-team knockout
+        self.assertEqual(len(matches), 16 * 6 + 31)
+        self.assertLess(len(ctx.captured_queries), 25)
+
+        bookings = Booking.objects.filter(match__tournament=self.tournament)
+        self.assertEqual(bookings.filter(status='confirmed').count(), len(matches))
+        self.assertEqual(BookingSlot.objects.filter(booking__in=bookings).count(), len(matches) * 3)
+
+        def span(obj):
+            return (obj.date, obj.start_time, obj.end_time)
+        per_court = {}
+        for booking in Booking.objects.filter(court__in=self.courts):
+            per_court.setdefault(booking.court_id, []).append(span(booking))
+        for spans in per_court.values():
+            spans.sort()
+            for (day, _, end), (next_day, next_start, _) in zip(spans, spans[1:]):
+                self.assertTrue(day < next_day or end <= next_start)
+        self.assertFalse(any(m.court_id == existing.court_id and m.date == existing.date and m.start_time < time(10, 15)
+                             for m in matches))
+
+        per_team = {}
+        for match in matches:
+            for team in (match.home_team_id, match.away_team_id):
+                if team:
+                    per_team.setdefault(team, []).append(span(match))
+        for spans in per_team.values():
+            spans.sort()
+            for (day, _, end), (next_day, next_start, _) in zip(spans, spans[1:]):
+                self.assertTrue(day < next_day or end < next_start)
+
+        group_stage_over = max((m.date, m.end_time) for m in matches if m.stage == 'group')
+        knockout_starts = min((m.date, m.start_time) for m in matches if m.stage == 'knockout')
+        self.assertLess(group_stage_over, knockout_starts)
+        final = max(matches, key=lambda m: m.number)
+        self.assertEqual((final.home_label, final.away_label), ('Winner M125', 'Winner M126'))
+
+    def test_rescheduling_needs_replace_and_releases_old_bookings(self):
+        self._register(4)
+        call_command('schedule_tournament', self.tournament.pk, '--dry-run', stdout=StringIO())
+        self.assertFalse(Match.objects.exists())
+
+        first = scheduling.schedule_tournament(self.tournament, self.admin)
+        with self.assertRaises(scheduling.SchedulingError):
+            scheduling.schedule_tournament(self.tournament, self.admin)
+        second = scheduling.schedule_tournament(self.tournament, self.admin, match_minutes=90, replace=True)
+        self.assertEqual(len(second), 6)
+        self.assertEqual(Booking.objects.filter(pk__in=[m.booking_id for m in first], status='cancelled').count(), 6)
+        self.assertEqual(BookingSlot.objects.count(), 6 * 6)
+        self.assertEqual(stats.check(), {})
+
+    def test_borrowed_courts_count_for_their_own_venue(self):
+        self._register(4)
+        annexe = Venue.objects.create(name='Annexe')
+        borrowed = Court.objects.create(venue=annexe, name='Annexe 1')
+        matches = scheduling.schedule_tournament(self.tournament, self.admin, courts=[self.courts[0], borrowed])
+        played = {court: sum(m.court_id == court.pk for m in matches) for court in (self.courts[0], borrowed)}
+        self.assertTrue(all(played.values()))
+        confirmed = dict(DashboardStats.objects.values_list('venue').annotate(n=Sum('confirmed_bookings')))
+        self.assertEqual(confirmed, {self.tournament.venue_id: played[self.courts[0]], annexe.pk: played[borrowed]})
+        self.assertEqual(stats.check(), {})
+
+
+class TeamPlayerTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        venue = Venue.objects.create(name='Ground')
+        self.tournament = Tournament.objects.create(
+            name='Open', description='', start_date=date(2030, 4, 1), end_date=date(2030, 4, 2), start_time=time(9, 0),
+            venue=venue, contact_person='Org', contact_email='org@example.com', contact_phone='123',
+        )
+        self.other = Tournament.objects.create(
+            name='Other', description='', start_date=date(2030, 5, 1), end_date=date(2030, 5, 2), start_time=time(9, 0),
+            venue=venue, contact_person='Org', contact_email='org@example.com', contact_phone='123',
+        )
+
+    def _register(self, tournament, email, player_list):
+        user = User.objects.create_user(email=email, password='pass')
+        client = Client()
+        client.force_login(user)
+        return client.post(reverse('tournament_register', args=[tournament.pk]), {
+            'team_name': f'{email} XI', 'captain_name': 'Cap', 'contact_number': '9876543210',
+            'player_list': player_list, 'payment_method': Payment.PAYMENT_METHOD_CHOICES[0][0],
+            'payment_proof': SimpleUploadedFile('proof.txt', b'paid'),
+        })
+
+    def test_parse_player_list(self):
+        text = '1. Asha  Rao 98450-12345\r\n- Vikram (wk)\n\n* asha rao 9845012345\nDev +91 98450 99999\n'
+        self.assertEqual(players.parse_player_list(text), [
+            ('Asha Rao', '9845012345'), ('Vikram (wk)', ''), ('Dev', '919845099999'),
+        ])
+
+    def test_registration_stores_memberships_and_rejects_duplicate_players(self):
+        response = self._register(self.tournament, 'a@example.com', 'Asha Rao 9845012345\nVikram\nDev')
+        self.assertEqual(response.status_code, 302)
+        team = Team.objects.get(name='a@example.com XI')
+        self.assertEqual(team.player_list, 'Asha Rao 9845012345\nVikram\nDev')
+
+        # same phone under another spelling; names match when either side has no phone
+        entries = players.parse_player_list('ASHA R 98450 12345\nvikram\nDev 9000000001\nAsha Rao 9000000002')
+        with self.assertNumQueries(1):
+            duplicates = players.duplicate_players(self.tournament, entries)
+        self.assertEqual(duplicates, [('Asha Rao', team.name), ('Dev', team.name), ('Vikram', team.name)])
+
+        response = self._register(self.tournament, 'b@example.com', 'ASHA R 98450 12345\nNew Player')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Already registered for this tournament: Asha Rao')
+        self.assertFalse(Team.objects.filter(name='b@example.com XI').exists())
+
+        # other tournaments are unaffected, and the player row is shared
+        response = self._register(self.other, 'c@example.com', 'Asha Rao 98450 12345\nSomeone')
+        self.assertEqual(response.status_code, 302)
+        asha = Player.objects.get(phone='9845012345')
+        self.assertEqual(asha.teams.count(), 2)
+        self.assertEqual(Player.objects.filter(normalized_name='vikram').count(), 1)
+
+    def test_registration_payment_and_notification_commit_together(self):
+        response = self._register(self.tournament, 'a@example.com', 'Asha Rao')
+        self.assertEqual(response.status_code, 302)
+        registration = TournamentRegistration.objects.get()
+        self.assertEqual(registration.payment.amount, self.tournament.entry_fee)
+        self.assertEqual(Notification.objects.count(), 1)
+
+        with mock.patch.object(utils, 'notify_admin_generic', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self._register(self.other, 'b@example.com', 'Vikram')
+        self.assertEqual(TournamentRegistration.objects.count(), 1)
+        self.assertEqual(Payment.objects.count(), 1)
+        self.assertFalse(Team.objects.filter(name='b@example.com XI').exists())
+
+    def test_admin_rename_onto_an_existing_player_is_a_form_error(self):
+        Player.objects.create(name='Asha Rao', normalized_name='asha rao', phone='9845012345')
+        other = Player.objects.create(name='Asha R', normalized_name='asha r', phone='9845012345')
+        self.client.force_login(User.objects.create_superuser(email='players-admin@example.com', password='x'))
+        response = self.client.post(reverse('admin:booking_player_change', args=[other.pk]), {
+            'name': 'asha  RAO', 'phone': '98450 12345',
+            'memberships-TOTAL_FORMS': 0, 'memberships-INITIAL_FORMS': 0,
+        })
+        self.assertContains(response, 'Another player already has this name and phone number.')
+        other.refresh_from_db()
+        self.assertEqual(other.normalized_name, 'asha r')
+
+
+class ActiveAdsSnapshotTests(TestCase):
+    def setUp(self):
+        ads.invalidate()
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.ad = Advertisement.objects.create(title='Shoes', position=Advertisement.SIDEBAR, is_active=True)
+
+    def ad_queries(self):
+        self.client.get(reverse('tournaments'))
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(reverse('tournaments'))
+        return [q['sql'] for q in ctx.captured_queries if 'booking_advertisement' in q['sql']]
+
+    def test_snapshot_is_reused_until_an_ad_changes(self):
+        self.assertEqual(ads.active_by_position()['SIDEBAR'], [self.ad])
+        with self.assertNumQueries(0):
+            ads.active_by_position()
+        self.assertEqual(self.ad_queries(), [])
+
+        Advertisement.objects.create(title='Bats', position=Advertisement.SIDEBAR, is_active=True)
+        with self.assertNumQueries(1):
+            self.assertEqual(len(ads.active_by_position()['SIDEBAR']), 2)
+
+        self.client.force_login(self.admin)
+        self.client.get(reverse('admin_update_advertisement', args=[self.ad.pk, 'reject']))
+        self.assertEqual([ad.title for ad in ads.active_by_position()['SIDEBAR']], ['Bats'])
+
+    def test_context_is_lazy(self):
+        from .context_processors import active_ads
+        with self.assertNumQueries(0):
+            context = active_ads(None)
+        with self.assertNumQueries(1):
+            self.assertEqual(context['active_ads']['SIDEBAR'], [self.ad])
+
+
+class AdTrackingTests(TestCase):
+    def setUp(self):
+        ads.invalidate()
+        ads.discard()
+        self.top = Advertisement.objects.create(title='Top', position=Advertisement.HOME_TOP, is_active=True,
+                                                image='advertisements/top.png', link='https://example.com/top')
+        self.bottom = Advertisement.objects.create(title='Bottom', position=Advertisement.HOME_BOTTOM, is_active=True,
+                                                   image='advertisements/bottom.png')
+        # live but never drawn, so never counted
+        Advertisement.objects.create(title='No image', position=Advertisement.HOME_TOP, is_active=True)
+
+    def tearDown(self):
+        ads.discard()
+
+    @override_settings(AD_STAT_BUFFER_SIZE=1000, AD_STAT_FLUSH_SECONDS=3600)
+    def test_impressions_and_clicks_are_buffered_then_added_in_one_update(self):
+        for _ in range(3):
+            response = self.client.get(reverse('tournaments'))
+        self.assertContains(response, reverse('ad_click', args=[self.top.pk]))
+        self.assertNotContains(response, reverse('ad_click', args=[self.bottom.pk]))
+
+        response = self.client.get(reverse('ad_click', args=[self.top.pk]))
+        self.assertRedirects(response, 'https://example.com/top', fetch_redirect_response=False)
+        self.assertEqual(self.client.get(reverse('ad_click', args=[self.bottom.pk])).status_code, 404)
+        self.assertFalse(AdStat.objects.exists())
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(ads.flush(), 7)
+        statements = [q['sql'] for q in ctx.captured_queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]
+        self.assertEqual(len(statements), 3)
+        self.assertEqual(
+            sorted(AdStat.objects.values_list('advertisement__title', 'impressions', 'clicks')),
+            [('Bottom', 3, 0), ('Top', 3, 1)],
+        )
+
+        ads.record_impressions([self.top.pk])
+        ads.flush()
+        self.assertEqual(AdStat.objects.get(advertisement=self.top).impressions, 4)
+
+    def test_pending_and_expired_ads_do_not_redirect(self):
+        pending = Advertisement.objects.create(title='Pending', position=Advertisement.HOME_TOP, is_active=False,
+                                               link='https://evil.example.com/')
+        expired = Advertisement.objects.create(title='Expired', position=Advertisement.HOME_TOP, is_active=True,
+                                               link='https://example.com/old', start_date=date(2020, 1, 1),
+                                               end_date=date(2020, 1, 31))
+        for ad in (pending, expired):
+            self.assertEqual(self.client.get(reverse('ad_click', args=[ad.pk])).status_code, 404)
+        self.assertEqual(ads.flush(), 0)
+
+    def test_admin_report(self):
+        AdStat.objects.create(advertisement=self.top, date=date(2030, 1, 1), impressions=200, clicks=5)
+        AdStat.objects.create(advertisement=self.top, date=date(2030, 1, 2), impressions=100, clicks=4)
+        self.client.force_login(User.objects.create_superuser(email='ads-admin@example.com', password='x'))
+        response = self.client.get(reverse('admin:booking_advertisement_changelist'))
+        self.assertContains(response, '<td class="field-impressions">300</td>', html=True)
+        self.assertContains(response, '3.0%')
+        response = self.client.get(reverse('admin:booking_advertisement_change', args=[self.top.pk]))
+        self.assertContains(response, '2.5%')
+
+
+class ImageDerivativeTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name, IMAGE_DERIVATIVE_THREADS=0))
+        self.venue = Venue.objects.create(name='Poster Venue')
+
+    def upload(self, name, size=(2400, 1200), orientation=None):
+        exif = Image.Exif()
+        exif[0x010F] = 'PhoneMaker'
+        if orientation:
+            exif[0x0112] = orientation
+        out = BytesIO()
+        Image.new('RGB', size, (200, 40, 40)).save(out, 'JPEG', exif=exif)
+        return default_storage.save(name, ContentFile(out.getvalue()))
+
+    def tournament(self, poster):
+        return Tournament.objects.create(
+            name='Poster Cup', description='', venue=self.venue, start_date=date(2030, 6, 1), end_date=date(2030, 6, 1),
+            start_time=time(9, 0), contact_person='Org', contact_email='org@example.com', contact_phone='1', poster=poster,
+        )
+
+    def test_derivatives_are_resized_rotated_and_stripped(self):
+        # orientation 6: the camera was turned, so the picture is really 1200 wide and 2400 tall
+        tournament = self.tournament(self.upload('tournament_posters/big.jpg', orientation=6))
+        self.assertTrue(images.process(Tournament, tournament.pk, 'poster'))
+        tournament.refresh_from_db()
+        derivatives = tournament.poster_derivatives
+        self.assertEqual(derivatives['source'], 'tournament_posters/big.jpg')
+        self.assertEqual([(derivatives[label]['width'], derivatives[label]['height']) for label, _ in images.WIDTHS],
+                         [(320, 640), (640, 1280), (1200, 2400)])
+        self.assertIn(derivatives['digest'], derivatives['card']['name'])
+        with default_storage.open(derivatives['card']['name']) as fh:
+            card = Image.open(fh)
+            self.assertEqual(card.size, (640, 1280))
+            self.assertEqual(dict(card.getexif()), {})
+
+        # an identical upload elsewhere reuses the same files
+        sponsor = Sponsor.objects.create(name='Twin', logo=self.upload('sponsor_logos/twin.jpg', orientation=6))
+        images.process(Sponsor, sponsor.pk, 'logo')
+        sponsor.refresh_from_db()
+        self.assertEqual(sponsor.logo_derivatives['card'], derivatives['card'])
+
+    def test_srcset_tag_and_fallback(self):
+        tournament = self.tournament(self.upload('tournament_posters/wide.jpg'))
+        template = Template('{% load booking_media %}<img {% srcset t.poster sizes="50vw" %}>')
+        self.assertEqual(template.render(Context({'t': tournament})), f'<img src="{tournament.poster.url}">')
+
+        images.process(Tournament, tournament.pk, 'poster')
+        tournament.refresh_from_db()
+        html = template.render(Context({'t': tournament}))
+        card = tournament.poster_derivatives['card']['name']
+        self.assertIn(f'src="/media/{card}"', html)
+        self.assertIn(' 320w, ', html)
+        self.assertIn(' 1280w" sizes="50vw"', html)
+
+    def test_backfill_command_renders_stale_images_in_worker_processes(self):
+        tournaments = [self.tournament(self.upload(f'tournament_posters/p{i}.jpg', size=(900 + i, 600))) for i in range(3)]
+        Advertisement.objects.create(title='Broken', image=default_storage.save(
+            'advertisements/broken.jpg', BytesIO(b'not an image')))
+        out, err = StringIO(), StringIO()
+        call_command('generate_image_derivatives', '--workers', '2', stdout=out, stderr=err)
+        self.assertIn('Rendered 4 image(s) for 4 row(s)', out.getvalue())
+        self.assertIn('advertisements/broken.jpg: UnidentifiedImageError', err.getvalue())
+        for tournament in tournaments:
+            tournament.refresh_from_db()
+            self.assertEqual(tournament.poster_derivatives['full']['width'], tournament.poster.width)
+
+        out = StringIO()
+        call_command('generate_image_derivatives', '--workers', '1', stdout=out, stderr=StringIO())
+        self.assertIn('Rendered 0 image(s)', out.getvalue())
+
+
+class PaymentProofStorageTests(TestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.media = media.name
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.user = User.objects.create_user(email='payer@example.com', password='pass')
+
+    def pay(self, filename, content):
+        payment = Payment.objects.create(
+            user=self.user, transaction_id=f'T-{Payment.objects.count()}', transaction_type='booking', amount=10,
+            payment_method=Payment.PAYMENT_METHOD_CHOICES[0][0],
+        )
+        payment.payment_proof = SimpleUploadedFile(filename, content)
+        payment.save()
+        return payment
+
+    def test_identical_uploads_share_one_blob_and_are_indexed(self):
+        screenshot = b'\x89PNG fake screenshot' * 10000
+        first = self.pay('IMG_0001.PNG', screenshot)
+        second = self.pay('copy of IMG_0001.png', screenshot)
+        other = self.pay('receipt.png', b'another receipt')
+
+        digest = hashlib.sha256(screenshot).hexdigest()
+        self.assertEqual(first.payment_proof.name, f'payment_proofs/{digest[:2]}/{digest}.png')
+        self.assertEqual(second.payment_proof.name, first.payment_proof.name)
+        self.assertEqual((first.proof_digest, second.proof_digest), (digest, digest))
+        stored = [name for _, _, names in os.walk(self.media) for name in names]
+        self.assertEqual(len(stored), 2)
+        with first.payment_proof.open('rb') as fh:
+            self.assertEqual(fh.read(), screenshot)
+
+        self.assertEqual(list(first.reused_proof_payments()), [second])
+        self.assertFalse(other.reused_proof_payments().exists())
+        first.payment_proof = None
+        first.save_changed()
+        first.refresh_from_db()
+        self.assertEqual(first.proof_digest, '')
+
+    def test_admin_flags_reused_proofs(self):
+        first = self.pay('a.jpg', b'same bytes')
+        second = self.pay('b.jpg', b'same bytes')
+        self.pay('c.jpg', b'different bytes')
+        self.client.force_login(User.objects.create_superuser(email='proof-admin@example.com', password='x'))
+        response = self.client.get(reverse('admin:booking_payment_changelist'), {'proof': 'reused'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+        self.assertContains(response, '2 payments')
+        response = self.client.get(reverse('admin:booking_payment_change', args=[first.pk]))
+        self.assertContains(response, second.transaction_id)
+
+
+class RestApiTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(email='spa@example.com', password='spapass')
+        self.other = User.objects.create_user(email='other@example.com', password='x')
+        self.venues = [Venue.objects.create(name=name, city='Pune', rating=4.0) for name in ('Alpha', 'Beta', 'Gamma')]
+        self.court = Court.objects.create(venue=self.venues[0], name='Court 1')
+        Court.objects.create(venue=self.venues[0], name='Court 2')
+        Court.objects.create(venue=self.venues[0], name='Closed', is_active=False)
+
+    def book(self, user, days, status='pending'):
+        booking = Booking.objects.create(
+            user=user, court=self.court, date=date.today() + timedelta(days=days),
+            start_time=time(10, 0), end_time=time(11, 0), total_price=500, status=status,
+        )
+        availability.claim_cells(booking)
+        stats.booking_changed(booking)
+        return booking
+
+    def login(self):
+        response = self.client.post('/api/users/login/', {'email': 'spa@example.com', 'password': 'spapass'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['user']['email'], 'spa@example.com')
+        return {'HTTP_AUTHORIZATION': f"Bearer {response.json()['token']}"}
+
+    def test_login_and_bearer_token(self):
+        response = self.client.post('/api/users/login/', {'email': 'spa@example.com', 'password': 'wrong'},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+        self.assertEqual(self.client.get('/api/bookings/').status_code, 401)
+        self.assertEqual(self.client.get('/api/bookings/', **self.login()).status_code, 200)
+
+    def test_venue_list_selects_fields_and_pages_by_cursor(self):
+        Review.objects.create(venue=self.venues[0], user=self.user, rating=5)
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/venues/', {'page_size': 2})
+        page = response.json()
+        self.assertEqual([v['name'] for v in page['results']], ['Alpha', 'Beta'])
+        self.assertEqual((page['results'][0]['rating'], page['results'][0]['courts_count']), (5.0, 2))
+
+        response = self.client.get(page['next'])
+        self.assertEqual([v['name'] for v in response.json()['results']], ['Gamma'])
+        self.assertIsNone(response.json()['next'])
+
+        response = self.client.get('/api/venues/', {'fields': 'id,name'})
+        self.assertEqual(set(response.json()['results'][0]), {'id', 'name'})
+        self.assertEqual(self.client.get('/api/venues/', {'fields': 'name,secret'}).status_code, 400)
+
+    def test_repeat_fetches_get_304_until_something_changes(self):
+        response = self.client.get('/api/venues/')
+        etag, last_modified = response['ETag'], response['Last-Modified']
+        # only the aggregate behind the validators runs
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/venues/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/api/venues/', HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+        # another selection is another representation
+        self.assertEqual(self.client.get('/api/venues/', {'fields': 'id'}, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # a review changes the venue's rating, a deactivated court its court count
+        Review.objects.create(venue=self.venues[1], user=self.user, rating=1)
+        response = self.client.get('/api/venues/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.court.is_active = False
+        self.court.save()
+        self.assertEqual(self.client.get('/api/venues/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        detail = self.client.get(f'/api/venues/{self.venues[2].pk}/')
+        self.assertEqual(self.client.get(f'/api/venues/{self.venues[2].pk}/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 304)
+
+    def test_bookings_are_per_user_and_can_be_cancelled(self):
+        auth = self.login()
+        future = self.book(self.user, 3)
+        past = self.book(self.user, -3, status='completed')
+        foreign = self.book(self.other, 4)
+
+        # token lookup, validators aggregate, one page with court and venue joined
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/bookings/upcoming/', **auth)
+        self.assertEqual([b['id'] for b in response.json()['results']], [future.pk])
+        self.assertEqual(response.json()['results'][0]['venue_name'], 'Alpha')
+        etag = response['ETag']
+        response = self.client.get('/api/bookings/past/', {'fields': 'id,status'}, **auth)
+        self.assertEqual(response.json()['results'], [{'id': past.pk, 'status': 'completed'}])
+
+        self.assertEqual(self.client.post(f'/api/bookings/{foreign.pk}/cancel/', **auth).status_code, 404)
+        self.assertEqual(self.client.post(f'/api/bookings/{past.pk}/cancel/', **auth).status_code, 400)
+        response = self.client.post(f'/api/bookings/{future.pk}/cancel/', **auth)
+        self.assertEqual(response.json()['status'], 'cancelled')
+        self.assertFalse(BookingSlot.objects.filter(booking=future).exists())
+        self.assertEqual(stats.check(), {})
+
+        response = self.client.get('/api/bookings/upcoming/', HTTP_IF_NONE_MATCH=etag, **auth)
+        self.assertEqual((response.status_code, response.json()['results']), (200, []))
+        self.assertEqual(self.client.get('/api/bookings/', **auth).json()['results'][0]['id'], future.pk)
+
+    def test_admin_bulk_actions_change_the_etag(self):
+        auth = self.login()
+        booking = self.book(self.user, 2)
+        etag = self.client.get('/api/bookings/', **auth)['ETag']
+        self.assertEqual(self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag, **auth).status_code, 304)
+
+        admin = Client()
+        admin.force_login(User.objects.create_superuser(email='bulk-admin@example.com', password='x'))
+        admin.post(reverse('admin:booking_booking_changelist'), {
+            'action': 'cancel_booking', '_selected_action': [booking.pk],
+        })
+        response = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag, **auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'cancelled')
+
+    def test_profile_repricing_changes_the_etag(self):
+        auth = self.login()
+        booking = self.book(self.user, 2)
+        Booking.objects.filter(pk=booking.pk).update(total_price=0)
+        etag = self.client.get('/api/bookings/', **auth)['ETag']
+        self.assertEqual(self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag, **auth).status_code, 304)
+
+        browser = Client()
+        browser.force_login(self.user)
+        self.assertEqual(browser.get(reverse('profile')).status_code, 200)
+        response = self.client.get('/api/bookings/', HTTP_IF_NONE_MATCH=etag, **auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(Decimal(response.json()['results'][0]['total_price']), 0)
+
+
+class TournamentApiTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(email=settings.ADMIN_EMAIL, password='adminpass')
+        self.captain = User.objects.create_user(email='captain@example.com', password='x')
+
+    def add_tournaments(self, n):
+        first = Tournament.objects.count()
+        for i in range(first, first + n):
+            tournament = Tournament.objects.create(
+                name=f'Cup {i}', description='', start_date=date(2030, 3, 1) + timedelta(days=i), end_date=date(2030, 3, 2) + timedelta(days=i),
+                start_time=time(9, 0), venue=Venue.objects.create(name=f'Ground {i}'), contact_person='Org',
+                contact_email='org@example.com', contact_phone='123', max_teams=4,
+            )
+            for j in range(2):
+                team = Team.objects.create(name=f'Team {i}-{j}', captain_name='C', contact_number='1', created_by=self.captain)
+                players.set_team_players(team, [(f'Player {i}{j}a', '98765'), (f'Player {i}{j}b', '')])
+                TournamentRegistration.objects.create(tournament=tournament, team=team, user=self.captain,
+                                                      status='approved' if j == 0 else 'pending')
+
+    def test_list_runs_a_constant_number_of_queries(self):
+        self.add_tournaments(2)
+        self.client.force_login(self.admin)
+        # session and user, then tournaments with venues, registrations with teams, team sheets
+        with self.assertNumQueries(5):
+            small = self.client.get('/api/tournaments/').json()['results']
+        self.add_tournaments(4)
+        with self.assertNumQueries(5):
+            large = self.client.get('/api/tournaments/').json()['results']
+        self.assertEqual(len(large), 6)
+        self.assertEqual(large[:2], small)
+        first = small[0]
+        self.assertEqual((first['venue_name'], first['approved_registrations_count']), ('Ground 0', 1))
+        self.assertEqual(len(first['registrations']), 2)
+        self.assertIn('Player 00a 98765\nPlayer 00b', [r['team']['player_list'] for r in first['registrations']])
+
+        # visitors see neither registrations nor contact numbers; validators plus one page query
+        self.client.logout()
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/tournaments/')
+        self.assertNotIn('registrations', response.json()['results'][0])
+
+    def test_approval_changes_the_etag(self):
+        self.add_tournaments(1)
+        response = self.client.get('/api/tournaments/')
+        etag = response['ETag']
+        self.assertEqual(self.client.get('/api/tournaments/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        registration = TournamentRegistration.objects.get(status='pending')
+        registration.status = 'approved'
+        registration.save()
+        response = self.client.get('/api/tournaments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['approved_registrations_count'], 2)
+
+        etag = response['ETag']
+        self.client.force_login(self.admin)
+        self.client.post(reverse('admin:booking_tournament_changelist'), {
+            'action': 'mark_cancelled', '_selected_action': [registration.tournament_id],
+        })
+        self.client.logout()
+        response = self.client.get('/api/tournaments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['results'][0]['status'], 'cancelled')
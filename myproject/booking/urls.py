@@ -1,9 +1,9 @@
 from django.urls import path
 from .views import (
-    booking_list, booking_create, booking_detail,
+    booking_list, booking_create, recurring_booking_create, booking_detail,
     booking_payment, booking_payment_success,
-    venue_list, venue_detail,
-    advertise_page, advertise_success,
+    venue_list, venue_detail, venue_availability, free_courts_search,
+    advertise_page, advertise_success, ad_click,
     tournament_list, tournament_create, tournament_detail, tournament_register, tournament_registration_success, team_detail, about_page,
     admin_dashboard, admin_update_booking, admin_update_registration, admin_update_advertisement, admin_update_tournament, admin_update_tournament_sponsor
 )
@@ -11,11 +11,16 @@ from .views import (
 urlpatterns = [
     path('', booking_list, name='booking_list'),
     path('create/', booking_create, name='booking_create'),
+    path('create/recurring/', recurring_booking_create, name='recurring_booking_create'),
     path('<int:pk>/', booking_detail, name='booking_detail'),
     path('venues/', venue_list, name='venue_list'),
     path('venues/<int:pk>/', venue_detail, name='venue_detail'),
+    path('venues/<int:pk>/availability/', venue_availability, name='venue_availability'),
+    path('availability/', venue_availability, name='availability'),
+    path('availability/free-courts/', free_courts_search, name='free_courts'),
     path('advertise/', advertise_page, name='advertise'),
     path('advertise/success/', advertise_success, name='advertise_success'),
+    path('ads/<int:pk>/click/', ad_click, name='ad_click'),
     path('tournaments/', tournament_list, name='tournaments'),
     path('tournaments/create/', tournament_create, name='tournament_create'),
     path('tournaments/<int:pk>/', tournament_detail, name='tournament_detail'),
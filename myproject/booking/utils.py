@@ -1,6 +1,26 @@
-from django.core.mail import send_mail
 from django.conf import settings
 
+from .models import Notification
+from . import sms
+
+
+def queue_email(subject, message, recipients):
+    """Add an email to the notification outbox.
+
+    Nothing is sent here: the row is written in the caller's transaction and
+    delivered later by the `send_notifications` worker.
+    """
+    Notification.objects.bulk_create([
+        Notification(channel=Notification.EMAIL, recipient=recipient, subject=subject, body=message)
+        for recipient in recipients if recipient
+    ])
+
+
+def queue_sms(body, phone):
+    """Add a text message to the outbox when an SMS provider is configured."""
+    if phone and sms.is_enabled():
+        Notification.objects.create(channel=Notification.SMS, recipient=phone, body=body)
+
 
 def notify_admin_booking_request(booking):
     """Send email notification to admin about a new booking request."""
@@ -13,12 +33,12 @@ def notify_admin_booking_request(booking):
         f"Players: {booking.number_of_players}\n"
         "\nPlease review the request in your admin panel."
     )
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
+    queue_email(subject, message, [settings.ADMIN_EMAIL])
 
 
 def notify_admin_generic(subject, message):
     """Send a simple message to the administrator. Useful for tracking views or other events."""
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
+    queue_email(subject, message, [settings.ADMIN_EMAIL])
 
 
 def notify_user_booking_status(booking):
@@ -31,25 +51,15 @@ def notify_user_booking_status(booking):
         f"is now '{booking.get_status_display()}'.\n"
         f"Thank you for using our service.\n"
     )
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [booking.user.email])
+    queue_email(subject, message, [booking.user.email])
 
     # SMS notification (optional; requires Twilio credentials)
     phone = getattr(booking.user, 'phone', None)
-    if phone and settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER:
-        try:
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            sms_body = (
-                f"Booking {booking.status}: {booking.court} on {booking.date} {booking.start_time}."
-            )
-            client.messages.create(
-                body=sms_body,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=phone
-            )
-        except Exception as exc:
-            # in a real project you should log this
-            print(f"failed to send sms: {exc}")
+    if phone:
+        sms_body = (
+            f"Booking {booking.status}: {booking.court} on {booking.date} {booking.start_time}."
+        )
+        queue_sms(sms_body, phone)
 
 
 def notify_advertisement_status(ad, approved=True):
@@ -77,7 +87,7 @@ def notify_advertisement_status(ad, approved=True):
         recipient = None
 
     if recipient:
-        send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [recipient])
+        queue_email(subject, message, [recipient])
 
 
 def notify_tournament_status(tournament, approved=True):
@@ -87,16 +97,11 @@ def notify_tournament_status(tournament, approved=True):
         f"Hello {tournament.contact_person},\n\n"
         f"Your tournament '{tournament.name}' at {tournament.venue.name} on {tournament.start_date} has been {'confirmed' if approved else 'rejected'}.\n"
     )
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [tournament.contact_email])
+    queue_email(subject, message, [tournament.contact_email])
     phone = getattr(tournament, 'contact_phone', None)
-    if phone and settings.TWILIO_ACCOUNT_SID and settings.TWILIO_AUTH_TOKEN and settings.TWILIO_PHONE_NUMBER:
-        try:
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            sms_body = f"Tournament { 'Confirmed' if approved else 'Rejected' }: {tournament.name}"
-            client.messages.create(body=sms_body, from_=settings.TWILIO_PHONE_NUMBER, to=phone)
-        except Exception as exc:
-            print(f"failed to send sms: {exc}")
+    if phone:
+        sms_body = f"Tournament { 'Confirmed' if approved else 'Rejected' }: {tournament.name}"
+        queue_sms(sms_body, phone)
 
 def notify_admin_payment(payment):
     """Send SMS and email notification to admin about new payment request."""
@@ -144,22 +149,13 @@ def notify_admin_payment(payment):
             f"\nPlease review and approve/reject this payment in your admin panel."
         )
     
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [settings.ADMIN_EMAIL])
+    queue_email(subject, message, [settings.ADMIN_EMAIL])
     
     # Send SMS to admin (if configured)
     admin_phone = getattr(settings, 'ADMIN_PHONE', None)
-    if admin_phone and getattr(settings, 'TWILIO_ACCOUNT_SID', None):
-        try:
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            sms_body = f"New Payment: {payment.transaction_id} - ₹{payment.amount} ({payment.transaction_type})"
-            client.messages.create(
-                body=sms_body,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=admin_phone
-            )
-        except Exception as exc:
-            print(f"Failed to send SMS to admin: {exc}")
+    if admin_phone:
+        sms_body = f"New Payment: {payment.transaction_id} - ₹{payment.amount} ({payment.transaction_type})"
+        queue_sms(sms_body, admin_phone)
 
 
 def notify_user_payment_confirmed(payment):
@@ -208,28 +204,18 @@ def notify_user_payment_confirmed(payment):
             f"Thank you for your sponsorship!\n"
         )
     
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [payment.user.email])
+    queue_email(subject, message, [payment.user.email])
     
     # Send SMS confirmation
     phone = getattr(payment.user, 'phone', None)
-    if phone and getattr(settings, 'TWILIO_ACCOUNT_SID', None):
-        try:
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            if payment.transaction_type == 'booking':
-                sms_body = f"Payment confirmed! Booking at {related_obj.court.venue.name} on {related_obj.date} {related_obj.start_time}. Your Player ID: {payment.user.id}"
-            elif payment.transaction_type == 'advertisement':
-                sms_body = f"Payment confirmed! Your advertisement for {related_obj.brand_name} is now live."
-            else:
-                sms_body = f"Payment confirmed! Your sponsorship for {related_obj.name} is active."
-            
-            client.messages.create(
-                body=sms_body,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=phone
-            )
-        except Exception as exc:
-            print(f"Failed to send SMS to user: {exc}")
+    if phone:
+        if payment.transaction_type == 'booking':
+            sms_body = f"Payment confirmed! Booking at {related_obj.court.venue.name} on {related_obj.date} {related_obj.start_time}. Your Player ID: {payment.user.id}"
+        elif payment.transaction_type == 'advertisement':
+            sms_body = f"Payment confirmed! Your advertisement '{related_obj.title}' is now live."
+        else:
+            sms_body = f"Payment confirmed! Your sponsorship for {related_obj.name} is active."
+        queue_sms(sms_body, phone)
 
 
 def notify_user_payment_rejected(payment, admin_notes=''):
@@ -280,19 +266,10 @@ def notify_user_payment_rejected(payment, admin_notes=''):
             f"The refund will be processed within 5-7 business days.\n"
         )
     
-    send_mail(subject, message, settings.DEFAULT_FROM_EMAIL, [payment.user.email])
+    queue_email(subject, message, [payment.user.email])
     
     # Send SMS about refund
     phone = getattr(payment.user, 'phone', None)
-    if phone and getattr(settings, 'TWILIO_ACCOUNT_SID', None):
-        try:
-            from twilio.rest import Client
-            client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
-            sms_body = f"Payment rejected and refunded: {payment.transaction_id}. Amount: ₹{payment.amount}. Refund in 5-7 days."
-            client.messages.create(
-                body=sms_body,
-                from_=settings.TWILIO_PHONE_NUMBER,
-                to=phone
-            )
-        except Exception as exc:
-            print(f"Failed to send refund SMS to user: {exc}")
\ No newline at end of file
+    if phone:
+        sms_body = f"Payment rejected and refunded: {payment.transaction_id}. Amount: ₹{payment.amount}. Refund in 5-7 days."
+        queue_sms(sms_body, phone)
\ No newline at end of file
@@ -1,13 +1,23 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required, user_passes_test
-from .forms import BookingForm, AdvertisementForm, TournamentForm, TournamentRegistrationForm
-from .models import Booking, Court, Venue, Advertisement, Tournament, TournamentSponsor, Sponsor, Team, TournamentRegistration, Payment
+from .forms import BookingForm, RecurringBookingForm, AdvertisementForm, TournamentForm, TournamentRegistrationForm
+from .models import Booking, Court, Venue, Advertisement, Tournament, TournamentSponsor, Sponsor, Team, TournamentRegistration, TournamentFull, Payment
 from django.contrib import messages
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import date
+from datetime import date, datetime, timedelta
 from django.conf import settings
 import uuid
 from . import utils
+from . import availability
+from . import recurring
+from . import analytics
+from . import stats
+from . import players
+from . import ads
 
 
 def _is_admin(user):
@@ -30,21 +40,24 @@ def booking_list(request):
 def booking_create(request):
     """Two‑step booking: first collect details, then send user to payment."""
     if request.method == 'POST':
+        # a new attempt replaces whatever slot the user was holding before
+        availability.release_hold(request.session.pop('slot_hold', None))
         form = BookingForm(request.POST)
         if form.is_valid():
             booking = form.save(commit=False)
             booking.user = request.user
-            # availability check against already confirmed bookings
-            overlaps = Booking.objects.filter(
-                court=booking.court,
-                date=booking.date,
-                start_time__lt=booking.end_time,
-                end_time__gt=booking.start_time,
-                status='confirmed'
-            )
-            if overlaps.exists():
-                messages.error(request, 'Selected slot is already booked for this court')
+            # availability check against already confirmed bookings; reuses the
+            # court/day index the form loaded instead of querying again
+            overlaps = form.court_day.conflicts(booking.start_time, booking.end_time)
+            if not overlaps:
+                # reserve the slot until the user has paid
+                hold, overlaps = availability.hold_slot(
+                    request.user, booking.court, booking.date, booking.start_time, booking.end_time
+                )
+            if overlaps:
+                messages.error(request, f'Selected slot is already booked for this court ({availability.format_ranges(overlaps)})')
             else:
+                request.session['slot_hold'] = hold.pk
                 # save data to session so we can confirm after payment
                 request.session['pending_booking'] = {
                     'court': booking.court.id,
@@ -55,13 +68,45 @@ def booking_create(request):
                     'notes': booking.notes,
                 }
                 # calculate price now and keep it for display
-                request.session['pending_price'] = booking.calculate_price()
+                # stored as a string: the session serializer cannot handle Decimal
+                request.session['pending_price'] = str(booking.calculate_price())
                 return redirect('booking_payment')
     else:
         form = BookingForm()
     return render(request, 'booking/booking_create.html', {'form': form})
 
 
+@login_required
+def recurring_booking_create(request):
+    """Book the same court slot every week (or two) over a date range in one go."""
+    clashes = None
+    if request.method == 'POST':
+        form = RecurringBookingForm(request.POST)
+        if form.is_valid():
+            data = form.cleaned_data
+            series, clashes = recurring.create_series(
+                request.user,
+                data['court'],
+                data['start_date'],
+                data['end_date'],
+                data['start_time'],
+                data['end_time'],
+                interval_weeks=data['interval_weeks'],
+                skip_dates=data['skip_dates'],
+                number_of_players=data['number_of_players'],
+                payment_method=data['payment_method'],
+            )
+            if series:
+                count = series.bookings.count()
+                messages.success(request, f'{count} bookings created. They are awaiting admin approval.')
+                return redirect('booking_list')
+            messages.error(request, 'Some dates clash with existing bookings. Skip them or choose another slot.')
+    else:
+        form = RecurringBookingForm()
+    clash_list = [(day, availability.format_ranges(ranges)) for day, ranges in (clashes or {}).items()]
+    return render(request, 'booking/recurring_booking_create.html', {'form': form, 'clashes': clash_list})
+
+
 @login_required
 def booking_detail(request, pk):
     b = get_object_or_404(Booking, pk=pk, user=request.user)
@@ -94,32 +139,53 @@ def booking_payment(request):
         except ValueError:
             end_time = datetime.strptime(data['end_time'], '%H:%M:%S').time()
         
-        # create booking as 'pending' waiting for admin approval
-        booking = Booking(
-            user=request.user,
-            court=court,
-            date=booking_date,
-            start_time=start_time,
-            end_time=end_time,
-            number_of_players=data['number_of_players'],
-            notes=data.get('notes', ''),
-            status='pending'
-        )
-        booking.calculate_price()
-        booking.save()
-        # record a simple Payment object for demonstration
-        Payment.objects.create(
-            user=request.user,
-            transaction_id=str(uuid.uuid4()),
-            transaction_type='booking',
-            booking=booking,
-            amount=booking.total_price,
-            payment_method=method,
-            status='completed'
-        )
+        hold_id = request.session.get('slot_hold')
+        try:
+            with transaction.atomic():
+                # lock the court and re-check: the hold may have expired and been taken
+                Court.objects.select_for_update().get(pk=court.pk)
+                overlaps = availability.find_conflicts(court, booking_date, start_time, end_time, exclude_hold=hold_id)
+                if overlaps:
+                    raise availability.SlotUnavailable(overlaps)
+                # create booking as 'pending' waiting for admin approval
+                booking = Booking(
+                    user=request.user,
+                    court=court,
+                    date=booking_date,
+                    start_time=start_time,
+                    end_time=end_time,
+                    number_of_players=data['number_of_players'],
+                    notes=data.get('notes', ''),
+                    status='pending'
+                )
+                booking.calculate_price()
+                booking.save()
+                stats.booking_changed(booking)
+                # the slot cells are the final guard against a concurrent double booking
+                availability.claim_cells(booking)
+                # record a simple Payment object for demonstration
+                Payment.objects.create(
+                    user=request.user,
+                    transaction_id=str(uuid.uuid4()),
+                    transaction_type='booking',
+                    booking=booking,
+                    amount=booking.total_price,
+                    payment_method=method,
+                    status='completed'
+                )
+                # the booking now occupies the slot itself
+                availability.release_hold(hold_id)
+        except availability.SlotUnavailable as exc:
+            booking = None
+            overlaps = exc.ranges
         # clear session
         request.session.pop('pending_booking', None)
         request.session.pop('pending_price', None)
+        request.session.pop('slot_hold', None)
+        if booking is None:
+            availability.release_hold(hold_id)
+            messages.error(request, f'Sorry, your hold expired and the slot was taken ({availability.format_ranges(overlaps)}). Please pick another time.')
+            return redirect('booking_create')
         return redirect('booking_payment_success', pk=booking.pk)
 
     return render(request, 'booking/payment.html', {
@@ -138,21 +204,79 @@ def booking_payment_success(request, pk):
 
 def venue_list(request):
     venues = Venue.objects.all()
-    return render(request, 'booking/venues.html', {'venues': venues})
+    sort = request.GET.get('sort')
+    if sort == 'rating':
+        # ratings come from the denormalised review totals, no review rows are read
+        venues = venues.annotate(avg_rating=Venue.average_rating_expression()).order_by('-avg_rating', 'name')
+    return render(request, 'booking/venues.html', {'venues': venues, 'sort': sort})
 
 
 def venue_detail(request, pk):
     v = get_object_or_404(Venue, pk=pk)
     courts = v.courts.all()
-    # notify admin that a (logged‑in) user viewed this venue
+    # count views by logged-in users; summarised in the daily venue view digest
     if request.user.is_authenticated:
-        utils.notify_admin_generic(
-            subject=f"Venue viewed: {v.name}",
-            message=f"User {request.user.email} opened venue '{v.name}' (id={v.id})."
-        )
+        analytics.record_view(v.pk, request.user.pk)
     return render(request, 'booking/venue_detail.html', {'venue': v, 'courts': courts})
 
 
+# bounds for the availability grid endpoint
+AVAILABILITY_MAX_DAYS = 31
+AVAILABILITY_SLOT_CHOICES = (15, 30, 60, 120)
+
+
+def venue_availability(request, pk=None):
+    """JSON free/busy grid for a venue's courts (or a whole city) over a date range.
+
+    Query params: `start` (YYYY-MM-DD, default today), `days` (default 14),
+    `slot` (minutes, default 60), `prices=1` to include the price of every slot
+    and, without a venue in the URL, `city`.
+    """
+    venue = get_object_or_404(Venue, pk=pk) if pk is not None else None
+    city = request.GET.get('city', '').strip()
+    if venue is None and not city:
+        return JsonResponse({'error': 'A venue or city is required.'}, status=400)
+    try:
+        start = datetime.strptime(request.GET['start'], '%Y-%m-%d').date() if request.GET.get('start') else date.today()
+        days = int(request.GET.get('days', 14))
+        slot = int(request.GET.get('slot', 60))
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start, days or slot parameter.'}, status=400)
+    if not 1 <= days <= AVAILABILITY_MAX_DAYS:
+        return JsonResponse({'error': f'days must be between 1 and {AVAILABILITY_MAX_DAYS}.'}, status=400)
+    if slot not in AVAILABILITY_SLOT_CHOICES:
+        return JsonResponse({'error': f'slot must be one of {list(AVAILABILITY_SLOT_CHOICES)}.'}, status=400)
+
+    grid = availability.free_slot_grid(
+        start, start + timedelta(days=days - 1), slot, venue=venue, city=city,
+        with_prices=request.GET.get('prices') == '1',
+    )
+    return JsonResponse(grid)
+
+
+def free_courts_search(request):
+    """JSON list of courts (optionally in one city) free for the whole requested slot."""
+    try:
+        day = datetime.strptime(request.GET['date'], '%Y-%m-%d').date()
+        start_time = datetime.strptime(request.GET['start'], '%H:%M').time()
+        end_time = datetime.strptime(request.GET['end'], '%H:%M').time()
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'date (YYYY-MM-DD), start and end (HH:MM) are required.'}, status=400)
+    if start_time >= end_time:
+        return JsonResponse({'error': 'end must be after start.'}, status=400)
+
+    courts = availability.free_courts(day, start_time, end_time, city=request.GET.get('city', '').strip())
+    return JsonResponse({
+        'date': str(day),
+        'start': request.GET['start'],
+        'end': request.GET['end'],
+        'courts': [
+            {'id': c.id, 'name': c.name, 'venue_id': c.venue_id, 'venue': c.venue.name, 'city': c.venue.city}
+            for c in courts
+        ],
+    })
+
+
 def advertise_page(request):
     if request.method == 'POST':
         form = AdvertisementForm(request.POST, request.FILES)
@@ -187,6 +311,20 @@ def advertise_success(request):
     return render(request, 'booking/advertise_success.html')
 
 
+def ad_click(request, pk):
+    """Count a click on a live ad and send the visitor on to the advertiser's link."""
+    # only ads an administrator approved and that are running today; submitted ads are
+    # not moderated yet, and redirecting to them would make this an open redirect
+    today = timezone.now().date()
+    ad = ads.find(pk) or get_object_or_404(
+        Advertisement, pk=pk, is_active=True, start_date__lte=today, end_date__gte=today,
+    )
+    if not ad.link:
+        raise Http404('This advertisement has no link.')
+    ads.record_click(ad.pk)
+    return HttpResponseRedirect(ad.link)
+
+
 def tournament_list(request):
     # Show tournaments that are upcoming or currently ongoing
     tournaments = Tournament.objects.filter(status__in=['upcoming', 'ongoing']).order_by('start_date')
@@ -229,7 +367,7 @@ def tournament_detail(request, pk):
 @admin_required
 def team_detail(request, pk):
     """Show detailed team registration info for admins."""
-    team = get_object_or_404(Team, pk=pk)
+    team = get_object_or_404(Team.objects.prefetch_related('memberships__player'), pk=pk)
     registration = TournamentRegistration.objects.filter(team=team).select_related('tournament', 'user').first()
 
     return render(request, 'booking/team_detail.html', {
@@ -260,44 +398,56 @@ def tournament_register(request, pk):
                 messages.error(request, 'Registration is full for this tournament.')
                 return redirect('tournament_detail', pk=tournament.pk)
 
-            team = Team.objects.create(
-                name=form.cleaned_data['team_name'],
-                captain_name=form.cleaned_data['captain_name'],
-                contact_number=form.cleaned_data['contact_number'],
-                player_list=form.cleaned_data['player_list'],
-                created_by=request.user
-            )
-
-            registration = TournamentRegistration.objects.create(
-                tournament=tournament,
-                team=team,
-                user=request.user,
-                status='pending'
-            )
-
-            payment = Payment.objects.create(
-                user=request.user,
-                transaction_id=str(uuid.uuid4()),
-                transaction_type='tournament_registration',
-                tournament=tournament,
-                registration=registration,
-                amount=tournament.entry_fee,
-                payment_method=form.cleaned_data['payment_method'],
-                status='pending'
-            )
-
-            proof = form.cleaned_data.get('payment_proof')
-            if proof:
-                payment.payment_proof = proof
-                payment.save()
+            entries = form.cleaned_data['player_list']
+            with transaction.atomic():
+                # lock the tournament so two teams cannot sign up the same player at once
+                Tournament.objects.select_for_update().filter(pk=tournament.pk).exists()
+                duplicates = players.duplicate_players(tournament, entries)
+                if duplicates:
+                    form.add_error('player_list', 'Already registered for this tournament: ' + ', '.join(
+                        f'{name} ({team_name})' for name, team_name in duplicates
+                    ))
+                    return render(request, 'booking/tournament_register.html', {'tournament': tournament, 'form': form})
+
+                team = Team.objects.create(
+                    name=form.cleaned_data['team_name'],
+                    captain_name=form.cleaned_data['captain_name'],
+                    contact_number=form.cleaned_data['contact_number'],
+                    created_by=request.user
+                )
+                players.set_team_players(team, entries)
+
+                registration = TournamentRegistration.objects.create(
+                    tournament=tournament,
+                    team=team,
+                    user=request.user,
+                    status='pending'
+                )
+                stats.registration_changed(registration)
+
+                payment = Payment.objects.create(
+                    user=request.user,
+                    transaction_id=str(uuid.uuid4()),
+                    transaction_type='tournament_registration',
+                    tournament=tournament,
+                    registration=registration,
+                    amount=tournament.entry_fee,
+                    payment_method=form.cleaned_data['payment_method'],
+                    status='pending'
+                )
+
+                proof = form.cleaned_data.get('payment_proof')
+                if proof:
+                    payment.payment_proof = proof
+                    payment.save()
+
+                # Notify admin; the outbox row commits with the registration
+                utils.notify_admin_generic(
+                    subject=f"New tournament registration: {tournament.name}",
+                    message=f"User {request.user.email} registered team '{team.name}' for tournament '{tournament.name}'."
+                )
 
             messages.success(request, 'Your team has been registered successfully. Awaiting admin approval after payment review.')
-            # Notify admin (optional)
-            utils.notify_admin_generic(
-                subject=f"New tournament registration: {tournament.name}",
-                message=f"User {request.user.email} registered team '{team.name}' for tournament '{tournament.name}'."
-            )
-
             return redirect('tournament_registration_success', pk=registration.pk)
     else:
         form = TournamentRegistrationForm()
@@ -311,31 +461,97 @@ def tournament_registration_success(request, pk):
     return render(request, 'booking/tournament_registration_success.html', {'registration': registration})
 
 
+# rows per section on the admin dashboard
+DASHBOARD_PAGE_SIZE = 25
+
+
+def _date_range(request, prefix, field):
+    """Filter on `field` from the `<prefix>_from`/`<prefix>_to` query params (YYYY-MM-DD); bad values are ignored."""
+    condition = Q()
+    for suffix, lookup in (('from', 'gte'), ('to', 'lte')):
+        try:
+            value = date.fromisoformat(request.GET.get(f'{prefix}_{suffix}', ''))
+        except ValueError:
+            continue
+        condition &= Q(**{f'{field}__{lookup}': value})
+    return condition
+
+
+def _dashboard_section(request, prefix, queryset, count):
+    """Page `prefix` of a dashboard section, using a count computed up front instead of a COUNT query."""
+    paginator = Paginator(queryset, DASHBOARD_PAGE_SIZE)
+    paginator.count = count
+    page = paginator.get_page(request.GET.get(f'{prefix}_page'))
+
+    def page_url(number):
+        params = request.GET.copy()
+        params[f'{prefix}_page'] = number
+        return '?' + params.urlencode()
+
+    own = {f'{prefix}_page', f'{prefix}_from', f'{prefix}_to'}
+    return {
+        'prefix': prefix,
+        'count': count,
+        'page': page,
+        'date_from': request.GET.get(f'{prefix}_from', ''),
+        'date_to': request.GET.get(f'{prefix}_to', ''),
+        # keep the other sections' pages and filters when this one is filtered
+        'hidden': [(key, value) for key, value in request.GET.items() if key not in own],
+        'previous_url': page_url(page.previous_page_number()) if page.has_previous() else None,
+        'next_url': page_url(page.next_page_number()) if page.has_next() else None,
+    }
+
+
 @admin_required
 def admin_dashboard(request):
-    """Administrator dashboard showing all booking requests and statuses."""
-    # Pending payment bookings (after user paid, awaiting admin approval)
-    pending_payment_bookings = Booking.objects.filter(status='pending').order_by('-created_at')
-    # All confirmed bookings
-    confirmed_bookings = Booking.objects.filter(status='confirmed').order_by('-created_at')
-    # Cancelled bookings
-    cancelled_bookings = Booking.objects.filter(status='cancelled').order_by('-created_at')
-    # advertisements that are not active (i.e., pending activation)
-    pending_ads = Advertisement.objects.filter(is_active=False).order_by('-created_at')
-    # advertisements that are active (showing on site)
-    active_ads = Advertisement.objects.filter(is_active=True).order_by('-created_at')
-    # tournaments (show upcoming/ongoing as admin-manageable)
-    tournaments = Tournament.objects.filter(status__in=['upcoming', 'ongoing']).order_by('-created_at')
-    # pending tournament registrations (after payment info submitted)
-    pending_registrations = TournamentRegistration.objects.filter(status='pending').order_by('-created_at')
+    """Administrator dashboard showing booking requests, registrations and ads, a page per section.
+
+    Each section can be filtered with `<section>_from`/`<section>_to` and paged with
+    `<section>_page`. Section sizes come from one aggregate per table, so the number
+    of queries does not grow with the amount of data.
+    """
+    booking_filters = {
+        # pending: paid bookings awaiting admin approval
+        'pending': Q(status='pending') & _date_range(request, 'pending', 'date'),
+        'confirmed': Q(status='confirmed') & _date_range(request, 'confirmed', 'date'),
+        'cancelled': Q(status='cancelled') & _date_range(request, 'cancelled', 'date'),
+    }
+    ad_filters = {
+        # inactive ads are waiting to be activated
+        'pending_ads': Q(is_active=False) & _date_range(request, 'pending_ads', 'created_at__date'),
+        'active_ads': Q(is_active=True) & _date_range(request, 'active_ads', 'created_at__date'),
+    }
+    registration_filter = Q(status='pending') & _date_range(request, 'registrations', 'created_at__date')
+
+    counts = Booking.objects.filter(status__in=booking_filters).aggregate(
+        **{prefix: Count('pk', filter=condition) for prefix, condition in booking_filters.items()}
+    )
+    counts.update(Advertisement.objects.aggregate(
+        **{prefix: Count('pk', filter=condition) for prefix, condition in ad_filters.items()}
+    ))
+    counts.update(TournamentRegistration.objects.aggregate(registrations=Count('pk', filter=registration_filter)))
+
+    bookings = Booking.objects.select_related('user', 'court__venue').order_by('-created_at')
+    advertisements = Advertisement.objects.order_by('-created_at')
     context = {
-        'pending_payment_bookings': pending_payment_bookings,
-        'confirmed_bookings': confirmed_bookings,
-        'cancelled_bookings': cancelled_bookings,
-        'pending_ads': pending_ads,
-        'active_ads': active_ads,
-        'tournaments': tournaments,
-        'pending_registrations': pending_registrations,
+        # all-time totals from the daily rollup, one query over days rather than bookings
+        'headline': stats.headline(),
+        'pending_payment_bookings': _dashboard_section(
+            request, 'pending', bookings.select_related('payment').filter(booking_filters['pending']), counts['pending']),
+        'confirmed_bookings': _dashboard_section(
+            request, 'confirmed', bookings.filter(booking_filters['confirmed']), counts['confirmed']),
+        'cancelled_bookings': _dashboard_section(
+            request, 'cancelled', bookings.filter(booking_filters['cancelled']), counts['cancelled']),
+        'pending_ads': _dashboard_section(
+            request, 'pending_ads', advertisements.filter(ad_filters['pending_ads']), counts['pending_ads']),
+        'active_ads': _dashboard_section(
+            request, 'active_ads', advertisements.filter(ad_filters['active_ads']), counts['active_ads']),
+        'pending_registrations': _dashboard_section(
+            request, 'registrations',
+            TournamentRegistration.objects.select_related('team', 'tournament', 'user')
+            .filter(registration_filter).order_by('-created_at'),
+            counts['registrations'],
+        ),
     }
     return render(request, 'booking/admin_dashboard.html', context)
 
@@ -344,16 +560,27 @@ def admin_dashboard(request):
 def admin_update_booking(request, pk, action):
     """Confirm or cancel a booking from the admin dashboard."""
     booking = get_object_or_404(Booking, pk=pk)
+    previous_status = booking.status
     if action == 'confirm':
         booking.status = 'confirmed'
-        booking.save()
-        utils.notify_user_booking_status(booking)
+        try:
+            with transaction.atomic():
+                availability.sync_cells(booking, previous_status)
+                booking.save_changed()
+                stats.booking_changed(booking, previous_status)
+                utils.notify_user_booking_status(booking)
+        except availability.SlotUnavailable as exc:
+            messages.error(request, f'Cannot confirm: the court is already booked at {exc}.')
+            return redirect('admin_dashboard')
         messages.success(request, 'Booking confirmed and user notified.')
     elif action == 'cancel' or action == 'reject':
         booking.status = 'cancelled'
-        booking.save()
-        # notify the user that their booking was rejected/cancelled with refund info
-        utils.notify_user_booking_status(booking)
+        with transaction.atomic():
+            availability.sync_cells(booking, previous_status)
+            booking.save_changed()
+            stats.booking_changed(booking, previous_status)
+            # notify the user that their booking was rejected/cancelled with refund info
+            utils.notify_user_booking_status(booking)
         messages.info(request, 'Booking rejected. User will be notified about refund.')
     else:
         messages.warning(request, 'Unknown action')
@@ -386,13 +613,15 @@ def admin_update_tournament(request, pk, action):
     t = get_object_or_404(Tournament, pk=pk)
     if action == 'confirm':
         t.status = 'upcoming'
-        t.save()
-        utils.notify_tournament_status(t, approved=True)
+        with transaction.atomic():
+            t.save()
+            utils.notify_tournament_status(t, approved=True)
         messages.success(request, 'Tournament confirmed and contact notified.')
     elif action == 'reject':
         t.status = 'cancelled'
-        t.save()
-        utils.notify_tournament_status(t, approved=False)
+        with transaction.atomic():
+            t.save()
+            utils.notify_tournament_status(t, approved=False)
         messages.info(request, 'Tournament rejected and contact notified.')
     else:
         messages.warning(request, 'Unknown action')
@@ -424,21 +653,30 @@ def about_page(request):
 def admin_update_registration(request, pk, action):
     """Approve or reject a tournament registration."""
     registration = get_object_or_404(TournamentRegistration, pk=pk)
+    previous_status = registration.status
 
     if action == 'approve':
         registration.status = 'approved'
-        registration.save()
-        # mark payment as completed (if present)
-        if getattr(registration, 'payment', None):
-            registration.payment.status = 'completed'
-            registration.payment.save()
+        try:
+            with transaction.atomic():
+                registration.save_changed()
+                stats.registration_changed(registration, previous_status)
+                # mark payment as completed (if present)
+                if getattr(registration, 'payment', None):
+                    registration.payment.status = 'completed'
+                    registration.payment.save_changed()
+        except TournamentFull:
+            messages.error(request, f"'{registration.tournament.name}' is full; the registration was not approved.")
+            return redirect('admin_dashboard')
         messages.success(request, f"Registration for '{registration.team.name}' approved.")
     elif action == 'reject':
         registration.status = 'rejected'
-        registration.save()
-        if getattr(registration, 'payment', None):
-            registration.payment.status = 'cancelled'
-            registration.payment.save()
+        with transaction.atomic():
+            registration.save_changed()
+            stats.registration_changed(registration, previous_status)
+            if getattr(registration, 'payment', None):
+                registration.payment.status = 'cancelled'
+                registration.payment.save_changed()
         messages.info(request, f"Registration for '{registration.team.name}' rejected.")
     else:
         messages.warning(request, 'Unknown action')
@@ -0,0 +1,16 @@
+from django.urls import include, path
+from rest_framework.routers import DefaultRouter
+
+from booking.api_views import BookingViewSet, CourtViewSet, TournamentViewSet, VenueViewSet
+from user.api_views import login_view
+
+router = DefaultRouter()
+router.register('venues', VenueViewSet, basename='api-venue')
+router.register('courts', CourtViewSet, basename='api-court')
+router.register('bookings', BookingViewSet, basename='api-booking')
+router.register('tournaments', TournamentViewSet, basename='api-tournament')
+
+urlpatterns = [
+    path('users/login/', login_view, name='api-login'),
+    path('', include(router.urls)),
+]
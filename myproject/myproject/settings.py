@@ -38,6 +38,9 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'rest_framework',
+    'rest_framework.authtoken',
+    'corsheaders',
     'user',
     'booking',
 ]
@@ -46,6 +49,7 @@ AUTH_USER_MODEL = 'user.CustomUser'
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -87,6 +91,18 @@ DATABASES = {
 }
 
 
+# Cache
+# the default is per process; point CACHE_BACKEND/CACHE_LOCATION at a shared cache (e.g.
+# django.core.cache.backends.redis.RedisCache, redis://127.0.0.1:6379) when running several
+# workers, so that price table and ads invalidations reach all of them at once
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', ''),
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -136,6 +152,27 @@ LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'home'
 LOGOUT_REDIRECT_URL = 'login'
 
+# --- REST API (/api/) used by the React frontend -----------------
+REST_FRAMEWORK = {
+    # the SPA sends `Authorization: Bearer <token>` from /api/users/login/; the browsable API uses the session
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'user.authentication.BearerTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_PERMISSION_CLASSES': [
+        'rest_framework.permissions.IsAuthenticatedOrReadOnly',
+    ],
+}
+# objects per page of an API list; clients may ask for up to 100 with ?page_size=
+API_PAGE_SIZE = int(os.environ.get('API_PAGE_SIZE', 20))
+
+# comma separated origins allowed to call the API from a browser (the Vite dev server by default)
+CORS_ALLOWED_ORIGINS = [
+    origin for origin in os.environ.get('CORS_ALLOWED_ORIGINS', 'http://localhost:3000').split(',') if origin
+]
+# let the SPA read the validators it sends back as If-None-Match / If-Modified-Since
+CORS_EXPOSE_HEADERS = ['ETag', 'Last-Modified']
+
 # --- notifications/settings for admin/email/sms ----------------
 # email recipients & defaults
 ADMIN_EMAIL = os.environ.get('ADMIN_EMAIL', 'admin@test.com')
@@ -148,3 +185,36 @@ EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.conso
 TWILIO_ACCOUNT_SID = os.environ.get('TWILIO_ACCOUNT_SID', '')
 TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN', '')
 TWILIO_PHONE_NUMBER = os.environ.get('TWILIO_PHONE_NUMBER', '')
+
+# notifications are queued in the database and sent by `manage.py send_notifications`;
+# SMS_BACKEND is a dotted path (e.g. booking.sms.ConsoleBackend), empty means Twilio when configured
+SMS_BACKEND = os.environ.get('SMS_BACKEND', '')
+# delay before the first retry of a failed notification, doubled on each further attempt
+NOTIFICATION_RETRY_SECONDS = int(os.environ.get('NOTIFICATION_RETRY_SECONDS', 60))
+# a worker claims a batch for at least this long before sending it; keep it above the time a
+# batch takes to send, or another worker may send the tail of the batch again
+NOTIFICATION_LEASE_SECONDS = int(os.environ.get('NOTIFICATION_LEASE_SECONDS', 300))
+
+# venue page views are buffered per process and written once either limit is reached; the
+# limits are only checked when a view comes in, so an idle process holds its last views
+# until the next request, and loses them if it is stopped first
+VENUE_VIEW_BUFFER_SIZE = int(os.environ.get('VENUE_VIEW_BUFFER_SIZE', 100))
+VENUE_VIEW_FLUSH_SECONDS = int(os.environ.get('VENUE_VIEW_FLUSH_SECONDS', 60))
+
+# longest a process serves its active-ads snapshot without rebuilding; edits invalidate
+# it at once through a version key in the cache (shared when CACHES is shared)
+ACTIVE_ADS_SNAPSHOT_SECONDS = int(os.environ.get('ACTIVE_ADS_SNAPSHOT_SECONDS', 300))
+# ad impressions and clicks are buffered per process like venue views (same caveat)
+AD_STAT_BUFFER_SIZE = int(os.environ.get('AD_STAT_BUFFER_SIZE', 500))
+AD_STAT_FLUSH_SECONDS = int(os.environ.get('AD_STAT_FLUSH_SECONDS', 60))
+
+# threads per process that render poster/logo/ad derivatives after an upload is saved;
+# 0 leaves them to `manage.py generate_image_derivatives`
+IMAGE_DERIVATIVE_THREADS = int(os.environ.get('IMAGE_DERIVATIVE_THREADS', 1))
+
+# --- bookings ----------------------------------------------------
+# minutes a slot stays reserved for a user between booking_create and payment
+SLOT_HOLD_MINUTES = int(os.environ.get('SLOT_HOLD_MINUTES', 10))
+# longest a worker may quote from a court's compiled price table after a Court or PricingRule
+# edit; edits invalidate it at once only for workers sharing the cache (see CACHES)
+PRICING_TABLE_SECONDS = int(os.environ.get('PRICING_TABLE_SECONDS', 300))
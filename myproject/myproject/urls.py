@@ -7,6 +7,7 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', include('user.urls')),
     path('booking/', include('booking.urls')),
+    path('api/', include('myproject.api_urls')),
 ]
 
 if settings.DEBUG:
@@ -0,0 +1,20 @@
+from django.contrib.auth import authenticate
+from rest_framework.authtoken.models import Token
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+
+from .serializers import UserSerializer
+
+
+@api_view(['POST'])
+# no session auth here: it would demand a CSRF token from the SPA before it has logged in
+@authentication_classes([])
+@permission_classes([AllowAny])
+def login_view(request):
+    """Exchange email and password for the token the frontend sends as `Authorization: Bearer <token>`."""
+    user = authenticate(request, email=request.data.get('email'), password=request.data.get('password'))
+    if user is None:
+        return Response({'error': 'Invalid email or password.'}, status=400)
+    token, _ = Token.objects.get_or_create(user=user)
+    return Response({'user': UserSerializer(user).data, 'user_id': user.pk, 'token': token.key})
@@ -0,0 +1,6 @@
+from rest_framework.authentication import TokenAuthentication
+
+
+class BearerTokenAuthentication(TokenAuthentication):
+    """DRF token auth accepting `Authorization: Bearer <key>`, the header the React frontend sends."""
+    keyword = 'Bearer'
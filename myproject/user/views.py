@@ -4,6 +4,9 @@ from django.contrib.auth.views import LoginView
 from django.contrib import messages
 from .forms import CustomUserCreationForm, CustomAuthenticationForm
 from django.contrib.auth.decorators import login_required
+from django.utils import timezone
+from booking.models import Booking
+from booking.pricing import quote_many
 
 
 def signup_view(request):
@@ -81,17 +84,26 @@ def home_view(request):
 @login_required
 def profile_view(request):
     # Get user's bookings with proper calculations
-    bookings = request.user.bookings.all().order_by('-date', '-start_time')
+    bookings = list(request.user.bookings.select_related('court__venue').order_by('-date', '-start_time'))
     
-    # Calculate total price for each booking if not already set
+    # Price bookings that have no total yet, one pricing pass per court, and
+    # write them back in a single bulk update
+    unpriced = {}
     for booking in bookings:
-        if not booking.total_price or booking.total_price == 0:
-            booking.calculate_price()
-            booking.save()
+        if not booking.total_price:
+            unpriced.setdefault(booking.court_id, []).append(booking)
+    for group in unpriced.values():
+        prices = quote_many(group[0].court, [(b.date, b.start_time, b.end_time) for b in group])
+        for booking, price in zip(group, prices):
+            booking.total_price = price
+            # bulk_update() skips auto_now, and the API's ETags follow updated_at
+            booking.updated_at = timezone.now()
+    if unpriced:
+        Booking.objects.bulk_update([b for group in unpriced.values() for b in group], ['total_price', 'updated_at'])
     
     context = {
         'bookings': bookings,
-        'total_bookings': bookings.count(),
-        'confirmed_bookings': bookings.filter(status='confirmed').count(),
+        'total_bookings': len(bookings),
+        'confirmed_bookings': sum(1 for b in bookings if b.status == 'confirmed'),
     }
     return render(request, 'profile.html', context)